@@ -1,16 +1,43 @@
-from fastapi import FastAPI, APIRouter, Depends, HTTPException, status
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, Header, Query, UploadFile, File, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import CursorType, ReplaceOne, ReturnDocument, UpdateOne, monitoring
+from pymongo.errors import BulkWriteError, CollectionInvalid, DuplicateKeyError
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
+import asyncio
 import os
 import logging
+import time
+import re
+import json
+import base64
+import random
+import unicodedata
+import hashlib
+import heapq
+import sys
+import threading
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
 from pathlib import Path
-from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional
+from urllib.parse import parse_qs
+import urllib.request
+from pydantic import BaseModel, Field, EmailStr, ValidationError, create_model
+from typing import List, Literal, Optional
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+import csv
+import codecs
 import uuid
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import jwt
+import numpy as np
+import pandas as pd
 from passlib.context import CryptContext
 import smtplib
 from email.mime.text import MIMEText
@@ -21,18 +48,248 @@ from fastapi import FastAPI, Depends, HTTPException, status, APIRouter
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Tracing
+# W3C trace context, with the active span kept in a contextvar. Motor copies
+# the context into its executor threads, so the command listener sees the
+# span of the request that sent the command.
+# TRACE_EXPORTER: empty (off), "jsonl" (TRACE_JSONL_PATH) or "otlp" (OTLP/HTTP JSON)
+TRACE_EXPORTER = os.environ.get("TRACE_EXPORTER", "").lower()
+TRACE_SAMPLE_RATE = float(os.environ.get("TRACE_SAMPLE_RATE", "1"))
+TRACE_JSONL_PATH = os.environ.get("TRACE_JSONL_PATH", str(ROOT_DIR / "traces.jsonl"))
+TRACE_OTLP_ENDPOINT = os.environ.get("TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+TRACE_SERVICE_NAME = os.environ.get("TRACE_SERVICE_NAME", "gestao-de-tarefas")
+TRACE_EXPORT_INTERVAL_SECONDS = 5
+TRACE_MAX_QUEUED_SPANS = 10000
+if TRACE_EXPORTER not in ("", "jsonl", "otlp"):
+    raise ValueError(f"Unknown TRACE_EXPORTER {TRACE_EXPORTER!r}")
+
+SPAN_KIND_INTERNAL, SPAN_KIND_SERVER, SPAN_KIND_CLIENT = 1, 2, 3
+
+# Finished spans waiting for the exporter; the oldest are dropped if it falls behind
+finished_spans = deque(maxlen=TRACE_MAX_QUEUED_SPANS)
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "attributes", "start_ns", "end_ns", "error")
+    
+    def __init__(self, trace_id: str, parent_id: Optional[str], name: str, kind: int = SPAN_KIND_INTERNAL, attributes: Optional[dict] = None):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes or {}
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+    
+    def end(self, error: Optional[str] = None):
+        self.end_ns = time.time_ns()
+        self.error = error
+        finished_spans.append(self)
+
+current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+@contextmanager
+def span(name: str, **attributes):
+    """Child span of the current one; a no-op outside a sampled request"""
+    parent = current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(parent.trace_id, parent.span_id, name, attributes=attributes)
+    token = current_span.set(child)
+    error = None
+    try:
+        yield child
+    except Exception as exc:
+        error = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        current_span.reset(token)
+        child.end(error)
+
+def build_models(model, documents) -> list:
+    """[model(**document) for document in documents], traced as one span"""
+    with span("pydantic.validate", model=model.__name__, count=len(documents)):
+        return [model(**document) for document in documents]
+
 # MongoDB connection
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Counts connections checked out of the driver pools, for /readyz"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checked_out = {}
+
+    def _add(self, address, delta):
+        with self._lock:
+            self.checked_out[address] = max(0, self.checked_out.get(address, 0) + delta)
+
+    def connection_checked_out(self, event):
+        self._add(event.address, 1)
+
+    def connection_checked_in(self, event):
+        self._add(event.address, -1)
+
+    def pool_closed(self, event):
+        with self._lock:
+            self.checked_out.pop(event.address, None)
+
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def connection_created(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_closed(self, event): pass
+    def connection_check_out_started(self, event): pass
+    def connection_check_out_failed(self, event): pass
+
+pool_monitor = PoolMonitor()
+
+class CommandTracer(monitoring.CommandListener):
+    """One client span per MongoDB command sent inside a traced request"""
+
+    def __init__(self):
+        self._spans = {}
+
+    def started(self, event):
+        parent = current_span.get()
+        if parent is None:
+            return
+        attributes = {"db.system": "mongodb", "db.name": event.database_name, "db.operation": event.command_name}
+        collection = event.command.get(event.command_name)
+        if isinstance(collection, str):
+            attributes["db.mongodb.collection"] = collection
+        self._spans[(event.connection_id, event.request_id)] = Span(
+            parent.trace_id, parent.span_id, f"mongodb.{event.command_name}", SPAN_KIND_CLIENT, attributes
+        )
+
+    def succeeded(self, event):
+        command_span = self._spans.pop((event.connection_id, event.request_id), None)
+        if command_span:
+            command_span.end()
+
+    def failed(self, event):
+        command_span = self._spans.pop((event.connection_id, event.request_id), None)
+        if command_span:
+            command_span.end(str(event.failure))
+
+command_tracer = CommandTracer()
+
+event_listeners = [pool_monitor]
+if TRACE_EXPORTER:
+    event_listeners.append(command_tracer)
+
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, event_listeners=event_listeners)
 db = client[os.environ['DB_NAME']]
 
 # Security
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes with any other cost are rehashed on the next successful login;
+# run scripts/calibrate_bcrypt.py to pick a value for the host
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
 security = HTTPBearer()
 SECRET_KEY = os.environ.get("JWT_SECRET", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Archival of completed tasks (ARCHIVE_AFTER_DAYS <= 0 disables the archiver)
+ARCHIVE_AFTER_DAYS = int(os.environ.get("ARCHIVE_AFTER_DAYS", "30"))
+ARCHIVE_BATCH_SIZE = int(os.environ.get("ARCHIVE_BATCH_SIZE", "500"))
+ARCHIVE_INTERVAL_SECONDS = int(os.environ.get("ARCHIVE_INTERVAL_SECONDS", "3600"))
+
+# Bulk user import
+USER_IMPORT_CHUNK_SIZE = int(os.environ.get("USER_IMPORT_CHUNK_SIZE", "200"))
+USER_IMPORT_MAX_ROWS = int(os.environ.get("USER_IMPORT_MAX_ROWS", "10000"))
+
+# Bulk task import (CSV/XLSX)
+TASK_IMPORT_CHUNK_SIZE = int(os.environ.get("TASK_IMPORT_CHUNK_SIZE", "500"))
+TASK_IMPORT_MAX_ROWS = int(os.environ.get("TASK_IMPORT_MAX_ROWS", "100000"))
+TASK_IMPORT_MAX_REPORTED_FAILURES = int(os.environ.get("TASK_IMPORT_MAX_REPORTED_FAILURES", "1000"))
+
+# Delta sync
+SYNC_PAGE_SIZE = int(os.environ.get("SYNC_PAGE_SIZE", "500"))
+SYNC_TOMBSTONE_DAYS = int(os.environ.get("SYNC_TOMBSTONE_DAYS", "30"))
+SYNC_SAFETY_SECONDS = 5
+
+# Idempotency keys
+IDEMPOTENCY_TTL_HOURS = int(os.environ.get("IDEMPOTENCY_TTL_HOURS", "24"))
+IDEMPOTENCY_CACHE_SECONDS = int(os.environ.get("IDEMPOTENCY_CACHE_SECONDS", "300"))
+IDEMPOTENCY_CACHE_MAX_ENTRIES = 10000
+# A claim still in progress after this long is taken to be from a crashed request
+IDEMPOTENCY_LOCK_SECONDS = int(os.environ.get("IDEMPOTENCY_LOCK_SECONDS", "30"))
+
+# Overdue scanner
+OVERDUE_SCAN_INTERVAL_SECONDS = int(os.environ.get("OVERDUE_SCAN_INTERVAL_SECONDS", "60"))
+OPEN_STATUSES = ["pendente", "em_progresso"]
+TASK_STATUSES = OPEN_STATUSES + ["concluida"]
+
+# Deadline reminders (REMINDER_LEAD_MINUTES <= 0 disables the scheduler)
+REMINDER_LEAD_MINUTES = int(os.environ.get("REMINDER_LEAD_MINUTES", "60"))
+REMINDER_WINDOW_MINUTES = int(os.environ.get("REMINDER_WINDOW_MINUTES", "30"))
+REMINDER_BATCH_SIZE = int(os.environ.get("REMINDER_BATCH_SIZE", "100"))
+REMINDER_LEASE_SECONDS = int(os.environ.get("REMINDER_LEASE_SECONDS", "30"))
+
+# Kanban board
+BOARD_COLUMN_LIMIT = int(os.environ.get("BOARD_COLUMN_LIMIT", "20"))
+URGENCY_RANK = {"critica": 0, "alta": 1, "media": 2, "baixa": 3}
+
+# Team analytics
+ANALYTICS_MAX_DAYS = int(os.environ.get("ANALYTICS_MAX_DAYS", "365"))
+ANALYTICS_PERCENTILES = [50, 75, 90, 95]
+ANALYTICS_DAY_CACHE_MAX_ENTRIES = int(os.environ.get("ANALYTICS_DAY_CACHE_MAX_ENTRIES", "20000"))
+
+# Cross-worker cache invalidation
+WORKER_ID = str(uuid.uuid4())
+CACHE_EVENTS_MAX_BYTES = int(os.environ.get("CACHE_EVENTS_MAX_BYTES", str(1024 * 1024)))
+CACHE_EVENTS_AWAIT_MS = int(os.environ.get("CACHE_EVENTS_AWAIT_MS", "1000"))
+DASHBOARD_STATS_TTL_SECONDS = int(os.environ.get("DASHBOARD_STATS_TTL_SECONDS", "60"))
+
+# Task status history (write-behind buffer)
+TASK_EVENTS_BATCH_SIZE = int(os.environ.get("TASK_EVENTS_BATCH_SIZE", "100"))
+TASK_EVENTS_FLUSH_SECONDS = float(os.environ.get("TASK_EVENTS_FLUSH_SECONDS", "2"))
+TASK_EVENTS_MAX_BUFFERED = int(os.environ.get("TASK_EVENTS_MAX_BUFFERED", "10000"))
+
+# Health checks
+READINESS_TIMEOUT_SECONDS = float(os.environ.get("READINESS_TIMEOUT_SECONDS", "1"))
+READINESS_CACHE_SECONDS = float(os.environ.get("READINESS_CACHE_SECONDS", "2"))
+READINESS_MAX_LOOP_LAG_MS = float(os.environ.get("READINESS_MAX_LOOP_LAG_MS", "1000"))
+LOOP_LAG_INTERVAL_SECONDS = 0.5
+PREPARE_DATABASE_RETRY_SECONDS = 30
+
+# Read preference per route. Heavy reads can go to secondaries, at most
+# READ_MAX_STALENESS_SECONDS behind (MongoDB requires at least 90); task detail
+# reads always use the primary so a client reads its own writes.
+READ_MAX_STALENESS_SECONDS = int(os.environ.get("READ_MAX_STALENESS_SECONDS", "90"))
+ROUTE_READ_PREFERENCES = {
+    "dashboard": os.environ.get("READ_PREFERENCE_DASHBOARD", "secondaryPreferred"),
+    "analytics": os.environ.get("READ_PREFERENCE_ANALYTICS", "secondaryPreferred"),
+    "task_list": os.environ.get("READ_PREFERENCE_TASK_LIST", "primary"),
+    "board": os.environ.get("READ_PREFERENCE_BOARD", "primary"),
+}
+
+# Notification digests
+NOTIFICATION_DIGEST_MINUTES = int(os.environ.get("NOTIFICATION_DIGEST_MINUTES", "30"))
+NOTIFICATION_DIGEST_MAX_ITEMS = 50
+NOTIFICATION_DIGEST_BATCH_SIZE = 100
+NOTIFICATION_DIGEST_POLL_SECONDS = 30
+# A digest claimed longer ago (its sender crashed or failed) is claimed again
+NOTIFICATION_DIGEST_CLAIM_SECONDS = 300
+
+# Request profiling (admins only, ?profile=1 or X-Profile: 1)
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", "5"))
+PROFILE_TTL_HOURS = int(os.environ.get("PROFILE_TTL_HOURS", "24"))
+
+# Directory cache (teams, memberships and the authenticated user)
+AUTH_USER_CACHE_SECONDS = int(os.environ.get("AUTH_USER_CACHE_SECONDS", "60"))
+
 # Create the main app without a prefix
 app = FastAPI()
 # ... depois de app = FastAPI()
@@ -51,6 +308,7 @@ class User(BaseModel):
     password_hash: str
     is_admin: bool = False
     team_id: Optional[str] = None
+    notification_mode: str = "immediate"
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class UserCreate(BaseModel):
@@ -71,12 +329,55 @@ class UserResponse(BaseModel):
     team_id: Optional[str] = None
     created_at: datetime
 
+class UserSummary(BaseModel):
+    id: str
+    name: str
+    email: str
+
+class UserSearchPage(BaseModel):
+    items: List[UserSummary]
+    next_cursor: Optional[str] = None
+
+class NotificationPreferences(BaseModel):
+    # digest: one summary every NOTIFICATION_DIGEST_MINUTES instead of one email per task
+    mode: Literal["immediate", "digest"] = "immediate"
+
+class UserImportRowResult(BaseModel):
+    row: int
+    email: Optional[str] = None
+    status: str  # created, duplicate, invalid, failed
+    detail: Optional[str] = None
+
+class UserImportReport(BaseModel):
+    total: int
+    created: int
+    failed: int
+    failures: List[UserImportRowResult]
+
+class TaskImportRowResult(BaseModel):
+    row: int
+    title: Optional[str] = None
+    status: str  # invalid, forbidden, failed
+    detail: Optional[str] = None
+
+class TaskImportReport(BaseModel):
+    total: int = 0
+    created: int = 0
+    failed: int = 0
+    failures: List[TaskImportRowResult] = []
+    failures_truncated: bool = False  # only the first TASK_IMPORT_MAX_REPORTED_FAILURES are listed
+
+class TenantPlacement(BaseModel):
+    database: Optional[str] = None  # dedicated database; None keeps the main one
+    collection_prefix: str = ""
+
 class Team(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     name: str
     description: Optional[str] = None
     created_by: str  # admin user id
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    tenant: Optional[TenantPlacement] = None  # None: shared collections
 
 class TeamCreate(BaseModel):
     name: str
@@ -95,6 +396,10 @@ class Task(BaseModel):
     team_id: str
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
+    is_overdue: bool = False
+    completed_at: Optional[datetime] = None  # set when status becomes concluida, cleared on reopen
+    archived_at: Optional[datetime] = None
+    blocked_by: List[str] = Field(default_factory=list)  # ids of tasks that must finish first
 
 class TaskCreate(BaseModel):
     title: str
@@ -126,6 +431,63 @@ class CommentCreate(BaseModel):
     task_id: str
     content: str
 
+class TaskEvent(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    task_id: str
+    team_id: str
+    user_id: str
+    from_status: Optional[str] = None
+    to_status: str
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class BoardColumn(BaseModel):
+    status: str
+    count: int
+    tasks: List[Task]
+    next_cursor: Optional[str] = None
+
+class Board(BaseModel):
+    columns: List[BoardColumn]
+
+class TaskTombstone(BaseModel):
+    task_id: str
+    team_id: str
+    reason: str  # deleted, archived
+    deleted_at: datetime
+
+class TaskBlockerCreate(BaseModel):
+    blocker_id: str
+
+class TaskBlocker(BaseModel):
+    id: str
+    title: str
+    status: str
+    responsible_user_id: str
+    depth: int  # 1 for a direct blocker
+
+class DependencyGraph(BaseModel):
+    team_id: str
+    order: List[str]  # blockers before the tasks they block
+    blocked: List[str]  # tasks with an open blocker anywhere upstream
+    cycles: List[str] = []
+
+class WorkloadEntry(BaseModel):
+    user_id: str
+    name: Optional[str] = None  # None once the user left the team
+    open: int = 0
+    overdue: int = 0
+    by_urgency: dict = {}
+
+class TeamWorkload(BaseModel):
+    team_id: str
+    members: List[WorkloadEntry]
+
+class TaskChanges(BaseModel):
+    tasks: List[Task]
+    deleted: List[TaskTombstone]
+    sync_token: str
+    has_more: bool = False
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -137,6 +499,39 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+# Fire-and-forget work; the set keeps the tasks referenced until they finish
+detached_tasks: set = set()
+
+def run_detached(coro) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    detached_tasks.add(task)
+    task.add_done_callback(detached_tasks.discard)
+    return task
+
+async def rehash_password(user_id: str, field: str, old_hash: str, password: str):
+    """Replace a hash made with an outdated bcrypt cost, unless the password changed meanwhile"""
+    try:
+        new_hash = await asyncio.get_running_loop().run_in_executor(None, get_password_hash, password)
+        await db.users.update_one({"id": user_id, field: old_hash}, {"$set": {field: new_hash}})
+    except Exception:
+        logger.exception(f"Could not rehash password for user {user_id}")
+
+# Bcrypt is CPU bound, so bulk hashing is spread over a process pool. Workers
+# are spawned rather than forked: a fork would copy the running event loop and
+# the Motor client's threads. get_password_hash is module level, so spawned
+# workers can import it.
+password_hash_pool: Optional[ProcessPoolExecutor] = None
+
+async def hash_passwords(passwords: List[str]) -> List[str]:
+    global password_hash_pool
+    if password_hash_pool is None:
+        password_hash_pool = ProcessPoolExecutor(mp_context=get_context("spawn"))
+    loop = asyncio.get_running_loop()
+    return await asyncio.gather(*[
+        loop.run_in_executor(password_hash_pool, get_password_hash, password)
+        for password in passwords
+    ])
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -154,17 +549,44 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+        with span("auth.jwt_decode"):
+            payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
-        user = await db.users.find_one({"email": email})
-        if user is None:
-            raise credentials_exception
-        return User(**user)
+        user = auth_user_cache.get(email)
+        with span("auth.user_lookup", cache_hit=user is not None):
+            if user is None:
+                version = auth_user_cache.version
+                user = await db.users.find_one({"email": email})
+                if user is None:
+                    raise credentials_exception
+                auth_user_cache.set(email, user, version)
+        with span("pydantic.validate", model="User", count=1):
+            return User(**user)
     except jwt.PyJWTError:
         raise credentials_exception
 
+def fold_text(value: str) -> str:
+    """Lowercase and strip accents so "João" and "joao" share an index prefix"""
+    decomposed = unicodedata.normalize("NFKD", value)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold().strip()
+
+def user_search_fields(name: str, email: str) -> dict:
+    return {"name_folded": fold_text(name), "email_folded": fold_text(email)}
+
+def validation_error_detail(exc: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in exc.errors())
+
+def encode_cursor(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload, default=str).encode()).decode()
+
+def decode_cursor(cursor: str):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 async def get_admin_user(current_user: User = Depends(get_current_user)):
     if not current_user.is_admin:
         raise HTTPException(
@@ -174,12 +596,381 @@ async def get_admin_user(current_user: User = Depends(get_current_user)):
     return current_user
 
 # Email utility
-async def send_notification_email(user_email: str, task_title: str, task_description: str):
+async def send_notification_email(user_email: str, task_title: str, task_description: str, subject: str = "New task"):
     """Send email notification (placeholder - you'll need to configure Gmail SMTP)"""
     # For now, just log the email
-    logging.info(f"EMAIL NOTIFICATION: To {user_email} - New task: {task_title}")
+    with span("notification.email", subject=subject):
+        logging.info(f"EMAIL NOTIFICATION: To {user_email} - {subject}: {task_title}")
     # TODO: Implement actual email sending with Gmail SMTP
 
+# Notification digest utilities
+# Pending notifications of a digest-mode user accumulate in one
+# notification_digests document per recipient, so they survive restarts; any
+# worker may send a due digest. It claims it with claimed_at and deletes it
+# only once the email went out.
+async def notify_task_assigned(user: dict, task: Task):
+    mode = user.get("notification_mode", "immediate")
+    with span("notification.dispatch", mode=mode):
+        if mode != "digest":
+            await send_notification_email(user["email"], task.title, task.description or "")
+            return
+        now = datetime.utcnow()
+        await db.notification_digests.update_one(
+            {"user_id": user["id"]},
+            {
+                "$push": {"items": {"$each": [{"task_id": task.id, "title": task.title}], "$slice": NOTIFICATION_DIGEST_MAX_ITEMS}},
+                "$inc": {"count": 1},
+                "$set": {"email": user["email"]},
+                "$setOnInsert": {"created_at": now, "send_after": now + timedelta(minutes=NOTIFICATION_DIGEST_MINUTES)},
+            },
+            upsert=True,
+        )
+
+def digest_summary(digest: dict) -> str:
+    lines = [f"- {item['title']}" for item in digest["items"]]
+    if digest["count"] > len(lines):
+        lines.append(f"... and {digest['count'] - len(lines)} more")
+    return "\n".join(lines)
+
+async def finish_digest(digest: dict):
+    """Delete a sent digest, keeping whatever was added to it while sending"""
+    result = await db.notification_digests.delete_one({"_id": digest["_id"], "count": digest["count"]})
+    if result.deleted_count:
+        return
+    await db.notification_digests.update_one(
+        {"_id": digest["_id"]},
+        {
+            "$pull": {"items": {"task_id": {"$in": [item["task_id"] for item in digest["items"]]}}},
+            "$inc": {"count": -digest["count"]},
+            "$set": {"send_after": datetime.utcnow() + timedelta(minutes=NOTIFICATION_DIGEST_MINUTES)},
+            "$unset": {"claimed_at": ""},
+        },
+    )
+
+async def send_digest(digest: dict):
+    await send_notification_email(
+        digest["email"],
+        f"{digest['count']} new tasks",
+        digest_summary(digest),
+        subject="Task digest",
+    )
+    await finish_digest(digest)
+
+async def send_due_digests() -> int:
+    """Claim and send up to NOTIFICATION_DIGEST_BATCH_SIZE due digests"""
+    digests = []
+    while len(digests) < NOTIFICATION_DIGEST_BATCH_SIZE:
+        now = datetime.utcnow()
+        digest = await db.notification_digests.find_one_and_update(
+            {
+                "send_after": {"$lte": now},
+                "$or": [
+                    {"claimed_at": None},
+                    {"claimed_at": {"$lt": now - timedelta(seconds=NOTIFICATION_DIGEST_CLAIM_SECONDS)}},
+                ],
+            },
+            {"$set": {"claimed_at": now}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if digest is None:
+            break
+        digests.append(digest)
+    results = await asyncio.gather(*(send_digest(digest) for digest in digests), return_exceptions=True)
+    for digest, result in zip(digests, results):
+        if isinstance(result, Exception):
+            # Still claimed, so it is retried once the claim goes stale
+            logger.error(f"Could not send notification digest to {digest['email']}", exc_info=result)
+    return len(digests)
+
+async def run_digest_sender():
+    while True:
+        try:
+            while await send_due_digests() == NOTIFICATION_DIGEST_BATCH_SIZE:
+                pass
+        except Exception:
+            logger.exception("Notification digest sender failed")
+        await asyncio.sleep(NOTIFICATION_DIGEST_POLL_SECONDS)
+
+# Sparse fieldsets
+# ?fields=id,title,status trims both the Mongo projection and the response.
+# The trimmed response models are built once per model and field set.
+SPARSE_MODELS_MAX = 256
+sparse_models: dict = {}
+
+def parse_fields(fields: Optional[str], model) -> Optional[tuple]:
+    """Validate a ?fields= list against the model; None when every field is wanted"""
+    if not fields:
+        return None
+    names = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = sorted(names - set(model.model_fields))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    # id is always returned so clients can merge partial rows
+    names.add("id")
+    return tuple(name for name in model.model_fields if name in names)
+
+def fields_projection(names: Optional[tuple], *required: str) -> Optional[dict]:
+    """Mongo projection for the fields, plus any the endpoint itself needs"""
+    if names is None:
+        return None
+    return {"_id": 0, **{name: 1 for name in (*names, *required)}}
+
+def sparse_model(model, names: tuple):
+    key = (model, names)
+    sparse = sparse_models.get(key)
+    if sparse is None:
+        sparse = create_model(
+            f"{model.__name__}Fields",
+            **{name: (model.model_fields[name].annotation, model.model_fields[name]) for name in names}
+        )
+        if len(sparse_models) >= SPARSE_MODELS_MAX:
+            sparse_models.pop(next(iter(sparse_models)))
+        sparse_models[key] = sparse
+    return sparse
+
+def sparse_dump(model, names: tuple, documents):
+    """Validate documents (a list or a single one) with the trimmed model, ready for JSONResponse"""
+    sparse = sparse_model(model, names)
+    if isinstance(documents, dict):
+        return jsonable_encoder(sparse(**documents))
+    return [jsonable_encoder(sparse(**document)) for document in documents]
+
+# Cache invalidation bus
+# Every worker tails the capped cache_events collection and evicts the keys
+# other workers publish, so in-process caches stay coherent without a broker.
+cache_registry: dict = {}
+
+class LocalCache:
+    """In-process cache that the invalidation bus can evict by namespace"""
+    def __init__(self, namespace: str, ttl_seconds: Optional[float] = None, max_entries: Optional[int] = None):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = {}
+        # Bumped on every eviction, so a value computed before one can be dropped
+        self.version = 0
+        cache_registry[namespace] = self
+    
+    def get(self, key, default=None):
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        value, expires_at = entry
+        if expires_at is not None and expires_at < time.monotonic():
+            self._entries.pop(key, None)
+            return default
+        # Move the hit to the end, so eviction drops the least recently used key
+        self._entries[key] = self._entries.pop(key)
+        return value
+    
+    def set(self, key, value, version: Optional[int] = None):
+        """Store value; when version is given, skip it if an eviction happened since"""
+        if version is not None and version != self.version:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        self._entries.pop(key, None)
+        self._entries[key] = (value, expires_at)
+        if self.max_entries and len(self._entries) > self.max_entries:
+            # Dicts keep insertion order, so the first key is the least recently used
+            self._entries.pop(next(iter(self._entries)))
+    
+    def write_through(self, key, update):
+        """Replace a cached value with update(value), if cached, and discard loads already in flight"""
+        self.version += 1
+        value = self.get(key)
+        if value is not None:
+            self.set(key, update(value))
+    
+    def evict(self, keys: Optional[List[str]] = None):
+        """Evict the given keys, or everything when keys is None"""
+        self.version += 1
+        if keys is None:
+            self._entries.clear()
+            return
+        for key in keys:
+            self._entries.pop(key, None)
+
+def apply_invalidation(namespace: str, keys: Optional[List[str]] = None):
+    cache = cache_registry.get(namespace)
+    if cache:
+        cache.evict(keys)
+    for flight in single_flight_registry.values():
+        if flight.namespace == namespace:
+            flight.forget(keys)
+
+# Set once cache_events is known to be capped; an insert before that would
+# create it as a plain collection that cannot be tailed
+cache_events_ready = asyncio.Event()
+
+async def _insert_cache_event(event: dict):
+    try:
+        await cache_events_ready.wait()
+        await db.cache_events.insert_one(event)
+    except Exception:
+        logger.exception("Could not publish cache invalidation")
+
+def publish_invalidation(namespace: str, keys: Optional[List[str]] = None, local: bool = True):
+    """Evict keys locally right away and broadcast the eviction to the other workers.
+    
+    Pass local=False when the caller already updated its own cache write-through.
+    """
+    if local:
+        apply_invalidation(namespace, keys)
+    event = {
+        "worker_id": WORKER_ID,
+        "namespace": namespace,
+        "keys": keys,
+        "created_at": datetime.utcnow(),
+    }
+    run_detached(_insert_cache_event(event))
+
+async def ensure_cache_events_collection():
+    try:
+        await db.create_collection("cache_events", capped=True, size=CACHE_EVENTS_MAX_BYTES)
+    except CollectionInvalid:
+        if not (await db.cache_events.options()).get("capped"):
+            # Created plain by an older worker; the events are disposable
+            logger.warning("cache_events is not capped, converting it")
+            await db.command("convertToCapped", "cache_events", size=CACHE_EVENTS_MAX_BYTES)
+    cache_events_ready.set()
+
+def evict_all_caches():
+    for namespace in list(cache_registry):
+        apply_invalidation(namespace)
+
+async def run_invalidation_listener(worker_id: str = WORKER_ID):
+    await cache_events_ready.wait()
+    while True:
+        try:
+            # ObjectIds from different workers are not ordered, so instead of
+            # resuming after the last event seen, evict everything that may have
+            # been missed and tail from the current end of the collection. An
+            # empty collection has nothing to skip (its cursor dies right away).
+            latest = await db.cache_events.find_one({}, {"_id": 1}, sort=[("$natural", -1)])
+            skip_until = latest["_id"] if latest else None
+            if skip_until is not None:
+                evict_all_caches()
+            cursor = db.cache_events.find(
+                cursor_type=CursorType.TAILABLE_AWAIT,
+                max_await_time_ms=CACHE_EVENTS_AWAIT_MS,
+            )
+            while cursor.alive:
+                async for event in cursor:
+                    if skip_until is not None:
+                        if event["_id"] == skip_until:
+                            skip_until = None
+                        continue
+                    if event.get("worker_id") != worker_id:
+                        apply_invalidation(event["namespace"], event.get("keys"))
+                # The backlog is drained even if its last event was capped away meanwhile
+                skip_until = None
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Cache invalidation listener failed")
+        # A tailable cursor on an empty capped collection dies immediately
+        await asyncio.sleep(1)
+
+dashboard_stats_cache = LocalCache("stats", ttl_seconds=DASHBOARD_STATS_TTL_SECONDS)
+
+def invalidate_team_stats(team_id: Optional[str]):
+    publish_invalidation("stats", [team_id, "*"])
+
+# Request coalescing
+# Concurrent identical reads (same endpoint and scope) share one in-flight
+# computation. Keys are tuples whose first item is the scope; an invalidation
+# of that scope detaches the in-flight call so later callers start afresh.
+single_flight_registry: dict = {}
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one shared awaitable"""
+    def __init__(self, name: str, namespace: Optional[str] = None):
+        self.name = name
+        self.namespace = namespace
+        self.executed = 0
+        self.coalesced = 0
+        self._calls = {}
+        single_flight_registry[name] = self
+    
+    async def do(self, key: tuple, func):
+        future = self._calls.get(key)
+        if future is None:
+            self.executed += 1
+            future = asyncio.ensure_future(func())
+            self._calls[key] = future
+            future.add_done_callback(lambda done: self._finished(key, done))
+        else:
+            self.coalesced += 1
+        # Shielded: a caller that disconnects must not cancel the others' result
+        return await asyncio.shield(future)
+    
+    def _finished(self, key: tuple, future: asyncio.Future):
+        if self._calls.get(key) is future:
+            del self._calls[key]
+        if not future.cancelled():
+            # Mark the exception retrieved when every waiter has gone away
+            future.exception()
+    
+    def forget(self, scopes: Optional[List[str]] = None):
+        """Detach in-flight calls for the given scopes, or all when scopes is None"""
+        for key in list(self._calls):
+            if scopes is None or key[0] in scopes:
+                del self._calls[key]
+    
+    def metrics(self) -> dict:
+        total = self.executed + self.coalesced
+        return {
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._calls),
+            "saved_ratio": round(self.coalesced / total, 3) if total else 0.0,
+        }
+
+# Task writes publish on the "stats" namespace, keyed by team
+dashboard_stats_flight = SingleFlight("dashboard_stats", namespace="stats")
+task_list_flight = SingleFlight("task_list", namespace="stats")
+
+# Directory cache
+# Teams and memberships change rarely, so /teams and /users are served from
+# memory. The worker that writes updates its copy write-through; the others
+# evict theirs through the bus and reload on the next request.
+team_cache = LocalCache("teams")  # "all" -> {team_id: team}
+member_cache = LocalCache("users")  # team_id, or "*" for everyone -> [UserResponse dict]
+auth_user_cache = LocalCache("auth", ttl_seconds=AUTH_USER_CACHE_SECONDS)  # email -> user
+
+async def cached_teams() -> dict:
+    teams = team_cache.get("all")
+    if teams is None:
+        version = team_cache.version
+        teams = {team["id"]: team for team in await db.teams.find({}, {"_id": 0}).batch_size(1000).to_list(None)}
+        team_cache.set("all", teams, version)
+    return teams
+
+async def cached_members(team_id: Optional[str]) -> List[dict]:
+    """Members of a team, or every user when team_id is None"""
+    key = team_id or "*"
+    users = member_cache.get(key)
+    if users is None:
+        version = member_cache.version
+        projection = {"_id": 0, **{field: 1 for field in UserResponse.model_fields}}
+        users = await db.users.find({"team_id": team_id} if team_id else {}, projection).batch_size(1000).to_list(1000)
+        member_cache.set(key, users, version)
+    return users
+
+def cache_team_written(team: Team):
+    team_dict = team.dict()
+    team_cache.write_through("all", lambda teams: {**teams, team.id: team_dict})
+    publish_invalidation("teams", local=False)
+
+def cache_user_written(user: User):
+    user_dict = UserResponse(**user.dict()).dict()
+    keys = [user.team_id, "*"] if user.team_id else ["*"]
+    for key in keys:
+        member_cache.write_through(key, lambda users: [u for u in users if u["id"] != user.id] + [user_dict])
+    auth_user_cache.evict([user.email])
+    publish_invalidation("users", keys, local=False)
+    publish_invalidation("auth", [user.email], local=False)
+
 # Auth Routes
 @api_router.post("/auth/register", response_model=UserResponse)
 async def register(user: UserCreate):
@@ -197,18 +988,23 @@ async def register(user: UserCreate):
     user_dict["password_hash"] = hashed_password
     user_obj = User(**user_dict)
     
-    await db.users.insert_one(user_obj.dict())
+    await db.users.insert_one({**user_obj.dict(), **user_search_fields(user_obj.name, user_obj.email)})
+    cache_user_written(user_obj)
     return UserResponse(**user_obj.dict())
 
 @api_router.post("/auth/login", response_model=Token)
 async def login(user_login: UserLogin):
     user = await db.users.find_one({"email": user_login.email})
-    if not user or not verify_password(user_login.password, user["hashed_password"]):
+    # Accounts store password_hash; hashed_password is the legacy name
+    field = "password_hash" if user and "password_hash" in user else "hashed_password"
+    if not user or field not in user or not verify_password(user_login.password, user[field]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if pwd_context.needs_update(user[field]):
+        run_detached(rehash_password(user["id"], field, user[field], user_login.password))
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user["email"]}, expires_delta=access_token_expires
@@ -236,28 +1032,277 @@ async def create_user_by_admin(user: UserCreate, admin: User = Depends(get_admin
     user_dict["password_hash"] = hashed_password
     user_obj = User(**user_dict)
     
-    await db.users.insert_one(user_obj.dict())
+    await db.users.insert_one({**user_obj.dict(), **user_search_fields(user_obj.name, user_obj.email)})
+    cache_user_written(user_obj)
     return UserResponse(**user_obj.dict())
 
 @api_router.get("/admin/users", response_model=List[UserResponse])
-async def get_all_users(admin: User = Depends(get_admin_user)):
-    users = await db.users.find().to_list(1000)
-    return [UserResponse(**user) for user in users]
+async def get_all_users(fields: Optional[str] = None, admin: User = Depends(get_admin_user)):
+    names = parse_fields(fields, UserResponse)
+    users = await db.users.find({}, fields_projection(names)).batch_size(1000).to_list(1000)
+    if names:
+        return JSONResponse(sparse_dump(UserResponse, names, users))
+    return build_models(UserResponse, users)
+
+@api_router.get("/admin/single-flight")
+async def get_single_flight_metrics(admin: User = Depends(get_admin_user)):
+    """Computations executed and saved by request coalescing, per endpoint"""
+    return {name: flight.metrics() for name, flight in single_flight_registry.items()}
+
+def check_user_import_size(count: int):
+    if count > USER_IMPORT_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {USER_IMPORT_MAX_ROWS} users per import")
+
+async def import_users(rows: List[dict]) -> UserImportReport:
+    """Validate, de-duplicate, hash and insert users in chunks, reporting failures per row"""
+    check_user_import_size(len(rows))
+    
+    failures: List[UserImportRowResult] = []
+    valid = []
+    for row_number, row in enumerate(rows, start=1):
+        try:
+            valid.append((row_number, UserCreate(**row)))
+        except ValidationError as exc:
+            email = row.get("email")
+            failures.append(UserImportRowResult(
+                row=row_number,
+                email=str(email) if email is not None else None,
+                status="invalid",
+                detail=validation_error_detail(exc)
+            ))
+    
+    # One query finds every email that is already registered
+    emails = [user.email for _, user in valid]
+    existing = set(await db.users.distinct("email", {"email": {"$in": emails}})) if emails else set()
+    
+    pending = []
+    seen = set()
+    for row_number, user in valid:
+        if user.email in existing or user.email in seen:
+            failures.append(UserImportRowResult(row=row_number, email=user.email, status="duplicate", detail="Email already registered"))
+            continue
+        seen.add(user.email)
+        pending.append((row_number, user))
+    
+    created = 0
+    teams = set()
+    for start in range(0, len(pending), USER_IMPORT_CHUNK_SIZE):
+        chunk = pending[start:start + USER_IMPORT_CHUNK_SIZE]
+        hashes = await hash_passwords([user.password for _, user in chunk])
+        
+        documents = []
+        for (row_number, user), hashed_password in zip(chunk, hashes):
+            user_dict = user.dict()
+            del user_dict["password"]
+            user_dict["password_hash"] = hashed_password
+            user_obj = User(**user_dict)
+            documents.append({**user_obj.dict(), **user_search_fields(user_obj.name, user_obj.email)})
+            teams.add(user_obj.team_id)
+        
+        try:
+            await db.users.insert_many(documents, ordered=False)
+            created += len(documents)
+        except BulkWriteError as exc:
+            failed_indexes = {error["index"] for error in exc.details["writeErrors"]}
+            created += len(documents) - len(failed_indexes)
+            for error in exc.details["writeErrors"]:
+                row_number, user = chunk[error["index"]]
+                failures.append(UserImportRowResult(row=row_number, email=user.email, status="failed", detail=error.get("errmsg")))
+        
+        logger.info(f"User import progress: {min(start + len(chunk), len(pending))}/{len(pending)} rows written")
+    
+    if teams:
+        publish_invalidation("users", list(teams) + ["*"])
+    failures.sort(key=lambda result: result.row)
+    return UserImportReport(total=len(rows), created=created, failed=len(failures), failures=failures)
+
+@api_router.post("/admin/users/import", response_model=UserImportReport)
+async def import_users_json(rows: List[dict], admin: User = Depends(get_admin_user)):
+    return await import_users(rows)
+
+@api_router.post("/admin/users/import/csv", response_model=UserImportReport)
+async def import_users_csv(file: UploadFile = File(...), admin: User = Depends(get_admin_user)):
+    """CSV with an email,name,password[,team_id] header"""
+    reader = csv.DictReader(codecs.iterdecode(file.file, "utf-8-sig"))
+    rows = []
+    for row in reader:
+        # Stop reading as soon as the upload goes over the limit
+        check_user_import_size(len(rows) + 1)
+        rows.append({key: value for key, value in row.items() if value not in (None, "")})
+    return await import_users(rows)
 
 # User Routes
 @api_router.get("/users", response_model=List[UserResponse])
-async def get_team_users(current_user: User = Depends(get_current_user)):
+async def get_team_users(fields: Optional[str] = None, current_user: User = Depends(get_current_user)):
     """Get users from the same team as the current user"""
+    names = parse_fields(fields, UserResponse)
     if current_user.is_admin:
         # Admin can see all users
-        users = await db.users.find().to_list(1000)
+        users = await cached_members(None)
     else:
         # Regular users can only see users from their team
         if current_user.team_id:
-            users = await db.users.find({"team_id": current_user.team_id}).to_list(1000)
+            users = await cached_members(current_user.team_id)
         else:
             users = []
-    return [UserResponse(**user) for user in users]
+    if names:
+        return JSONResponse(sparse_dump(UserResponse, names, users))
+    return build_models(UserResponse, users)
+
+@api_router.get("/users/me/notifications", response_model=NotificationPreferences)
+async def get_notification_preferences(current_user: User = Depends(get_current_user)):
+    return NotificationPreferences(mode=current_user.notification_mode)
+
+@api_router.put("/users/me/notifications", response_model=NotificationPreferences)
+async def update_notification_preferences(
+    preferences: NotificationPreferences,
+    current_user: User = Depends(get_current_user)
+):
+    await db.users.update_one({"id": current_user.id}, {"$set": {"notification_mode": preferences.mode}})
+    publish_invalidation("auth", [current_user.email])
+    return preferences
+
+@api_router.get("/users/search", response_model=UserSearchPage)
+async def search_users(
+    q: str = "",
+    team_id: Optional[str] = None,
+    ids: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_user)
+):
+    """Page through users by case-folded name or email prefix, or look up a comma-separated list of ids"""
+    if not current_user.is_admin:
+        if team_id and team_id != current_user.team_id:
+            raise HTTPException(status_code=403, detail="Not authorized for this team")
+        if not current_user.team_id:
+            return UserSearchPage(items=[])
+        team_id = current_user.team_id
+    
+    conditions = []
+    if team_id:
+        conditions.append({"team_id": team_id})
+    if q:
+        prefix = {"$regex": "^" + re.escape(fold_text(q))}
+        conditions.append({"$or": [{"name_folded": prefix}, {"email_folded": prefix}]})
+    if ids:
+        conditions.append({"id": {"$in": [user_id.strip() for user_id in ids.split(",") if user_id.strip()]}})
+    if cursor:
+        try:
+            after_name, after_id = decode_cursor(cursor)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        conditions.append({"$or": [
+            {"name_folded": {"$gt": after_name}},
+            {"name_folded": after_name, "id": {"$gt": after_id}}
+        ]})
+    
+    users = await db.users.find(
+        {"$and": conditions} if conditions else {},
+        {"_id": 0, "id": 1, "name": 1, "email": 1, "name_folded": 1}
+    ).sort([("name_folded", 1), ("id", 1)]).limit(limit + 1).to_list(limit + 1)
+    
+    next_cursor = None
+    if len(users) > limit:
+        users = users[:limit]
+        next_cursor = encode_cursor([users[-1]["name_folded"], users[-1]["id"]])
+    return UserSearchPage(items=build_models(UserSummary, users), next_cursor=next_cursor)
+
+# Tenant routing
+# The routing table lives on teams.tenant: a team with a placement keeps its
+# task data in a dedicated database and/or prefixed collections, every other
+# team shares the main database. Users, teams and the caches stay global.
+TENANT_COLLECTIONS = ["tasks", "tasks_archive", "comments", "comments_archive", "task_tombstones", "task_events"]
+TENANT_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_-]*$")
+# MongoDB's own databases can never hold a tenant
+RESERVED_DATABASE_NAMES = {"admin", "local", "config"}
+
+READ_PREFERENCE_MODES = {
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+def route_read_preference(route: str):
+    mode = ROUTE_READ_PREFERENCES.get(route, "primary")
+    if mode == "primary":
+        return Primary()
+    if mode not in READ_PREFERENCE_MODES:
+        raise ValueError(f"Unknown read preference {mode!r} for route {route!r}")
+    return READ_PREFERENCE_MODES[mode](max_staleness=READ_MAX_STALENESS_SECONDS)
+
+# Fail at startup rather than on the first request of a misconfigured route
+for _route in ROUTE_READ_PREFERENCES:
+    route_read_preference(_route)
+
+class TenantCollections:
+    """The task, comment and history collections of one tenant"""
+    def __init__(self, database, prefix: str = "", read_preference=None):
+        self.key = (database.name, prefix)
+        self.database = database
+        for name in TENANT_COLLECTIONS:
+            collection = database[prefix + name]
+            if read_preference is not None:
+                collection = collection.with_options(read_preference=read_preference)
+            setattr(self, name, collection)
+        self._readers = {}
+    
+    def for_reads(self, route: str) -> "TenantCollections":
+        """The same collections, read with the route's configured read preference"""
+        if route not in self._readers:
+            self._readers[route] = TenantCollections(self.database, self.key[1], route_read_preference(route))
+        return self._readers[route]
+
+default_tenant = TenantCollections(db)
+
+class TenantRouter:
+    """Resolve teams to their tenant from a cached copy of the routing table"""
+    def __init__(self):
+        self._tenants = {default_tenant.key: default_tenant}
+        self._routes = LocalCache("tenants")
+    
+    def tenant(self, placement: Optional[dict]) -> TenantCollections:
+        if not placement:
+            return default_tenant
+        database = client[placement["database"]] if placement.get("database") else db
+        key = (database.name, placement.get("collection_prefix") or "")
+        if key not in self._tenants:
+            self._tenants[key] = TenantCollections(database, key[1])
+        return self._tenants[key]
+    
+    async def routes(self) -> dict:
+        """team_id -> tenant, for the teams that have a placement"""
+        routes = self._routes.get("routes")
+        if routes is None:
+            version = self._routes.version
+            teams = await db.teams.find(
+                {"tenant": {"$ne": None}}, {"_id": 0, "id": 1, "tenant": 1}
+            ).to_list(None)
+            routes = {team["id"]: self.tenant(team["tenant"]) for team in teams}
+            self._routes.set("routes", routes, version)
+        return routes
+    
+    async def for_team(self, team_id: Optional[str]) -> TenantCollections:
+        return (await self.routes()).get(team_id, default_tenant)
+    
+    async def all(self) -> List[TenantCollections]:
+        tenants = {default_tenant.key: default_tenant}
+        for tenant in (await self.routes()).values():
+            tenants[tenant.key] = tenant
+        return list(tenants.values())
+    
+    async def for_scope(self, team_id: Optional[str]) -> List[TenantCollections]:
+        """The tenant of one team, or every tenant for a cross-team (admin) scope"""
+        if team_id:
+            return [await self.for_team(team_id)]
+        return await self.all()
+
+tenant_router = TenantRouter()
+
+async def fan_out(tenants: List[TenantCollections], func) -> list:
+    """Run func(tenant) on every tenant concurrently, results in tenant order"""
+    return await asyncio.gather(*(func(tenant) for tenant in tenants))
 
 # Team Routes
 @api_router.post("/teams", response_model=Team)
@@ -266,108 +1311,1618 @@ async def create_team(team: TeamCreate, admin: User = Depends(get_admin_user)):
     team_dict["created_by"] = admin.id
     team_obj = Team(**team_dict)
     await db.teams.insert_one(team_obj.dict())
+    cache_team_written(team_obj)
     return team_obj
 
 @api_router.get("/teams", response_model=List[Team])
 async def get_teams(current_user: User = Depends(get_current_user)):
+    teams = await cached_teams()
     if current_user.is_admin:
-        teams = await db.teams.find().to_list(1000)
+        return build_models(Team, teams.values())
+    team = teams.get(current_user.team_id)
+    return [Team(**team)] if team else []
+
+@api_router.put("/admin/teams/{team_id}/tenant", response_model=Team)
+async def set_team_tenant(team_id: str, placement: TenantPlacement, admin: User = Depends(get_admin_user)):
+    """Place a team in a dedicated database or prefixed collections (empty placement: shared)"""
+    if not TENANT_NAME_PATTERN.match(placement.database or "") or not TENANT_NAME_PATTERN.match(placement.collection_prefix):
+        raise HTTPException(status_code=400, detail="Invalid database name or collection prefix")
+    if (placement.database or "").lower() in RESERVED_DATABASE_NAMES:
+        raise HTTPException(status_code=400, detail=f"Database {placement.database!r} is reserved by MongoDB")
+    team = await db.teams.find_one({"id": team_id})
+    if not team:
+        raise HTTPException(status_code=404, detail="Team not found")
+    
+    # Existing data is not moved, so only teams without tasks can change tenant
+    current = await tenant_router.for_team(team_id)
+    if await current.tasks.find_one({"team_id": team_id}) or await current.tasks_archive.find_one({"team_id": team_id}):
+        raise HTTPException(status_code=409, detail="Team already has tasks in its current tenant")
+    
+    tenant_doc = placement.dict() if placement.database or placement.collection_prefix else None
+    await ensure_tenant_indexes(tenant_router.tenant(tenant_doc))
+    updated = await db.teams.find_one_and_update(
+        {"id": team_id}, {"$set": {"tenant": tenant_doc}}, return_document=ReturnDocument.AFTER
+    )
+    team_obj = Team(**updated)
+    cache_team_written(team_obj)
+    publish_invalidation("tenants")
+    invalidate_team_stats(team_id)
+    return team_obj
+
+# Idempotency utilities
+# Completed responses are kept in Mongo (TTL-indexed) and, for quick replays,
+# in a small in-process cache in front of it
+idempotency_cache = LocalCache("idempotency", ttl_seconds=IDEMPOTENCY_CACHE_SECONDS, max_entries=IDEMPOTENCY_CACHE_MAX_ENTRIES)
+
+def request_fingerprint(payload: dict) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+async def begin_idempotent_request(key: Optional[str], user_id: str, route: str, payload: dict) -> Optional[dict]:
+    """Claim an Idempotency-Key; returns the stored response when the request already completed"""
+    if not key:
+        return None
+    
+    fingerprint = request_fingerprint(payload)
+    cached = idempotency_cache.get((user_id, route, key))
+    if cached is None:
+        now = datetime.utcnow()
+        try:
+            await db.idempotency_keys.insert_one({
+                "key": key,
+                "user_id": user_id,
+                "route": route,
+                "fingerprint": fingerprint,
+                "status": "in_progress",
+                "created_at": now,
+                "claimed_at": now,
+            })
+            return None
+        except DuplicateKeyError:
+            cached = await db.idempotency_keys.find_one({"key": key, "user_id": user_id, "route": route})
+            if cached is None:
+                raise HTTPException(status_code=409, detail="Idempotency-Key is being released, retry")
+    
+    if cached["fingerprint"] != fingerprint:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+    if cached["status"] != "done":
+        claimed_at = cached.get("claimed_at") or cached["created_at"]
+        if claimed_at < datetime.utcnow() - timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS):
+            # The claimant crashed; take the claim over unless another retry got there first
+            taken = await db.idempotency_keys.update_one(
+                {"_id": cached["_id"], "status": "in_progress", "claimed_at": cached.get("claimed_at")},
+                {"$set": {"claimed_at": datetime.utcnow()}},
+            )
+            if taken.modified_count:
+                return None
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+    
+    idempotency_cache.set((user_id, route, key), cached)
+    return cached["response"]
+
+def idempotent_document_id(key: str, user_id: str, route: str, payload: dict) -> str:
+    """Id of what a keyed request creates; stored as _id, so the insert of a
+    retry that took over a stale claim collides with the first attempt's"""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{route}:{user_id}:{key}:{request_fingerprint(payload)}"))
+
+async def complete_idempotent_request(key: Optional[str], user_id: str, route: str, response: dict):
+    if not key:
+        return
+    record = await db.idempotency_keys.find_one_and_update(
+        {"key": key, "user_id": user_id, "route": route},
+        {"$set": {"status": "done", "response": response}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if record:
+        idempotency_cache.set((user_id, route, key), record)
+
+async def release_idempotent_request(key: Optional[str], user_id: str, route: str):
+    """Forget a claimed key after a failed request so the client can retry it"""
+    if key:
+        await db.idempotency_keys.delete_one({"key": key, "user_id": user_id, "route": route, "status": "in_progress"})
+
+# Task access utilities
+async def find_task(
+    task_id: str,
+    include_archived: bool = False,
+    team_id: Optional[str] = None,
+    projection: Optional[dict] = None
+):
+    """Look a task up in the team's tenant, or in every tenant when team_id is None"""
+    async def find_in(tenant: TenantCollections):
+        task = await tenant.tasks.find_one({"id": task_id}, projection)
+        if not task and include_archived:
+            task = await tenant.tasks_archive.find_one({"id": task_id}, projection)
+        return task
+    
+    found = [task for task in await fan_out(await tenant_router.for_scope(team_id), find_in) if task]
+    return found[0] if found else None
+
+async def get_task_document_for_user(
+    task_id: str,
+    current_user: User,
+    include_archived: bool = False,
+    projection: Optional[dict] = None
+) -> dict:
+    """Load a task document (team_id is always fetched) and check that the user may access its team"""
+    if projection is not None:
+        projection = {**projection, "team_id": 1}
+    team_id = None if current_user.is_admin else current_user.team_id
+    task = await find_task(task_id, include_archived, team_id, projection)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    if not current_user.is_admin and current_user.team_id != task["team_id"]:
+        raise HTTPException(status_code=403, detail="Not authorized for this team")
+    
+    return task
+
+async def get_task_for_user(task_id: str, current_user: User, include_archived: bool = False) -> Task:
+    """Load a task and check that the user may access its team"""
+    return Task(**await get_task_document_for_user(task_id, current_user, include_archived))
+
+# Task history utilities
+class TaskEventBuffer:
+    """Write-behind buffer for task_events, flushed with insert_many on size or time"""
+    def __init__(self, batch_size: int, max_buffered: int):
+        self.batch_size = batch_size
+        self.max_buffered = max_buffered
+        self._events: List[dict] = []
+        self._in_flight: List[dict] = []
+        self._lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+    
+    def append(self, event: TaskEvent):
+        self._events.append(event.dict())
+        if len(self._events) > self.max_buffered:
+            dropped = len(self._events) - self.max_buffered
+            del self._events[:dropped]
+            logger.warning(f"Task event buffer full, dropped {dropped} events")
+        if len(self._events) >= self.batch_size and not self._lock.locked():
+            self._flush_task = asyncio.create_task(self.flush())
+    
+    def pending(self, task_id: str) -> List[dict]:
+        return [e for e in self._in_flight + self._events if e["task_id"] == task_id]
+    
+    async def flush(self):
+        async with self._lock:
+            while self._events:
+                batch, self._events = self._events[:self.batch_size], self._events[self.batch_size:]
+                self._in_flight = batch
+                try:
+                    by_tenant = {}
+                    for event in batch:
+                        tenant = await tenant_router.for_team(event["team_id"])
+                        by_tenant.setdefault(tenant.key, (tenant, []))[1].append(event)
+                    groups = list(by_tenant.values())
+                    for i, (tenant, events) in enumerate(groups):
+                        if not await self._insert(tenant, events):
+                            self._requeue([event for _, group in groups[i:] for event in group])
+                            return
+                except Exception:
+                    self._requeue(batch)
+                    logger.exception("Could not flush task events")
+                    return
+                finally:
+                    self._in_flight = []
+    
+    async def _insert(self, tenant: TenantCollections, events: List[dict]) -> bool:
+        try:
+            # insert_many adds _id to the dicts, so retries hit the unique id index
+            await tenant.task_events.insert_many(events, ordered=False)
+        except BulkWriteError as exc:
+            if any(error["code"] != 11000 for error in exc.details["writeErrors"]):
+                logger.exception("Could not flush task events")
+                return False
+        except Exception:
+            logger.exception("Could not flush task events")
+            return False
+        return True
+    
+    def _requeue(self, batch: List[dict]):
+        self._events = batch + self._events
+
+task_event_buffer = TaskEventBuffer(TASK_EVENTS_BATCH_SIZE, TASK_EVENTS_MAX_BUFFERED)
+
+def record_status_change(task: Task, user_id: str, from_status: Optional[str], to_status: str):
+    task_event_buffer.append(TaskEvent(
+        task_id=task.id,
+        team_id=task.team_id,
+        user_id=user_id,
+        from_status=from_status,
+        to_status=to_status,
+    ))
+
+async def run_task_events_flusher():
+    while True:
+        await asyncio.sleep(TASK_EVENTS_FLUSH_SECONDS)
+        await task_event_buffer.flush()
+
+# Overdue utilities
+def is_task_overdue(task: dict, now: Optional[datetime] = None) -> bool:
+    deadline = task.get("deadline")
+    if deadline and deadline.tzinfo:
+        deadline = deadline.astimezone(timezone.utc).replace(tzinfo=None)
+    now = now or datetime.utcnow()
+    return bool(deadline) and deadline < now and task.get("status") in OPEN_STATUSES
+
+async def flag_overdue_tasks(tenant: TenantCollections) -> int:
+    """Flag open tasks whose deadline has passed since the last scan"""
+    now = datetime.utcnow()
+    query = {
+        "deadline": {"$type": "date", "$lt": now},
+        "status": {"$in": OPEN_STATUSES},
+        "is_overdue": {"$ne": True},
+    }
+    # The assignees with tasks to flag, for the workload rollups
+    assignees = await tenant.tasks.aggregate([
+        {"$match": query},
+        {"$group": {"_id": {"team_id": "$team_id", "user_id": "$responsible_user_id"}}},
+    ]).to_list(None)
+    if not assignees:
+        return 0
+    
+    # One update per assignee, so each rollup gets exactly the tasks flagged
+    # under that assignee, whatever changed since the count
+    async def flag(row: dict) -> tuple:
+        team_id, user_id = row["_id"].get("team_id"), row["_id"].get("user_id")
+        # updated_at moves so /tasks/changes delivers the flag to syncing clients
+        result = await tenant.tasks.update_many(
+            {**query, "team_id": team_id, "responsible_user_id": user_id},
+            {"$set": {"is_overdue": True, "updated_at": now}},
+        )
+        return team_id, user_id, result.modified_count
+    flagged = await asyncio.gather(*(flag(row) for row in assignees))
+    
+    updates = [
+        UpdateOne(
+            {"team_id": team_id, "user_id": user_id},
+            {"$inc": {"overdue": count}, "$set": {"updated_at": now}},
+            upsert=True,
+        )
+        for team_id, user_id, count in flagged
+        if count
+    ]
+    if updates:
+        await db.workload.bulk_write(updates, ordered=False)
+    return sum(count for _, _, count in flagged)
+
+# Workload utilities
+# One workload document per (team_id, user_id) with the assignee's open task
+# counters, kept current with $inc deltas computed from a task's state before
+# and after each write, so the team view reads one document per member.
+def workload_contribution(task: Optional[dict]) -> dict:
+    """The counters a task adds to its assignee's rollup"""
+    if not task or task.get("status") not in OPEN_STATUSES:
+        return {}
+    # Urgency is free text; only known values may become field names
+    urgency = task.get("urgency") if task.get("urgency") in URGENCY_RANK else "other"
+    fields = {"open": 1, f"by_urgency.{urgency}": 1}
+    if task.get("is_overdue"):
+        fields["overdue"] = 1
+    return fields
+
+def workload_counters(rollup: dict) -> dict:
+    return {
+        "open": rollup.get("open", 0),
+        "overdue": rollup.get("overdue", 0),
+        "by_urgency": {urgency: count for urgency, count in rollup.get("by_urgency", {}).items() if count},
+    }
+
+async def apply_workload_changes(changes: List[tuple]):
+    """Apply the rollup deltas of (before, after) task documents; None for a missing side"""
+    deltas = {}
+    for before, after in changes:
+        for task, sign in ((before, -1), (after, 1)):
+            for field, value in workload_contribution(task).items():
+                key = (task["team_id"], task["responsible_user_id"])
+                deltas.setdefault(key, Counter())[field] += sign * value
+    now = datetime.utcnow()
+    updates = [
+        UpdateOne(
+            {"team_id": team_id, "user_id": user_id},
+            {"$inc": {field: value for field, value in fields.items() if value}, "$set": {"updated_at": now}},
+            upsert=True,
+        )
+        for (team_id, user_id), fields in deltas.items()
+        if any(fields.values())
+    ]
+    if updates:
+        await db.workload.bulk_write(updates, ordered=False)
+
+async def recount_workload(tenant: TenantCollections, pairs: List[tuple]):
+    """Recompute the rollups of the given (team_id, user_id) pairs from their tasks"""
+    if not pairs:
+        return
+    rows = await tenant.tasks.aggregate([
+        {"$match": {
+            "status": {"$in": OPEN_STATUSES},
+            "$or": [{"team_id": team_id, "responsible_user_id": user_id} for team_id, user_id in pairs],
+        }},
+        {"$group": {
+            "_id": {"team_id": "$team_id", "user_id": "$responsible_user_id", "urgency": "$urgency", "is_overdue": "$is_overdue"},
+            "count": {"$sum": 1},
+        }},
+    ]).to_list(None)
+    now = datetime.utcnow()
+    rollups = {
+        pair: {"team_id": pair[0], "user_id": pair[1], "open": 0, "overdue": 0, "by_urgency": {}, "updated_at": now}
+        for pair in pairs
+    }
+    for row in rows:
+        rollup = rollups[(row["_id"]["team_id"], row["_id"]["user_id"])]
+        urgency = row["_id"].get("urgency") if row["_id"].get("urgency") in URGENCY_RANK else "other"
+        rollup["open"] += row["count"]
+        rollup["by_urgency"][urgency] = rollup["by_urgency"].get(urgency, 0) + row["count"]
+        if row["_id"].get("is_overdue"):
+            rollup["overdue"] += row["count"]
+    await db.workload.bulk_write([
+        ReplaceOne({"team_id": team_id, "user_id": user_id}, rollup, upsert=True)
+        for (team_id, user_id), rollup in rollups.items()
+    ], ordered=False)
+
+async def rebuild_team_workload(team_id: str):
+    tenant = await tenant_router.for_team(team_id)
+    assignees = await tenant.tasks.distinct("responsible_user_id", {"team_id": team_id, "status": {"$in": OPEN_STATUSES}})
+    # Existing rollups too, so members without open tasks drop to zero
+    rolled_up = await db.workload.distinct("user_id", {"team_id": team_id})
+    await recount_workload(tenant, [(team_id, user_id) for user_id in set(assignees) | set(rolled_up)])
+
+async def run_overdue_scanner():
+    while True:
+        try:
+            flagged = sum(await fan_out(await tenant_router.all(), flag_overdue_tasks))
+            if flagged:
+                logger.info(f"Flagged {flagged} overdue tasks")
+                publish_invalidation("stats")
+        except Exception:
+            logger.exception("Overdue scan failed")
+        await asyncio.sleep(OVERDUE_SCAN_INTERVAL_SECONDS)
+
+# Lease utilities
+# A lease is one scheduler_leases document naming the worker that runs a
+# singleton job until expires_at; the holder renews it on every pass.
+async def acquire_lease(name: str, seconds: int, holder: str = WORKER_ID) -> bool:
+    """Take or renew the lease; another worker's unexpired lease wins"""
+    now = datetime.utcnow()
+    try:
+        await db.scheduler_leases.update_one(
+            {"_id": name, "$or": [{"holder": holder}, {"expires_at": {"$lt": now}}]},
+            {"$set": {"holder": holder, "expires_at": now + timedelta(seconds=seconds)}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        return False
+    return True
+
+async def release_lease(name: str, holder: str = WORKER_ID):
+    try:
+        await db.scheduler_leases.delete_one({"_id": name, "holder": holder})
+    except Exception:
+        logger.exception(f"Could not release the {name} lease")
+
+# Deadline reminder utilities
+# Only the worker holding the scheduler lease keeps a heap of the reminders due
+# in the next REMINDER_WINDOW_MINUTES, loaded with a range query on the
+# open_deadline index. Task writes publish "team_id:task_id" keys on the
+# "reminders" namespace and the holder re-reads just those tasks.
+class DeadlineReminderScheduler:
+    """Timer heap of upcoming deadline reminders, registered with the bus like a cache"""
+    namespace = "reminders"
+    projection = {"_id": 0, "id": 1, "team_id": 1, "deadline": 1, "status": 1, "reminder_sent_at": 1}
+    
+    def __init__(self, worker_id: str = WORKER_ID):
+        self.worker_id = worker_id
+        self.holding = False
+        # (remind_at, task_id, team_id); entries that disagree with _scheduled are stale
+        self._heap = []
+        self._scheduled = {}
+        self._window_end = None
+        self._dirty = set()
+        self._wakeup = asyncio.Event()
+        cache_registry[self.namespace] = self
+    
+    def evict(self, keys: Optional[List[str]] = None):
+        """Bus hook: re-read the tasks behind keys, or reload the whole window"""
+        if not self.holding:
+            return
+        if keys is None:
+            self._window_end = None
+        else:
+            self._dirty.update(keys)
+        self._wakeup.set()
+    
+    def reset(self):
+        self._heap = []
+        self._scheduled = {}
+        self._window_end = None
+        self._dirty = set()
+    
+    def schedule(self, task: dict):
+        self._scheduled.pop(task["id"], None)
+        deadline = task.get("deadline")
+        if not deadline or task.get("status") not in OPEN_STATUSES or task.get("reminder_sent_at"):
+            return
+        if deadline.tzinfo:
+            deadline = deadline.astimezone(timezone.utc).replace(tzinfo=None)
+        # Past deadlines belong to the overdue scanner
+        if deadline <= datetime.utcnow():
+            return
+        remind_at = deadline - timedelta(minutes=REMINDER_LEAD_MINUTES)
+        if remind_at >= self._window_end:
+            return
+        self._scheduled[task["id"]] = remind_at
+        heapq.heappush(self._heap, (remind_at, task["id"], task["team_id"]))
+    
+    async def acquire_lease(self) -> bool:
+        return await acquire_lease(self.namespace, REMINDER_LEASE_SECONDS, self.worker_id)
+    
+    async def release_lease(self):
+        if not self.holding:
+            return
+        self.holding = False
+        await release_lease(self.namespace, self.worker_id)
+    
+    async def load(self):
+        """Replace the heap with the reminders due before the end of a new window"""
+        self.reset()
+        now = datetime.utcnow()
+        self._window_end = now + timedelta(minutes=REMINDER_WINDOW_MINUTES)
+        query = {
+            "deadline": {"$type": "date", "$gt": now, "$lt": self._window_end + timedelta(minutes=REMINDER_LEAD_MINUTES)},
+            "status": {"$in": OPEN_STATUSES},
+            "reminder_sent_at": None,
+        }
+        results = await fan_out(
+            await tenant_router.all(),
+            lambda tenant: tenant.tasks.find(query, self.projection).to_list(None),
+        )
+        for tasks in results:
+            for task in tasks:
+                self.schedule(task)
+    
+    async def refresh(self):
+        """Reschedule the tasks written since the last pass"""
+        keys, self._dirty = self._dirty, set()
+        by_tenant = {}
+        for key in keys:
+            team_id, _, task_id = key.partition(":")
+            self._scheduled.pop(task_id, None)
+            tenant = await tenant_router.for_team(team_id)
+            by_tenant.setdefault(tenant.key, (tenant, []))[1].append(task_id)
+        for tenant, task_ids in by_tenant.values():
+            async for task in tenant.tasks.find({"id": {"$in": task_ids}}, self.projection):
+                self.schedule(task)
+    
+    async def fire_due(self) -> int:
+        """Send up to REMINDER_BATCH_SIZE due reminders; returns how many were due"""
+        now = datetime.utcnow()
+        due = {}
+        while self._heap and self._heap[0][0] <= now and len(due) < REMINDER_BATCH_SIZE:
+            remind_at, task_id, team_id = heapq.heappop(self._heap)
+            if self._scheduled.get(task_id) == remind_at:
+                del self._scheduled[task_id]
+                due[task_id] = team_id
+        if not due:
+            return 0
+        
+        by_tenant = {}
+        for task_id, team_id in due.items():
+            tenant = await tenant_router.for_team(team_id)
+            by_tenant.setdefault(tenant.key, (tenant, []))[1].append(task_id)
+        # Re-check against the stored task and mark it in one atomic update;
+        # only the worker whose update matched sends, so a reminder goes out
+        # at most once even if two workers briefly both hold the lease
+        claims = [
+            tenant.tasks.find_one_and_update(
+                {"id": task_id, "status": {"$in": OPEN_STATUSES}, "deadline": {"$gt": now}, "reminder_sent_at": None},
+                {"$set": {"reminder_sent_at": now}},
+                projection={"_id": 0, "id": 1, "title": 1, "deadline": 1, "responsible_user_id": 1},
+            )
+            for tenant, task_ids in by_tenant.values()
+            for task_id in task_ids
+        ]
+        tasks = [task for task in await asyncio.gather(*claims) if task]
+        
+        responsible_ids = list({task["responsible_user_id"] for task in tasks})
+        users = await db.users.find({"id": {"$in": responsible_ids}}, {"_id": 0, "id": 1, "email": 1}).to_list(None)
+        emails = {user["id"]: user["email"] for user in users}
+        await asyncio.gather(*(
+            send_notification_email(
+                emails[task["responsible_user_id"]],
+                task["title"],
+                f"Due {task['deadline']:%Y-%m-%d %H:%M} UTC",
+                subject="Deadline reminder",
+            )
+            for task in tasks
+            if task["responsible_user_id"] in emails
+        ))
+        if tasks:
+            logger.info(f"Sent {len(tasks)} deadline reminders")
+        return len(due)
+    
+    def sleep_seconds(self) -> float:
+        wake_at = [REMINDER_LEASE_SECONDS / 3]
+        now = datetime.utcnow()
+        if self._heap:
+            wake_at.append((self._heap[0][0] - now).total_seconds())
+        if self._window_end:
+            wake_at.append((self._window_end - now).total_seconds())
+        return max(min(wake_at), 0)
+    
+    async def run_once(self):
+        self.holding = await self.acquire_lease()
+        if not self.holding:
+            # Another worker holds the lease
+            self.reset()
+            return
+        if self._window_end is None or datetime.utcnow() >= self._window_end:
+            await self.load()
+        elif self._dirty:
+            await self.refresh()
+        while await self.fire_due():
+            pass
+    
+    async def run(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Deadline reminder scheduler failed")
+                # Start over from the database on the next pass
+                self._window_end = None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.sleep_seconds())
+            except asyncio.TimeoutError:
+                pass
+
+reminder_scheduler = DeadlineReminderScheduler()
+
+def reschedule_reminders(*tasks):
+    """Tell the scheduler lease holder, wherever it runs, that these tasks changed"""
+    publish_invalidation(DeadlineReminderScheduler.namespace, [f"{task.team_id}:{task.id}" for task in tasks])
+
+# Analytics utilities
+# (team_id, "YYYY-MM-DD") -> day bucket: the created count and, per (urgency,
+# category), a float32 array of lead times. Only closed days are cached, so a
+# historical window is aggregated once; the least recently used days go first.
+analytics_day_cache = LocalCache("analytics_days", max_entries=ANALYTICS_DAY_CACHE_MAX_ENTRIES)
+
+def percentile_summary(values) -> dict:
+    values = np.asarray(values, dtype=float)
+    if values.size == 0:
+        return {"count": 0}
+    summary = {"count": int(values.size)}
+    for p, value in zip(ANALYTICS_PERCENTILES, np.percentile(values, ANALYTICS_PERCENTILES)):
+        summary[f"p{p}"] = round(float(value), 2)
+    summary["max"] = round(float(values.max()), 2)
+    return summary
+
+def grouped_percentiles(df: pd.DataFrame, column: str) -> dict:
+    if df.empty:
+        return {}
+    quantiles = df.groupby(column)["lead_hours"].quantile([p / 100 for p in ANALYTICS_PERCENTILES]).unstack()
+    counts = df.groupby(column)["lead_hours"].size()
+    result = {}
+    for key, row in quantiles.iterrows():
+        summary = {"count": int(counts[key])}
+        for p in ANALYTICS_PERCENTILES:
+            summary[f"p{p}"] = round(float(row[p / 100]), 2)
+        result[key] = summary
+    return result
+
+async def load_analytics_days(tenant: TenantCollections, team_id: str, start: datetime, end: datetime) -> dict:
+    """Aggregate created counts and lead times per day for [start, end)"""
+    window = {"$gte": start, "$lt": end}
+    created_match = {"$match": {"team_id": team_id, "created_at": window}}
+    completed_match = {"$match": {"team_id": team_id, "status": "concluida", "completed_at": window}}
+    def day_of(field):
+        return {"$dateToString": {"format": "%Y-%m-%d", "date": field}}
+    
+    # Two cursors of grouped rows, so no single result document grows with the window
+    created, completed = await asyncio.gather(
+        tenant.tasks.aggregate([
+            created_match,
+            {"$unionWith": {"coll": tenant.tasks_archive.name, "pipeline": [created_match]}},
+            {"$group": {"_id": day_of("$created_at"), "count": {"$sum": 1}}}
+        ]).to_list(None),
+        tenant.tasks.aggregate([
+            completed_match,
+            {"$unionWith": {"coll": tenant.tasks_archive.name, "pipeline": [completed_match]}},
+            {"$group": {
+                "_id": {"day": day_of("$completed_at"), "urgency": "$urgency", "category": "$category"},
+                "lead_hours": {"$push": {"$divide": [{"$subtract": ["$completed_at", "$created_at"]}, 3600000]}}
+            }}
+        ]).to_list(None),
+    )
+    
+    days = {}
+    day = start
+    while day < end:
+        days[day.strftime("%Y-%m-%d")] = {"created": 0, "completed": {}}
+        day += timedelta(days=1)
+    
+    for bucket in created:
+        days[bucket["_id"]]["created"] = bucket["count"]
+    for group in completed:
+        key = group["_id"]
+        days[key["day"]]["completed"][(key.get("urgency"), key.get("category"))] = np.asarray(group["lead_hours"], dtype=np.float32)
+    return days
+
+async def get_team_analytics(team_id: str, days: int) -> dict:
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    start = today - timedelta(days=days - 1)
+    day_keys = [(start + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days)]
+    tenant = (await tenant_router.for_team(team_id)).for_reads("analytics")
+    # A day is only cached once it closed longer ago than a secondary may lag
+    settled_key = (datetime.utcnow() - timedelta(seconds=READ_MAX_STALENESS_SECONDS)).strftime("%Y-%m-%d")
+    
+    # Only aggregate from the first day that isn't cached yet (usually just today)
+    buckets = {key: analytics_day_cache.get((team_id, key)) for key in day_keys if key < settled_key}
+    missing = [key for key in day_keys if buckets.get(key) is None]
+    first_missing = datetime.strptime(missing[0], "%Y-%m-%d")
+    version = analytics_day_cache.version
+    fresh_days = await load_analytics_days(tenant, team_id, first_missing, today + timedelta(days=1))
+    
+    for key in day_keys:
+        if key in fresh_days:
+            buckets[key] = fresh_days[key]
+            if key < settled_key:
+                analytics_day_cache.set((team_id, key), fresh_days[key], version)
+    
+    throughput = [
+        {
+            "date": key,
+            "created": buckets[key]["created"],
+            "completed": sum(len(lead_hours) for lead_hours in buckets[key]["completed"].values())
+        }
+        for key in day_keys
+    ]
+    groups = [group for key in day_keys for group in buckets[key]["completed"].items()]
+    sizes = [len(lead_hours) for _, lead_hours in groups]
+    completed = pd.DataFrame({
+        "urgency": np.repeat(np.array([urgency for (urgency, _), _ in groups], dtype=object), sizes),
+        "category": np.repeat(np.array([category for (_, category), _ in groups], dtype=object), sizes),
+        "lead_hours": np.concatenate([lead_hours for _, lead_hours in groups]).astype(float) if groups else np.empty(0),
+    })
+    
+    # Backlog age is a snapshot of the open tasks and is never cached
+    open_tasks = await tenant.tasks.find(
+        {"team_id": team_id, "status": {"$in": OPEN_STATUSES}},
+        {"_id": 0, "created_at": 1}
+    ).to_list(None)
+    created = np.array([t["created_at"] for t in open_tasks], dtype="datetime64[ms]")
+    backlog_age_days = (np.datetime64(datetime.utcnow(), "ms") - created) / np.timedelta64(1, "D")
+    
+    return {
+        "team_id": team_id,
+        "days": days,
+        "throughput": throughput,
+        "lead_time_hours": {
+            "overall": percentile_summary(completed["lead_hours"]),
+            "by_urgency": grouped_percentiles(completed, "urgency"),
+            "by_category": grouped_percentiles(completed, "category"),
+        },
+        "backlog_age_days": percentile_summary(backlog_age_days),
+    }
+
+# Board utilities
+def board_cards_pipeline(
+    status: str,
+    limit: int,
+    cursor: Optional[str] = None,
+    projection: Optional[dict] = None
+) -> list:
+    """Cards of one column sorted by urgency, then deadline (tasks without one last)"""
+    pipeline = [
+        {"$match": {"status": status}},
+        {"$addFields": {
+            "_urgency_rank": {"$switch": {
+                "branches": [{"case": {"$eq": ["$urgency", urgency]}, "then": rank} for urgency, rank in URGENCY_RANK.items()],
+                "default": len(URGENCY_RANK)
+            }},
+            "_no_deadline": {"$cond": [{"$ifNull": ["$deadline", False]}, 0, 1]}
+        }},
+    ]
+    if cursor:
+        try:
+            rank, no_deadline, deadline, task_id = decode_cursor(cursor)
+            deadline = datetime.fromisoformat(deadline) if deadline else None
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        after = [
+            {"_urgency_rank": {"$gt": rank}},
+            {"_urgency_rank": rank, "_no_deadline": {"$gt": no_deadline}},
+            {"_urgency_rank": rank, "_no_deadline": no_deadline, "deadline": deadline, "id": {"$gt": task_id}},
+        ]
+        if deadline:
+            after.append({"_urgency_rank": rank, "_no_deadline": no_deadline, "deadline": {"$gt": deadline}})
+        pipeline.append({"$match": {"$or": after}})
+    pipeline += [
+        {"$sort": {"_urgency_rank": 1, "_no_deadline": 1, "deadline": 1, "id": 1}},
+        {"$limit": limit + 1},
+    ]
+    if projection:
+        # The sort keys stay, they build the cursor
+        pipeline.append({"$project": {**projection, "_urgency_rank": 1, "_no_deadline": 1, "deadline": 1, "id": 1}})
+    return pipeline
+
+def board_column(status: str, count: int, cards: List[dict], limit: int, names: Optional[tuple] = None):
+    """A BoardColumn, or its JSON-ready dict with trimmed tasks when names is given"""
+    next_cursor = None
+    if len(cards) > limit:
+        cards = cards[:limit]
+        last = cards[-1]
+        deadline = last.get("deadline")
+        next_cursor = encode_cursor([
+            last["_urgency_rank"], last["_no_deadline"], deadline.isoformat() if deadline else None, last["id"]
+        ])
+    if names:
+        return {"status": status, "count": count, "tasks": sparse_dump(Task, names, cards), "next_cursor": next_cursor}
+    return BoardColumn(status=status, count=count, tasks=build_models(Task, cards), next_cursor=next_cursor)
+
+def merge_board_cards(card_lists: List[List[dict]]) -> List[dict]:
+    """Merge per-tenant card pages in board order (a single page is returned as is)"""
+    if len(card_lists) == 1:
+        return card_lists[0]
+    cards = [card for cards in card_lists for card in cards]
+    cards.sort(key=lambda card: (
+        card["_urgency_rank"], card["_no_deadline"], card.get("deadline") or datetime.min, card["id"]
+    ))
+    return cards
+
+def board_scope(team_id: Optional[str], current_user: User) -> dict:
+    if not current_user.is_admin:
+        if team_id and team_id != current_user.team_id:
+            raise HTTPException(status_code=403, detail="Not authorized for this team")
+        # A user without a team matches no cards, never the admin scope
+        return {"team_id": current_user.team_id}
+    return {"team_id": team_id} if team_id else {}
+
+# Archive utilities
+async def archive_completed_tasks(tenant: TenantCollections) -> int:
+    """Move completed tasks older than ARCHIVE_AFTER_DAYS, and their comments, into the archive collections"""
+    cutoff = datetime.utcnow() - timedelta(days=ARCHIVE_AFTER_DAYS)
+    archive_filter = {"status": "concluida", "updated_at": {"$lt": cutoff}}
+    archived = 0
+    # Counters left behind by a pass that stopped halfway
+    await recount_archive_stats(tenant)
+    
+    while True:
+        batch = await tenant.tasks.find(archive_filter).limit(ARCHIVE_BATCH_SIZE).to_list(ARCHIVE_BATCH_SIZE)
+        if not batch:
+            break
+        
+        # Copy first and delete second, so a crash in between never loses a task
+        archived_at = datetime.utcnow()
+        await tenant.tasks_archive.bulk_write(
+            [ReplaceOne({"id": t["id"]}, {**t, "archived_at": archived_at, "stats_pending": True}, upsert=True) for t in batch],
+            ordered=False,
+        )
+        task_ids = [t["id"] for t in batch]
+        await tenant.tasks.delete_many({"id": {"$in": task_ids}, **archive_filter})
+        
+        # Tasks reopened while the batch was in flight stay active
+        reopened = set(await tenant.tasks.distinct("id", {"id": {"$in": task_ids}}))
+        if reopened:
+            await tenant.tasks_archive.delete_many({"id": {"$in": list(reopened)}})
+        moved_ids = [task_id for task_id in task_ids if task_id not in reopened]
+        
+        comments = await tenant.comments.find({"task_id": {"$in": moved_ids}}).to_list(None)
+        if comments:
+            await tenant.comments_archive.bulk_write(
+                [ReplaceOne({"id": c["id"]}, c, upsert=True) for c in comments],
+                ordered=False,
+            )
+            await tenant.comments.delete_many({"id": {"$in": [c["id"] for c in comments]}})
+        
+        if moved_ids:
+            moved = [t for t in batch if t["id"] in moved_ids]
+            await tenant.task_tombstones.insert_many([
+                TaskTombstone(task_id=t["id"], team_id=t["team_id"], reason="archived", deleted_at=archived_at).dict()
+                for t in moved
+            ])
+            await recount_archive_stats(tenant)
+        
+        archived += len(moved_ids)
+    
+    return archived
+
+async def run_archiver():
+    while True:
+        try:
+            # One worker archives; the lease outlives the interval so the holder keeps it
+            if await acquire_lease("archiver", 2 * ARCHIVE_INTERVAL_SECONDS):
+                archived = sum(await fan_out(await tenant_router.all(), archive_completed_tasks))
+            else:
+                archived = 0
+            if archived:
+                logger.info(f"Archived {archived} completed tasks")
+                publish_invalidation("dependencies")
+        except Exception:
+            logger.exception("Task archival failed")
+        await asyncio.sleep(ARCHIVE_INTERVAL_SECONDS)
+
+# Archived task counters
+# One archive_stats document per (team_id, urgency, category), kept by the
+# archiver so the dashboard never scans the archive. Archived tasks carry
+# stats_pending until their groups are recounted; a recount sets the counters
+# from the archive itself, so repeating one after a crash is harmless.
+async def get_archived_stats(team_id: Optional[str]) -> dict:
+    """Count archived tasks by urgency and category (archived tasks are always completed)"""
+    counters = await db.archive_stats.find(
+        {"team_id": team_id} if team_id else {}, {"_id": 0, "urgency": 1, "category": 1, "count": 1}
+    ).to_list(None)
+    
+    stats = {"total": 0, "urgency": {}, "category": {}}
+    for counter in counters:
+        urgency = counter.get("urgency")
+        category = counter.get("category")
+        stats["total"] += counter["count"]
+        stats["urgency"][urgency] = stats["urgency"].get(urgency, 0) + counter["count"]
+        stats["category"][category] = stats["category"].get(category, 0) + counter["count"]
+    return stats
+
+async def count_archived_tasks(tenant: TenantCollections, groups: Optional[List[dict]] = None) -> List[dict]:
+    """Count archived tasks per counter group, for all groups or just the given ones"""
+    return await tenant.tasks_archive.aggregate([
+        {"$match": {"$or": groups} if groups else {}},
+        {"$group": {
+            "_id": {"team_id": "$team_id", "urgency": "$urgency", "category": "$category"},
+            "count": {"$sum": 1}
+        }}
+    ]).to_list(None)
+
+async def recount_archive_stats(tenant: TenantCollections):
+    """Set the counters of the groups that have tasks archived since the last recount"""
+    pending = await tenant.tasks_archive.aggregate([
+        {"$match": {"stats_pending": True}},
+        {"$group": {"_id": {"team_id": "$team_id", "urgency": "$urgency", "category": "$category"}}}
+    ]).to_list(None)
+    if not pending:
+        return
+    groups = [group["_id"] for group in pending]
+    def key(group: dict) -> tuple:
+        return group.get("team_id"), group.get("urgency"), group.get("category")
+    counts = {key(group["_id"]): group["count"] for group in await count_archived_tasks(tenant, groups)}
+    await db.archive_stats.bulk_write([
+        UpdateOne(group, {"$set": {"count": counts.get(key(group), 0)}}, upsert=True) for group in groups
+    ], ordered=False)
+    await tenant.tasks_archive.update_many({"stats_pending": True}, {"$unset": {"stats_pending": ""}})
+
+async def backfill_archive_stats():
+    """Build the archived task counters once, for tasks archived before they existed"""
+    if await db.archive_stats.find_one({}, {"_id": 1}):
+        return
+    groups = [group for groups in await fan_out(await tenant_router.all(), count_archived_tasks) for group in groups]
+    if groups:
+        await db.archive_stats.bulk_write([
+            UpdateOne(group["_id"], {"$set": {"count": group["count"]}}, upsert=True) for group in groups
+        ], ordered=False)
+
+# Task import utilities
+# Rows are read one at a time from the spooled upload and written in chunks,
+# so memory depends on the chunk size rather than on the file size.
+class ImportFileError(Exception):
+    """The uploaded file could not be parsed"""
+
+def iter_csv_rows(file):
+    try:
+        yield from csv.DictReader(codecs.iterdecode(file, "utf-8-sig"))
+    except (UnicodeDecodeError, csv.Error) as exc:
+        raise ImportFileError(str(exc)) from exc
+
+def iter_xlsx_rows(file):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise HTTPException(status_code=415, detail="XLSX import requires openpyxl")
+    try:
+        # read_only streams the sheet instead of loading it whole
+        workbook = load_workbook(file, read_only=True, data_only=True)
+    except Exception as exc:
+        raise ImportFileError(f"Not a valid XLSX file ({exc})") from exc
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        keys = [str(cell) if cell is not None else "" for cell in header]
+        for values in rows:
+            yield dict(zip(keys, values))
+    except Exception as exc:
+        raise ImportFileError(str(exc)) from exc
+    finally:
+        workbook.close()
+
+def clean_import_row(row: dict) -> dict:
+    """Lowercase the headers, trim the values and drop empty cells"""
+    cleaned = {}
+    for key, value in row.items():
+        if key is None:
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = str(value)
+        if value in (None, ""):
+            continue
+        cleaned[str(key).strip().lower()] = value
+    return cleaned
+
+def add_import_failure(report: TaskImportReport, row_number: int, row: dict, status: str, detail: str):
+    report.failed += 1
+    if len(report.failures) < TASK_IMPORT_MAX_REPORTED_FAILURES:
+        report.failures.append(TaskImportRowResult(row=row_number, title=row.get("title"), status=status, detail=detail))
     else:
-        teams = await db.teams.find({"id": current_user.team_id}).to_list(1000)
-    return [Team(**team) for team in teams]
+        report.failures_truncated = True
+
+async def import_task_chunk(
+    chunk: List[tuple],
+    current_user: User,
+    default_team_id: Optional[str],
+    report: TaskImportReport,
+    teams: set
+):
+    # One query resolves every responsible email in the chunk
+    emails = list({row["responsible_email"] for _, row in chunk if "responsible_email" in row})
+    user_ids = {}
+    if emails:
+        users = await db.users.find({"email": {"$in": emails}}, {"_id": 0, "id": 1, "email": 1}).to_list(None)
+        user_ids = {user["email"]: user["id"] for user in users}
+    
+    by_tenant = {}
+    for row_number, row in chunk:
+        email = row.pop("responsible_email", None)
+        if email and "responsible_user_id" not in row:
+            if email not in user_ids:
+                add_import_failure(report, row_number, row, "invalid", f"No user with email {email}")
+                continue
+            row["responsible_user_id"] = user_ids[email]
+        row.setdefault("requested_by", current_user.id)
+        if default_team_id:
+            row.setdefault("team_id", default_team_id)
+
+        try:
+            task = TaskCreate(**row)
+        except ValidationError as exc:
+            add_import_failure(report, row_number, row, "invalid", validation_error_detail(exc))
+            continue
+        if not current_user.is_admin and task.team_id != current_user.team_id:
+            add_import_failure(report, row_number, row, "forbidden", "Not authorized for this team")
+            continue
+        
+        task_dict = task.dict()
+        task_dict["is_overdue"] = is_task_overdue({**task_dict, "status": "pendente"})
+        task_obj = Task(**task_dict)
+        tenant = await tenant_router.for_team(task_obj.team_id)
+        by_tenant.setdefault(tenant.key, (tenant, []))[1].append((row_number, task_obj))
+    
+    for tenant, pending in by_tenant.values():
+        failed_indexes = set()
+        try:
+            await tenant.tasks.insert_many([task.dict() for _, task in pending], ordered=False)
+        except BulkWriteError as exc:
+            for error in exc.details["writeErrors"]:
+                failed_indexes.add(error["index"])
+                row_number, task = pending[error["index"]]
+                add_import_failure(report, row_number, {"title": task.title}, "failed", error.get("errmsg"))
+        
+        created = [task for index, (_, task) in enumerate(pending) if index not in failed_indexes]
+        report.created += len(created)
+        teams.update(task.team_id for task in created)
+        if created:
+            await apply_workload_changes([(None, task.dict()) for task in created])
+            # Written directly: a large import would overflow the event buffer
+            events = [
+                TaskEvent(task_id=task.id, team_id=task.team_id, user_id=current_user.id, from_status=None, to_status=task.status).dict()
+                for task in created
+            ]
+            try:
+                await tenant.task_events.insert_many(events, ordered=False)
+            except Exception:
+                logger.exception("Could not record task events for imported tasks")
+
+async def import_tasks(rows, current_user: User, default_team_id: Optional[str]) -> TaskImportReport:
+    """Validate and insert tasks chunk by chunk, reporting failures per row"""
+    report = TaskImportReport()
+    teams = set()
+    chunk = []
+    row_number = 0
+    try:
+        for row_number, row in enumerate(rows, start=1):
+            if row_number > TASK_IMPORT_MAX_ROWS:
+                add_import_failure(report, row_number, {}, "invalid", f"At most {TASK_IMPORT_MAX_ROWS} rows per import; the rest was skipped")
+                break
+            row = clean_import_row(row)
+            if not row:
+                continue
+            report.total += 1
+            chunk.append((row_number, row))
+            if len(chunk) >= TASK_IMPORT_CHUNK_SIZE:
+                await import_task_chunk(chunk, current_user, default_team_id, report, teams)
+                logger.info(f"Task import progress: {row_number} rows read, {report.created} tasks created")
+                chunk = []
+    except ImportFileError as exc:
+        # Rows read before the error are still imported
+        add_import_failure(report, row_number + 1, {}, "invalid", f"Could not read the file: {exc}")
+    if chunk:
+        await import_task_chunk(chunk, current_user, default_team_id, report, teams)
+    
+    for team_id in teams:
+        invalidate_team_stats(team_id)
+    if report.created:
+        # Cheaper than one key per imported task: reload the reminder window
+        publish_invalidation(DeadlineReminderScheduler.namespace)
+    return report
+
+# Task dependency utilities
+# Edges live on the blocked task (blocked_by) and are resolved in one
+# $graphLookup, restricted to the task's team. Blockers that were deleted or
+# archived no longer count. The per-team order is cached until an edge or a
+# status in the team changes.
+dependency_cache = LocalCache("dependencies")  # team_id -> DependencyGraph dict
+
+def invalidate_team_dependencies(team_id: str):
+    publish_invalidation("dependencies", [team_id])
+
+def blockers_pipeline(tenant: TenantCollections, task_id: str, team_id: str) -> List[dict]:
+    """The task's transitive blockers in a "blockers" array, depth 0 for direct ones"""
+    return [
+        {"$match": {"id": task_id}},
+        {"$graphLookup": {
+            "from": tenant.tasks.name,
+            "startWith": "$blocked_by",
+            "connectFromField": "blocked_by",
+            "connectToField": "id",
+            "as": "blockers",
+            "depthField": "depth",
+            "restrictSearchWithMatch": {"team_id": team_id},
+        }},
+    ]
+
+async def has_dependency_cycle(tenant: TenantCollections, task_id: str, team_id: str) -> bool:
+    """Whether the task is among its own transitive blockers"""
+    pipeline = blockers_pipeline(tenant, task_id, team_id) + [
+        {"$project": {"_id": 0, "cycle": {"$in": [task_id, "$blockers.id"]}}},
+    ]
+    result = await tenant.tasks.aggregate(pipeline).to_list(1)
+    return bool(result and result[0]["cycle"])
+
+def dependency_graph(team_id: str, tasks: List[dict], statuses: dict) -> dict:
+    """Topological order by Kahn's algorithm; whatever is left over sits on a cycle"""
+    blocked_by = {task["id"]: [b for b in task["blocked_by"] if b in statuses] for task in tasks}
+    nodes = set(blocked_by) | {b for blockers in blocked_by.values() for b in blockers}
+    indegree = {node: len(blocked_by.get(node, [])) for node in nodes}
+    dependents = {}
+    for task_id, blockers in blocked_by.items():
+        for blocker_id in blockers:
+            dependents.setdefault(blocker_id, []).append(task_id)
+    
+    queue = deque(sorted(node for node in nodes if indegree[node] == 0))
+    order = []
+    while queue:
+        node = queue.popleft()
+        order.append(node)
+        for dependent in sorted(dependents.get(node, [])):
+            indegree[dependent] -= 1
+            if indegree[dependent] == 0:
+                queue.append(dependent)
+    
+    blocked = set()
+    for node in order:
+        if any(statuses[b] in OPEN_STATUSES or b in blocked for b in blocked_by.get(node, [])):
+            blocked.add(node)
+    return {
+        "team_id": team_id,
+        "order": order,
+        "blocked": [node for node in order if node in blocked],
+        "cycles": sorted(nodes - set(order)),
+    }
+
+async def load_dependency_graph(team_id: str) -> dict:
+    graph = dependency_cache.get(team_id)
+    if graph is None:
+        version = dependency_cache.version
+        tenant = await tenant_router.for_team(team_id)
+        tasks = await tenant.tasks.find(
+            {"team_id": team_id, "blocked_by.0": {"$exists": True}},
+            {"_id": 0, "id": 1, "status": 1, "blocked_by": 1},
+        ).to_list(None)
+        statuses = {task["id"]: task["status"] for task in tasks}
+        # Blockers that are not blocked themselves
+        missing = list({b for task in tasks for b in task["blocked_by"]} - statuses.keys())
+        if missing:
+            blockers = await tenant.tasks.find(
+                {"id": {"$in": missing}, "team_id": team_id}, {"_id": 0, "id": 1, "status": 1}
+            ).to_list(None)
+            statuses.update({blocker["id"]: blocker["status"] for blocker in blockers})
+        graph = dependency_graph(team_id, tasks, statuses)
+        dependency_cache.set(team_id, graph, version)
+    return graph
 
 # Task Routes
 @api_router.post("/tasks", response_model=Task)
-async def create_task(task: TaskCreate, current_user: User = Depends(get_current_user)):
+async def create_task(
+    task: TaskCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    current_user: User = Depends(get_current_user)
+):
     # Verify user can create task in this team
     if not current_user.is_admin and current_user.team_id != task.team_id:
         raise HTTPException(status_code=403, detail="Not authorized for this team")
     
+    # A retried request replays the first response without writing again
+    replay = await begin_idempotent_request(idempotency_key, current_user.id, "POST /tasks", task.dict())
+    if replay is not None:
+        return Task(**replay)
+    
     task_dict = task.dict()
+    task_dict["is_overdue"] = is_task_overdue({**task_dict, "status": "pendente"})
+    if idempotency_key:
+        task_dict["id"] = idempotent_document_id(idempotency_key, current_user.id, "POST /tasks", task.dict())
     task_obj = Task(**task_dict)
-    await db.tasks.insert_one(task_obj.dict())
+    document = task_obj.dict()
+    if idempotency_key:
+        document["_id"] = task_obj.id
+    tenant = await tenant_router.for_team(task_obj.team_id)
+    try:
+        await tenant.tasks.insert_one(document)
+    except DuplicateKeyError:
+        # An earlier attempt inserted the task and died before storing the
+        # response; that task is the response (its side effects are not redone)
+        existing = await tenant.tasks.find_one({"_id": task_obj.id})
+        if existing is None:
+            raise HTTPException(status_code=409, detail="The task created with this Idempotency-Key was removed")
+        task_obj = Task(**existing)
+        await complete_idempotent_request(idempotency_key, current_user.id, "POST /tasks", jsonable_encoder(task_obj))
+        return task_obj
+    except Exception:
+        await release_idempotent_request(idempotency_key, current_user.id, "POST /tasks")
+        raise
+    await complete_idempotent_request(idempotency_key, current_user.id, "POST /tasks", jsonable_encoder(task_obj))
+    await apply_workload_changes([(None, task_obj.dict())])
+    invalidate_team_stats(task_obj.team_id)
+    record_status_change(task_obj, current_user.id, None, task_obj.status)
+    if task_obj.deadline:
+        reschedule_reminders(task_obj)
     
     # Get responsible user for email notification
     responsible_user = await db.users.find_one({"id": task.responsible_user_id})
     if responsible_user:
-        await send_notification_email(
-            responsible_user["email"], 
-            task.title, 
-            task.description or ""
-        )
+        await notify_task_assigned(responsible_user, task_obj)
     
     return task_obj
 
+@api_router.post("/tasks/import", response_model=TaskImportReport)
+async def import_tasks_file(
+    file: UploadFile = File(...),
+    team_id: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """CSV or XLSX with a title,category,urgency,responsible_email[,description,deadline,team_id] header.
+    
+    responsible_user_id may replace responsible_email; team_id defaults to the
+    query parameter, then to the user's team.
+    """
+    default_team_id = team_id or current_user.team_id
+    if not current_user.is_admin and default_team_id != current_user.team_id:
+        raise HTTPException(status_code=403, detail="Not authorized for this team")
+    
+    filename = (file.filename or "").lower()
+    if filename.endswith(".xlsx") or file.content_type == "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet":
+        rows = iter_xlsx_rows(file.file)
+    else:
+        rows = iter_csv_rows(file.file)
+    return await import_tasks(rows, current_user, default_team_id)
+
 @api_router.get("/tasks", response_model=List[Task])
-async def get_tasks(current_user: User = Depends(get_current_user)):
-    if current_user.is_admin:
-        tasks = await db.tasks.find().to_list(1000)
+async def get_tasks(
+    include_archived: bool = False,
+    fields: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    names = parse_fields(fields, Task)
+    if not current_user.is_admin and not current_user.team_id:
+        # A user without a team sees no tasks, never the admin "*" scope
+        return JSONResponse([]) if names else []
+    team_id = None if current_user.is_admin else current_user.team_id
+    tasks = await task_list_flight.do(
+        (team_id or "*", include_archived, names), lambda: load_tasks(team_id, include_archived, names)
+    )
+    return JSONResponse(tasks) if names else tasks
+
+async def load_tasks(team_id: Optional[str], include_archived: bool, names: Optional[tuple] = None):
+    """Task models, or JSON-ready trimmed dicts when names is given"""
+    task_filter = {"team_id": team_id} if team_id else {}
+    projection = fields_projection(names)
+    
+    async def load(tenant: TenantCollections):
+        tenant = tenant.for_reads("task_list")
+        tasks = await tenant.tasks.find(task_filter, projection).batch_size(1000).to_list(1000)
+        if include_archived:
+            tasks += await tenant.tasks_archive.find(task_filter, projection).batch_size(1000).to_list(1000)
+        return tasks
+    
+    results = await fan_out(await tenant_router.for_scope(team_id), load)
+    tasks = [task for tasks in results for task in tasks]
+    if names:
+        return sparse_dump(Task, names, tasks)
+    return build_models(Task, tasks)
+
+@api_router.get("/tasks/board", response_model=Board)
+async def get_task_board(
+    team_id: Optional[str] = None,
+    limit: int = Query(BOARD_COLUMN_LIMIT, ge=1, le=100),
+    fields: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Every Kanban column's count and first cards in a single aggregation"""
+    names = parse_fields(fields, Task)
+    facets = {}
+    for column_status in TASK_STATUSES:
+        facets[f"{column_status}_count"] = [{"$match": {"status": column_status}}, {"$count": "count"}]
+        facets[f"{column_status}_cards"] = board_cards_pipeline(column_status, limit, projection=fields_projection(names))
+    
+    scope = board_scope(team_id, current_user)
+    
+    async def load(tenant: TenantCollections):
+        result = await tenant.for_reads("board").tasks.aggregate([{"$match": scope}, {"$facet": facets}]).to_list(1)
+        return result[0] if result else {}
+    
+    results = await fan_out(await tenant_router.for_scope(scope.get("team_id")), load)
+    
+    columns = []
+    for column_status in TASK_STATUSES:
+        count = sum((result.get(f"{column_status}_count") or [{"count": 0}])[0]["count"] for result in results)
+        cards = merge_board_cards([result.get(f"{column_status}_cards") or [] for result in results])
+        columns.append(board_column(column_status, count, cards, limit, names))
+    if names:
+        return JSONResponse({"columns": columns})
+    return Board(columns=columns)
+
+@api_router.get("/tasks/board/{column_status}", response_model=BoardColumn)
+async def get_task_board_column(
+    column_status: str,
+    cursor: Optional[str] = None,
+    team_id: Optional[str] = None,
+    limit: int = Query(BOARD_COLUMN_LIMIT, ge=1, le=100),
+    fields: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Load more cards of one Kanban column"""
+    if column_status not in TASK_STATUSES:
+        raise HTTPException(status_code=400, detail="Invalid status")
+    names = parse_fields(fields, Task)
+    
+    scope = board_scope(team_id, current_user)
+    pipeline = [{"$match": scope}] + board_cards_pipeline(column_status, limit, cursor, fields_projection(names))
+    
+    async def load(tenant: TenantCollections):
+        tenant = tenant.for_reads("board")
+        count = await tenant.tasks.count_documents({**scope, "status": column_status})
+        return count, await tenant.tasks.aggregate(pipeline).to_list(limit + 1)
+    
+    results = await fan_out(await tenant_router.for_scope(scope.get("team_id")), load)
+    count = sum(count for count, _ in results)
+    column = board_column(column_status, count, merge_board_cards([cards for _, cards in results]), limit, names)
+    return JSONResponse(column) if names else column
+
+@api_router.get("/tasks/changes", response_model=TaskChanges)
+async def get_task_changes(
+    since: Optional[str] = None,
+    fields: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Tasks created or updated since the sync token, plus tombstones for removed tasks.
+    
+    Without a token the client gets a full sync. Pages overlap by a few seconds,
+    so clients must apply changes idempotently by task id.
+    """
+    names = parse_fields(fields, Task)
+    projection = fields_projection(names, "updated_at")
+    scope = {} if current_user.is_admin else {"team_id": current_user.team_id}
+    now = datetime.utcnow()
+    
+    token = decode_cursor(since) if since else {"t": datetime.min.isoformat(), "full": True}
+    try:
+        changed_since = datetime.fromisoformat(token["t"])
+    except (TypeError, KeyError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    full_sync = token.get("full", False)
+    try:
+        # Later pages keep the time the sync started, the final token resumes from it
+        started_at = datetime.fromisoformat(token["s"]) if "s" in token else now
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not full_sync and changed_since < now - timedelta(days=SYNC_TOMBSTONE_DAYS):
+        raise HTTPException(status_code=410, detail="Sync token expired, run a full sync")
+    
+    if token.get("id"):
+        # Continue a page exactly where the previous one stopped
+        task_filter = {**scope, "$or": [
+            {"updated_at": {"$gt": changed_since}},
+            {"updated_at": changed_since, "id": {"$gt": token["id"]}}
+        ]}
     else:
-        tasks = await db.tasks.find({"team_id": current_user.team_id}).to_list(1000)
-    return [Task(**task) for task in tasks]
+        task_filter = {**scope, "updated_at": {"$gte": changed_since}}
+    
+    async def load(tenant: TenantCollections):
+        tasks = await tenant.tasks.find(task_filter, projection).sort([("updated_at", 1), ("id", 1)]) \
+            .limit(SYNC_PAGE_SIZE).batch_size(SYNC_PAGE_SIZE).to_list(SYNC_PAGE_SIZE)
+        tombstones = []
+        if not full_sync:
+            tombstones = await tenant.task_tombstones.find(
+                {**scope, "deleted_at": {"$gte": changed_since}}
+            ).sort("deleted_at", 1).to_list(None)
+        return tasks, tombstones
+    
+    results = await fan_out(await tenant_router.for_scope(scope.get("team_id")), load)
+    tasks = sorted((task for tasks, _ in results for task in tasks), key=lambda task: (task["updated_at"], task["id"]))
+    tasks = tasks[:SYNC_PAGE_SIZE]
+    tombstones = sorted((t for _, tombstones in results for t in tombstones), key=lambda t: t["deleted_at"])
+    
+    has_more = len(tasks) == SYNC_PAGE_SIZE
+    if has_more:
+        next_token = {
+            "t": tasks[-1]["updated_at"].isoformat(), "id": tasks[-1]["id"],
+            "full": full_sync, "s": started_at.isoformat()
+        }
+    else:
+        # Deletes made while paging and writes stamped just before the first
+        # read (possibly still committing) are picked up by the next delta
+        next_token = {"t": (started_at - timedelta(seconds=SYNC_SAFETY_SECONDS)).isoformat()}
+    
+    if names:
+        return JSONResponse({
+            "tasks": sparse_dump(Task, names, tasks),
+            "deleted": [jsonable_encoder(TaskTombstone(**tombstone)) for tombstone in tombstones],
+            "sync_token": encode_cursor(next_token),
+            "has_more": has_more,
+        })
+    return TaskChanges(
+        tasks=build_models(Task, tasks),
+        deleted=build_models(TaskTombstone, tombstones),
+        sync_token=encode_cursor(next_token),
+        has_more=has_more,
+    )
 
-@api_router.get("/tasks/{task_id}", response_model=Task)
-async def get_task(task_id: str, current_user: User = Depends(get_current_user)):
-    task = await db.tasks.find_one({"id": task_id})
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
+@api_router.get("/tasks/overdue", response_model=List[Task])
+async def get_overdue_tasks(
+    team_id: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    fields: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    if not current_user.is_admin:
+        if team_id and team_id != current_user.team_id:
+            raise HTTPException(status_code=403, detail="Not authorized for this team")
+        team_id = current_user.team_id
+    names = parse_fields(fields, Task)
+    if not team_id and not current_user.is_admin:
+        return JSONResponse([]) if names else []
+    projection = fields_projection(names, "deadline")
     
-    task_obj = Task(**task)
+    task_filter = {"is_overdue": True}
+    if team_id:
+        task_filter["team_id"] = team_id
     
-    # Check permissions
-    if not current_user.is_admin and current_user.team_id != task_obj.team_id:
-        raise HTTPException(status_code=403, detail="Not authorized for this team")
+    tenants = await tenant_router.for_scope(team_id)
+    if len(tenants) == 1:
+        tasks = await tenants[0].tasks.find(task_filter, projection).sort([("deadline", 1), ("id", 1)]) \
+            .skip(skip).limit(limit).batch_size(limit).to_list(limit)
+    else:
+        # Across tenants, every tenant returns its first skip + limit and the page is cut after merging
+        async def load(tenant: TenantCollections):
+            return await tenant.tasks.find(task_filter, projection).sort([("deadline", 1), ("id", 1)]) \
+                .limit(skip + limit).batch_size(skip + limit).to_list(skip + limit)
+        
+        results = await fan_out(tenants, load)
+        tasks = sorted((task for tasks in results for task in tasks), key=lambda task: (task["deadline"], task["id"]))
+        tasks = tasks[skip:skip + limit]
     
-    return task_obj
+    if names:
+        return JSONResponse(sparse_dump(Task, names, tasks))
+    return build_models(Task, tasks)
+
+@api_router.get("/tasks/{task_id}", response_model=Task)
+async def get_task(
+    task_id: str,
+    include_archived: bool = False,
+    fields: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    names = parse_fields(fields, Task)
+    if not names:
+        return await get_task_for_user(task_id, current_user, include_archived)
+    task = await get_task_document_for_user(task_id, current_user, include_archived, fields_projection(names))
+    return JSONResponse(sparse_dump(Task, names, task))
 
 @api_router.put("/tasks/{task_id}", response_model=Task)
 async def update_task(task_id: str, task_update: TaskUpdate, current_user: User = Depends(get_current_user)):
-    existing_task = await db.tasks.find_one({"id": task_id})
-    if not existing_task:
-        raise HTTPException(status_code=404, detail="Task not found")
-    
-    existing_task_obj = Task(**existing_task)
-    
-    # Check permissions
-    if not current_user.is_admin and current_user.team_id != existing_task_obj.team_id:
-        raise HTTPException(status_code=403, detail="Not authorized for this team")
+    existing_task_obj = await get_task_for_user(task_id, current_user)
     
     # Update task
     update_data = task_update.dict(exclude_unset=True)
     update_data["updated_at"] = datetime.utcnow()
+    if "deadline" in update_data or "status" in update_data:
+        update_data["is_overdue"] = is_task_overdue({**existing_task_obj.dict(), **update_data})
+    if "deadline" in update_data and update_data["deadline"] != existing_task_obj.deadline:
+        # A new deadline gets a new reminder
+        update_data["reminder_sent_at"] = None
+    if update_data.get("status") and update_data["status"] != existing_task_obj.status:
+        # Analytics date a completion by completed_at, which later edits leave alone
+        update_data["completed_at"] = update_data["updated_at"] if update_data["status"] == "concluida" else None
     
-    await db.tasks.update_one({"id": task_id}, {"$set": update_data})
-    
-    # Get updated task
-    updated_task = await db.tasks.find_one({"id": task_id})
+    # The document as it was just before this write keeps the workload deltas
+    # exact under concurrent updates, and applying update_data to it saves a second read
+    tenant = await tenant_router.for_team(existing_task_obj.team_id)
+    previous_task = await tenant.tasks.find_one_and_update(
+        {"id": task_id}, {"$set": update_data}, return_document=ReturnDocument.BEFORE
+    )
+    if not previous_task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    updated_task = {**previous_task, **update_data}
+    await apply_workload_changes([(previous_task, updated_task)])
+    invalidate_team_stats(existing_task_obj.team_id)
+    if update_data.get("status") and update_data["status"] != existing_task_obj.status:
+        record_status_change(existing_task_obj, current_user.id, existing_task_obj.status, update_data["status"])
+    if "deadline" in update_data or "status" in update_data:
+        reschedule_reminders(existing_task_obj)
+    if update_data.get("status") and update_data["status"] != existing_task_obj.status:
+        invalidate_team_dependencies(existing_task_obj.team_id)
     return Task(**updated_task)
 
 @api_router.delete("/tasks/{task_id}")
 async def delete_task(task_id: str, current_user: User = Depends(get_current_user)):
-    existing_task = await db.tasks.find_one({"id": task_id})
-    if not existing_task:
-        raise HTTPException(status_code=404, detail="Task not found")
+    existing_task_obj = await get_task_for_user(task_id, current_user)
     
-    existing_task_obj = Task(**existing_task)
+    tenant = await tenant_router.for_team(existing_task_obj.team_id)
+    deleted_task = await tenant.tasks.find_one_and_delete({"id": task_id})
+    if deleted_task:
+        await apply_workload_changes([(deleted_task, None)])
+    # Edges pointing at a deleted task stay but no longer block
+    invalidate_team_dependencies(existing_task_obj.team_id)
+    await tenant.task_tombstones.insert_one(TaskTombstone(
+        task_id=task_id, team_id=existing_task_obj.team_id, reason="deleted", deleted_at=datetime.utcnow()
+    ).dict())
+    invalidate_team_stats(existing_task_obj.team_id)
+    if existing_task_obj.deadline:
+        reschedule_reminders(existing_task_obj)
+    return {"message": "Task deleted successfully"}
+
+@api_router.get("/tasks/{task_id}/events", response_model=List[TaskEvent])
+async def get_task_events(task_id: str, current_user: User = Depends(get_current_user)):
+    """Status timeline of a task, including events not yet flushed to the database"""
+    task_obj = await get_task_for_user(task_id, current_user, include_archived=True)
     
-    # Check permissions
-    if not current_user.is_admin and current_user.team_id != existing_task_obj.team_id:
-        raise HTTPException(status_code=403, detail="Not authorized for this team")
+    tenant = await tenant_router.for_team(task_obj.team_id)
+    events = await tenant.task_events.find({"task_id": task_id}).sort("created_at", 1).batch_size(1000).to_list(1000)
+    stored_ids = {event["id"] for event in events}
+    events += [event for event in task_event_buffer.pending(task_id) if event["id"] not in stored_ids]
+    events.sort(key=lambda event: event["created_at"])
+    return build_models(TaskEvent, events)
+
+# Dependency Routes
+@api_router.post("/tasks/{task_id}/blockers", response_model=Task)
+async def add_task_blocker(task_id: str, blocker: TaskBlockerCreate, current_user: User = Depends(get_current_user)):
+    task_obj = await get_task_for_user(task_id, current_user)
+    if blocker.blocker_id == task_id:
+        raise HTTPException(status_code=400, detail="A task cannot block itself")
+    if blocker.blocker_id in task_obj.blocked_by:
+        return task_obj
     
-    await db.tasks.delete_one({"id": task_id})
-    return {"message": "Task deleted successfully"}
+    tenant = await tenant_router.for_team(task_obj.team_id)
+    if not await tenant.tasks.find_one({"id": blocker.blocker_id, "team_id": task_obj.team_id}, {"_id": 1}):
+        raise HTTPException(status_code=404, detail="Blocking task not found in this team")
+    
+    updated_task = await tenant.tasks.find_one_and_update(
+        {"id": task_id},
+        {"$addToSet": {"blocked_by": blocker.blocker_id}, "$set": {"updated_at": datetime.utcnow()}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if not updated_task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    # Checked after the write, so two concurrent inserts cannot close a cycle together
+    if await has_dependency_cycle(tenant, task_id, task_obj.team_id):
+        await tenant.tasks.update_one(
+            {"id": task_id},
+            {"$pull": {"blocked_by": blocker.blocker_id}, "$set": {"updated_at": datetime.utcnow()}},
+        )
+        raise HTTPException(status_code=409, detail="Dependency would create a cycle")
+    invalidate_team_dependencies(task_obj.team_id)
+    return Task(**updated_task)
+
+@api_router.delete("/tasks/{task_id}/blockers/{blocker_id}", response_model=Task)
+async def remove_task_blocker(task_id: str, blocker_id: str, current_user: User = Depends(get_current_user)):
+    task_obj = await get_task_for_user(task_id, current_user)
+    if blocker_id not in task_obj.blocked_by:
+        raise HTTPException(status_code=404, detail="Dependency not found")
+    
+    tenant = await tenant_router.for_team(task_obj.team_id)
+    updated_task = await tenant.tasks.find_one_and_update(
+        {"id": task_id},
+        {"$pull": {"blocked_by": blocker_id}, "$set": {"updated_at": datetime.utcnow()}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if not updated_task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    invalidate_team_dependencies(task_obj.team_id)
+    return Task(**updated_task)
+
+@api_router.get("/tasks/{task_id}/blockers", response_model=List[TaskBlocker])
+async def get_task_blockers(task_id: str, current_user: User = Depends(get_current_user)):
+    """Every task blocking this one, directly or transitively, nearest first"""
+    task = await get_task_document_for_user(task_id, current_user, projection={"_id": 0, "id": 1})
+    tenant = await tenant_router.for_team(task["team_id"])
+    pipeline = blockers_pipeline(tenant, task_id, task["team_id"]) + [
+        {"$unwind": "$blockers"},
+        {"$replaceRoot": {"newRoot": "$blockers"}},
+        {"$project": {
+            "_id": 0,
+            "id": 1,
+            "title": 1,
+            "status": 1,
+            "responsible_user_id": 1,
+            "depth": {"$add": ["$depth", 1]},
+        }},
+        {"$sort": {"depth": 1, "id": 1}},
+    ]
+    blockers = await tenant.tasks.aggregate(pipeline).to_list(None)
+    return build_models(TaskBlocker, blockers)
+
+@api_router.get("/teams/{team_id}/dependencies", response_model=DependencyGraph)
+async def get_team_dependencies(team_id: str, current_user: User = Depends(get_current_user)):
+    if not current_user.is_admin and current_user.team_id != team_id:
+        raise HTTPException(status_code=403, detail="Not authorized for this team")
+    return await load_dependency_graph(team_id)
 
 # Dashboard Routes
 @api_router.get("/dashboard/stats")
 async def get_dashboard_stats(current_user: User = Depends(get_current_user)):
     # Filter based on user permissions
-    if current_user.is_admin:
-        task_filter = {}
-    else:
-        task_filter = {"team_id": current_user.team_id}
+    if not current_user.is_admin and not current_user.team_id:
+        return empty_dashboard_stats()
+    team_id = None if current_user.is_admin else current_user.team_id
+    cache_key = team_id or "*"
+    
+    stats = dashboard_stats_cache.get(cache_key)
+    if stats is None:
+        stats = await dashboard_stats_flight.do((cache_key,), lambda: load_dashboard_stats(cache_key, team_id))
+    return stats
+
+async def load_dashboard_stats(cache_key: str, team_id: Optional[str]) -> dict:
+    version = dashboard_stats_cache.version
+    stats = await compute_dashboard_stats(team_id)
+    dashboard_stats_cache.set(cache_key, stats, version)
+    return stats
+
+def empty_dashboard_stats() -> dict:
+    return {
+        "total_tasks": 0,
+        "completed_tasks": 0,
+        "in_progress_tasks": 0,
+        "pending_tasks": 0,
+        "overdue_tasks": 0,
+        "urgency_stats": {urgency: 0 for urgency in ("critica", "alta", "media", "baixa")},
+        "category_stats": {}
+    }
+
+async def compute_dashboard_stats(team_id: Optional[str]) -> dict:
+    task_filter = {"team_id": team_id} if team_id else {}
     
-    # Get all tasks for the user's scope
-    tasks = await db.tasks.find(task_filter).to_list(10000)
+    # Get all tasks for the user's scope, from every tenant it spans
+    async def load(tenant: TenantCollections):
+        tenant = tenant.for_reads("dashboard")
+        return await tenant.tasks.find(task_filter).batch_size(10000).to_list(10000)
+    
+    results, archived_stats = await asyncio.gather(
+        fan_out(await tenant_router.for_scope(team_id), load), get_archived_stats(team_id)
+    )
+    tasks = [task for tasks in results for task in tasks]
     
     # Calculate stats
     total_tasks = len(tasks)
@@ -375,13 +2930,8 @@ async def get_dashboard_stats(current_user: User = Depends(get_current_user)):
     in_progress_tasks = len([t for t in tasks if t["status"] == "em_progresso"])
     pending_tasks = len([t for t in tasks if t["status"] == "pendente"])
     
-    # Overdue tasks (deadline passed and not completed)
-    now = datetime.utcnow()
-    overdue_tasks = len([
-        t for t in tasks 
-        if t.get("deadline") and t["deadline"] < now 
-        and t["status"] != "concluida"
-    ])
+    # Overdue tasks (flagged by the overdue scanner and by task writes)
+    overdue_tasks = len([t for t in tasks if t.get("is_overdue")])
     
     # Stats by urgency
     urgency_stats = {
@@ -397,6 +2947,15 @@ async def get_dashboard_stats(current_user: User = Depends(get_current_user)):
         cat = task["category"]
         categories[cat] = categories.get(cat, 0) + 1
     
+    # Archived tasks left the tasks collection but still count as completed work
+    total_tasks += archived_stats["total"]
+    completed_tasks += archived_stats["total"]
+    for urgency, count in archived_stats["urgency"].items():
+        if urgency in urgency_stats:
+            urgency_stats[urgency] += count
+    for cat, count in archived_stats["category"].items():
+        categories[cat] = categories.get(cat, 0) + count
+    
     return {
         "total_tasks": total_tasks,
         "completed_tasks": completed_tasks,
@@ -407,37 +2966,480 @@ async def get_dashboard_stats(current_user: User = Depends(get_current_user)):
         "category_stats": categories
     }
 
+# Analytics Routes
+@api_router.get("/analytics/teams/{team_id}")
+async def get_team_analytics_route(
+    team_id: str,
+    days: int = Query(30, ge=1, le=ANALYTICS_MAX_DAYS),
+    current_user: User = Depends(get_current_user)
+):
+    if not current_user.is_admin and current_user.team_id != team_id:
+        raise HTTPException(status_code=403, detail="Not authorized for this team")
+    return await get_team_analytics(team_id, days)
+
+# Workload Routes
+@api_router.get("/teams/{team_id}/workload", response_model=TeamWorkload)
+async def get_team_workload(team_id: str, current_user: User = Depends(get_current_user)):
+    """Open tasks per assignee, by urgency and overdue state"""
+    if not current_user.is_admin and current_user.team_id != team_id:
+        raise HTTPException(status_code=403, detail="Not authorized for this team")
+    rollups = {
+        rollup["user_id"]: rollup
+        for rollup in await db.workload.find({"team_id": team_id}, {"_id": 0}).to_list(None)
+    }
+    members = [
+        WorkloadEntry(user_id=member["id"], name=member["name"], **workload_counters(rollups.pop(member["id"], {})))
+        for member in await cached_members(team_id)
+    ]
+    # Tasks still assigned to users who left the team
+    members += [
+        WorkloadEntry(user_id=user_id, **workload_counters(rollup))
+        for user_id, rollup in rollups.items()
+        if rollup.get("open")
+    ]
+    members.sort(key=lambda entry: (-entry.open, entry.name or ""))
+    return TeamWorkload(team_id=team_id, members=members)
+
+@api_router.post("/admin/teams/{team_id}/workload/rebuild", response_model=TeamWorkload)
+async def rebuild_workload(team_id: str, admin: User = Depends(get_admin_user)):
+    """Recount a team's rollups from its tasks, e.g. after a manual data fix"""
+    await rebuild_team_workload(team_id)
+    return await get_team_workload(team_id, admin)
+
 # Comments Routes
 @api_router.post("/comments", response_model=Comment)
-async def create_comment(comment: CommentCreate, current_user: User = Depends(get_current_user)):
+async def create_comment(
+    comment: CommentCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    current_user: User = Depends(get_current_user)
+):
     # Verify task exists and user has access
-    task = await db.tasks.find_one({"id": comment.task_id})
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
+    task_obj = await get_task_for_user(comment.task_id, current_user)
     
-    task_obj = Task(**task)
-    if not current_user.is_admin and current_user.team_id != task_obj.team_id:
-        raise HTTPException(status_code=403, detail="Not authorized for this team")
+    replay = await begin_idempotent_request(idempotency_key, current_user.id, "POST /comments", comment.dict())
+    if replay is not None:
+        return Comment(**replay)
     
     comment_dict = comment.dict()
     comment_dict["user_id"] = current_user.id
     comment_obj = Comment(**comment_dict)
-    await db.comments.insert_one(comment_obj.dict())
+    tenant = await tenant_router.for_team(task_obj.team_id)
+    try:
+        await tenant.comments.insert_one(comment_obj.dict())
+    except Exception:
+        await release_idempotent_request(idempotency_key, current_user.id, "POST /comments")
+        raise
+    await complete_idempotent_request(idempotency_key, current_user.id, "POST /comments", jsonable_encoder(comment_obj))
     return comment_obj
 
 @api_router.get("/tasks/{task_id}/comments", response_model=List[Comment])
-async def get_task_comments(task_id: str, current_user: User = Depends(get_current_user)):
+async def get_task_comments(
+    task_id: str,
+    include_archived: bool = False,
+    fields: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    names = parse_fields(fields, Comment)
+    projection = fields_projection(names)
+    
     # Verify task exists and user has access
-    task = await db.tasks.find_one({"id": task_id})
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
+    task = await get_task_document_for_user(task_id, current_user, include_archived, {"_id": 0, "archived_at": 1})
     
-    task_obj = Task(**task)
-    if not current_user.is_admin and current_user.team_id != task_obj.team_id:
-        raise HTTPException(status_code=403, detail="Not authorized for this team")
+    tenant = await tenant_router.for_team(task["team_id"])
+    comments = await tenant.comments.find({"task_id": task_id}, projection).batch_size(1000).to_list(1000)
+    if task.get("archived_at"):
+        comments += await tenant.comments_archive.find({"task_id": task_id}, projection).batch_size(1000).to_list(1000)
+    if names:
+        return JSONResponse(sparse_dump(Comment, names, comments))
+    return build_models(Comment, comments)
+
+# Health utilities
+# Index verification state, set by prepare_database at startup
+database_status = {"indexes": "pending", "error": None}
+loop_lag = {"last_ms": 0.0, "max_ms": 0.0}
+mongo_ping: Optional[asyncio.Task] = None
+readiness_cache = {"expires": 0.0, "status_code": 503, "body": None}
+readiness_lock = asyncio.Lock()
+
+async def run_loop_lag_sampler():
+    """Measure how late the event loop wakes up from a fixed sleep"""
+    recent = deque(maxlen=int(10 / LOOP_LAG_INTERVAL_SECONDS))
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(LOOP_LAG_INTERVAL_SECONDS)
+        lag_ms = max(0.0, (time.perf_counter() - started - LOOP_LAG_INTERVAL_SECONDS) * 1000)
+        recent.append(lag_ms)
+        loop_lag["last_ms"] = round(lag_ms, 2)
+        loop_lag["max_ms"] = round(max(recent), 2)
+
+async def ping_mongo() -> float:
+    started = time.perf_counter()
+    await client.admin.command("ping")
+    return (time.perf_counter() - started) * 1000
+
+async def check_mongo() -> dict:
+    # A ping that outlives its timeout keeps running in the driver; reuse it
+    # instead of stacking another one behind an unreachable server
+    global mongo_ping
+    if mongo_ping is None or mongo_ping.done():
+        mongo_ping = asyncio.create_task(ping_mongo())
+    try:
+        rtt_ms = await asyncio.wait_for(asyncio.shield(mongo_ping), READINESS_TIMEOUT_SECONDS)
+        return {"ok": True, "rtt_ms": round(rtt_ms, 2)}
+    except asyncio.TimeoutError:
+        return {"ok": False, "error": f"ping timed out after {READINESS_TIMEOUT_SECONDS}s"}
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
+
+def pool_utilization() -> dict:
+    max_size = client.options.pool_options.max_pool_size
+    in_use = sum(pool_monitor.checked_out.values())
+    return {
+        "in_use": in_use,
+        "max_size": max_size,
+        "utilization": round(in_use / max_size, 3) if max_size else None,
+    }
+
+async def check_readiness():
+    mongo = await check_mongo()
+    checks = {
+        "mongo": mongo,
+        "pool": pool_utilization(),
+        "event_loop": {
+            **loop_lag,
+            "ok": loop_lag["max_ms"] <= READINESS_MAX_LOOP_LAG_MS,
+        },
+        "indexes": {
+            "ok": database_status["indexes"] == "verified",
+            "status": database_status["indexes"],
+            "error": database_status["error"],
+        },
+    }
+    ready = mongo["ok"] and checks["event_loop"]["ok"] and checks["indexes"]["ok"]
+    body = {
+        "status": "ready" if ready else "not_ready",
+        "worker_id": WORKER_ID,
+        "checked_at": datetime.utcnow().isoformat(),
+        "checks": checks,
+    }
+    return (200 if ready else 503), body
+
+# Health Routes
+# Mounted on the app itself, outside /api and without authentication
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is serving requests; touches no dependency"""
+    return {"status": "ok", "worker_id": WORKER_ID}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness, cached for READINESS_CACHE_SECONDS so probes add no load"""
+    async with readiness_lock:
+        if readiness_cache["body"] is None or time.monotonic() >= readiness_cache["expires"]:
+            status_code, body = await check_readiness()
+            readiness_cache.update(
+                expires=time.monotonic() + READINESS_CACHE_SECONDS,
+                status_code=status_code,
+                body=body,
+            )
+    return JSONResponse(status_code=readiness_cache["status_code"], content=readiness_cache["body"])
+
+# Request profiling
+# A thread samples the event loop thread's stack while a profiled request runs.
+# The loop is shared, so concurrent requests show up in the samples too; the
+# loop idling in select() is time spent awaiting Motor (or other I/O).
+# Root module of a frame -> category; the innermost match wins
+PROFILE_CATEGORIES = {
+    "pydantic": "pydantic",
+    "pydantic_core": "pydantic",
+    "jwt": "jwt",
+    "passlib": "bcrypt",
+    "bcrypt": "bcrypt",
+}
+
+def fold_stack(frame) -> str:
+    """category;outermost;...;innermost, the folded format flame graph tools read"""
+    names = []
+    category = None
+    if frame is not None and frame.f_globals.get("__name__") == "selectors":
+        category = "motor-await"
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "?")
+        names.append(f"{module}.{frame.f_code.co_qualname}")
+        if category is None:
+            category = PROFILE_CATEGORIES.get(module.partition(".")[0])
+        frame = frame.f_back
+    names.append(category or "python")
+    return ";".join(reversed(names))
+
+class SamplingProfiler:
+    # While any profile runs, the GIL switch interval drops to the sampling
+    # interval; otherwise a busy loop thread starves the sampler for 5 ms at a time
+    _running = 0
+    _running_lock = threading.Lock()
+    _switch_interval = sys.getswitchinterval()
+    
+    def __init__(self, thread_id: int, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.thread_id = thread_id
+        self.interval = interval_ms / 1000
+        self.stacks = Counter()
+        self.duration_ms = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name="request-profiler", daemon=True)
+    
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[fold_stack(frame)] += 1
+    
+    def start(self):
+        with SamplingProfiler._running_lock:
+            if SamplingProfiler._running == 0:
+                SamplingProfiler._switch_interval = sys.getswitchinterval()
+            SamplingProfiler._running += 1
+            sys.setswitchinterval(min(sys.getswitchinterval(), self.interval))
+        self._started = time.perf_counter()
+        self._thread.start()
+    
+    def stop(self):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join()
+        self.duration_ms = (time.perf_counter() - self._started) * 1000
+        with SamplingProfiler._running_lock:
+            SamplingProfiler._running -= 1
+            if SamplingProfiler._running == 0:
+                sys.setswitchinterval(SamplingProfiler._switch_interval)
+    
+    def breakdown(self) -> dict:
+        """Wall time per category in ms, apportioned by sample counts"""
+        total = sum(self.stacks.values())
+        by_category = Counter()
+        for stack, count in self.stacks.items():
+            by_category[stack.partition(";")[0]] += count
+        return {
+            category: round(self.duration_ms * count / total, 2)
+            for category, count in by_category.most_common()
+        } if total else {}
+    
+    def folded(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in sorted(self.stacks.items()))
+
+def profile_requested(scope) -> bool:
+    query = scope.get("query_string", b"")
+    if b"profile=" in query and parse_qs(query.decode("latin-1")).get("profile") == ["1"]:
+        return True
+    return (b"x-profile", b"1") in scope.get("headers", ())
+
+async def profiling_user(scope) -> Optional[User]:
+    """The admin who asked for the profile, or None"""
+    authorization = dict(scope.get("headers", ())).get(b"authorization", b"").decode("latin-1")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        user = await get_current_user(HTTPAuthorizationCredentials(scheme=scheme, credentials=token))
+    except HTTPException:
+        return None
+    return user if user.is_admin else None
+
+async def store_profile(profile: dict):
+    try:
+        await db.request_profiles.insert_one(profile)
+    except Exception:
+        logger.exception("Could not store request profile")
+
+class RequestProfilerMiddleware:
+    """Profile admin requests that ask for it; any other request passes straight through"""
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not profile_requested(scope):
+            return await self.app(scope, receive, send)
+        user = await profiling_user(scope)
+        if user is None:
+            return await self.app(scope, receive, send)
+        
+        profile_id = str(uuid.uuid4())
+        profiler = SamplingProfiler(threading.get_ident())
+        
+        async def send_with_profile(message):
+            # Report when the response starts; a streamed body is not profiled
+            if message["type"] == "http.response.start":
+                profiler.stop()
+                timing = ", ".join(f"{category};dur={ms}" for category, ms in profiler.breakdown().items())
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", profile_id.encode()))
+                if timing:
+                    headers.append((b"server-timing", timing.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+        
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            profiler.stop()
+            run_detached(store_profile({
+                "id": profile_id,
+                "user_id": user.id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "query_string": scope.get("query_string", b"").decode("latin-1"),
+                "duration_ms": round(profiler.duration_ms, 2),
+                "interval_ms": PROFILE_INTERVAL_MS,
+                "samples": sum(profiler.stacks.values()),
+                "breakdown": profiler.breakdown(),
+                "folded": profiler.folded(),
+                "created_at": datetime.utcnow(),
+            }))
+
+@api_router.get("/admin/profiles")
+async def list_request_profiles(limit: int = Query(50, ge=1, le=500), admin: User = Depends(get_admin_user)):
+    return await db.request_profiles.find(
+        {}, {"_id": 0, "folded": 0}
+    ).sort("created_at", -1).limit(limit).to_list(limit)
+
+@api_router.get("/admin/profiles/{profile_id}")
+async def get_request_profile(profile_id: str, format: str = "json", admin: User = Depends(get_admin_user)):
+    """format=folded returns the stacks as text for flamegraph.pl or speedscope"""
+    profile = await db.request_profiles.find_one({"id": profile_id}, {"_id": 0})
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "folded":
+        return PlainTextResponse(profile["folded"])
+    return profile
+
+# Trace propagation and export
+TRACEPARENT_PATTERN = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+def parse_traceparent(value: str):
+    """(trace_id, parent span id, sampled), or None if missing or malformed"""
+    match = TRACEPARENT_PATTERN.match(value.strip().lower())
+    if not match or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    return match.group(1), match.group(2), bool(int(match.group(3), 16) & 1)
+
+class TracingMiddleware:
+    """Root server span per request, joining the caller's trace when it sends traceparent"""
+    def __init__(self, app):
+        self.app = app
     
-    comments = await db.comments.find({"task_id": task_id}).to_list(1000)
-    return [Comment(**comment) for comment in comments]
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        parent = parse_traceparent(dict(scope.get("headers", ())).get(b"traceparent", b"").decode("latin-1"))
+        if parent:
+            trace_id, parent_id, sampled = parent
+        else:
+            trace_id, parent_id, sampled = os.urandom(16).hex(), None, random.random() < TRACE_SAMPLE_RATE
+        if not sampled:
+            return await self.app(scope, receive, send)
+        
+        root = Span(trace_id, parent_id, f"{scope['method']} {scope['path']}", SPAN_KIND_SERVER, {
+            "http.method": scope["method"],
+            "http.target": scope["path"],
+        })
+        
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                root.attributes["http.status_code"] = message["status"]
+            await send(message)
+        
+        token = current_span.set(root)
+        error = None
+        try:
+            await self.app(scope, receive, send_with_status)
+        except Exception as exc:
+            error = f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            current_span.reset(token)
+            # The router leaves the matched route in the scope; name the span after its template
+            route = getattr(scope.get("route"), "path", None)
+            if route:
+                root.name = f"{scope['method']} {route}"
+                root.attributes["http.route"] = route
+            if error is None and root.attributes.get("http.status_code", 500) >= 500:
+                error = f"HTTP {root.attributes.get('http.status_code', 500)}"
+            root.end(error)
+
+def span_record(finished: Span) -> dict:
+    return {
+        "trace_id": finished.trace_id,
+        "span_id": finished.span_id,
+        "parent_span_id": finished.parent_id,
+        "name": finished.name,
+        "kind": finished.kind,
+        "start_time_unix_nano": finished.start_ns,
+        "duration_ms": round((finished.end_ns - finished.start_ns) / 1e6, 3),
+        "attributes": finished.attributes,
+        "error": finished.error,
+        "service": TRACE_SERVICE_NAME,
+    }
+
+def otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+def otlp_span(finished: Span) -> dict:
+    otlp = {
+        "traceId": finished.trace_id,
+        "spanId": finished.span_id,
+        "name": finished.name,
+        "kind": finished.kind,
+        "startTimeUnixNano": str(finished.start_ns),
+        "endTimeUnixNano": str(finished.end_ns),
+        "attributes": [{"key": key, "value": otlp_value(value)} for key, value in finished.attributes.items()],
+        "status": {"code": 2, "message": finished.error} if finished.error else {"code": 1},
+    }
+    if finished.parent_id:
+        otlp["parentSpanId"] = finished.parent_id
+    return otlp
+
+def export_spans(spans: List[Span]):
+    """Blocking export, run in a thread"""
+    if TRACE_EXPORTER == "jsonl":
+        with open(TRACE_JSONL_PATH, "a", encoding="utf-8") as f:
+            for finished in spans:
+                f.write(json.dumps(span_record(finished)) + "\n")
+        return
+    payload = {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": TRACE_SERVICE_NAME}}]},
+        "scopeSpans": [{"scope": {"name": "server"}, "spans": [otlp_span(finished) for finished in spans]}],
+    }]}
+    request = urllib.request.Request(
+        TRACE_OTLP_ENDPOINT,
+        data=json.dumps(payload).encode(),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    with urllib.request.urlopen(request, timeout=5):
+        pass
+
+async def flush_spans():
+    spans = []
+    while finished_spans:
+        spans.append(finished_spans.popleft())
+    if not spans:
+        return
+    try:
+        await asyncio.to_thread(export_spans, spans)
+    except Exception:
+        logger.exception(f"Could not export {len(spans)} spans")
+
+async def run_trace_exporter():
+    while True:
+        await asyncio.sleep(TRACE_EXPORT_INTERVAL_SECONDS)
+        await flush_spans()
 
 # Include the router in the main app
 app.include_router(api_router)
@@ -449,6 +3451,9 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(RequestProfilerMiddleware)
+if TRACE_EXPORTER:
+    app.add_middleware(TracingMiddleware)
 
 # Configure logging
 logging.basicConfig(
@@ -457,6 +3462,127 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+background_tasks: List[asyncio.Task] = []
+
+async def ensure_indexes():
+    await fan_out(await tenant_router.all(), ensure_tenant_indexes)
+    await db.users.create_index([("name_folded", 1), ("id", 1)])
+    await db.users.create_index([("team_id", 1), ("name_folded", 1), ("id", 1)])
+    await db.users.create_index([("email_folded", 1)])
+    await db.idempotency_keys.create_index([("user_id", 1), ("route", 1), ("key", 1)], unique=True)
+    await db.idempotency_keys.create_index("created_at", expireAfterSeconds=IDEMPOTENCY_TTL_HOURS * 3600)
+    await db.notification_digests.create_index("user_id", unique=True)
+    await db.notification_digests.create_index("send_after")
+    await db.request_profiles.create_index("id", unique=True)
+    await db.workload.create_index([("team_id", 1), ("user_id", 1)], unique=True)
+    await db.archive_stats.create_index([("team_id", 1), ("urgency", 1), ("category", 1)], unique=True)
+    await db.request_profiles.create_index("created_at", expireAfterSeconds=PROFILE_TTL_HOURS * 3600)
+    await ensure_cache_events_collection()
+
+async def ensure_tenant_indexes(tenant: TenantCollections):
+    # Task lookups by id, including $graphLookup's connectToField
+    await tenant.tasks.create_index("id")
+    await tenant.tasks.create_index([("status", 1), ("updated_at", 1)])
+    await tenant.tasks.create_index([("team_id", 1), ("status", 1)])
+    await tenant.tasks.create_index([("team_id", 1), ("updated_at", 1), ("id", 1)])
+    await tenant.tasks.create_index([("updated_at", 1), ("id", 1)])
+    await tenant.task_tombstones.create_index([("team_id", 1), ("deleted_at", 1)])
+    await tenant.task_tombstones.create_index("deleted_at", expireAfterSeconds=SYNC_TOMBSTONE_DAYS * 86400)
+    await tenant.tasks.create_index(
+        [("deadline", 1)],
+        name="open_deadline",
+        partialFilterExpression={"deadline": {"$type": "date"}, "status": {"$in": OPEN_STATUSES}},
+    )
+    await tenant.tasks.create_index(
+        [("team_id", 1), ("deadline", 1), ("id", 1)],
+        name="overdue_by_team",
+        partialFilterExpression={"is_overdue": True},
+    )
+    await tenant.tasks_archive.create_index("id", unique=True)
+    await tenant.tasks_archive.create_index("team_id")
+    await tenant.tasks_archive.create_index("stats_pending", sparse=True)
+    await tenant.comments.create_index("task_id")
+    await tenant.comments_archive.create_index("id", unique=True)
+    await tenant.comments_archive.create_index("task_id")
+    await tenant.task_events.create_index("id", unique=True)
+    await tenant.task_events.create_index([("task_id", 1), ("created_at", 1)])
+
+async def backfill_user_search_fields():
+    """Add the folded search fields to users created before they existed"""
+    users = await db.users.find(
+        {"name_folded": {"$exists": False}},
+        {"_id": 0, "id": 1, "name": 1, "email": 1}
+    ).to_list(None)
+    if users:
+        await db.users.bulk_write([
+            UpdateOne({"id": user["id"]}, {"$set": user_search_fields(user.get("name", ""), user.get("email", ""))})
+            for user in users
+        ], ordered=False)
+
+async def backfill_completed_at(tenant: TenantCollections):
+    """Date tasks completed before completed_at existed by their last update"""
+    for collection in (tenant.tasks, tenant.tasks_archive):
+        await collection.update_many(
+            {"status": "concluida", "completed_at": None},
+            [{"$set": {"completed_at": "$updated_at"}}]
+        )
+
+async def backfill_workload():
+    """Build the workload rollups once, for tasks created before they existed"""
+    if await db.workload.find_one({}, {"_id": 1}):
+        return
+    for team in await db.teams.find({}, {"_id": 0, "id": 1}).to_list(None):
+        await rebuild_team_workload(team["id"])
+
+async def prepare_database() -> bool:
+    try:
+        await ensure_indexes()
+        await backfill_user_search_fields()
+        await backfill_workload()
+        await fan_out(await tenant_router.all(), backfill_completed_at)
+        await backfill_archive_stats()
+    except Exception as e:
+        logger.exception("Could not prepare the database")
+        database_status.update(indexes="failed", error=str(e))
+        return False
+    database_status.update(indexes="verified", error=None)
+    return True
+
+async def retry_prepare_database():
+    """Keep trying until the indexes exist, so /readyz can recover"""
+    while True:
+        await asyncio.sleep(PREPARE_DATABASE_RETRY_SECONDS)
+        if await prepare_database():
+            return
+
+@app.on_event("startup")
+async def startup_db_client():
+    if not await prepare_database():
+        background_tasks.append(asyncio.create_task(retry_prepare_database()))
+    
+    background_tasks.append(asyncio.create_task(run_loop_lag_sampler()))
+    if ARCHIVE_AFTER_DAYS > 0:
+        background_tasks.append(asyncio.create_task(run_archiver()))
+    background_tasks.append(asyncio.create_task(run_overdue_scanner()))
+    if REMINDER_LEAD_MINUTES > 0:
+        background_tasks.append(asyncio.create_task(reminder_scheduler.run()))
+    background_tasks.append(asyncio.create_task(run_invalidation_listener()))
+    background_tasks.append(asyncio.create_task(run_task_events_flusher()))
+    background_tasks.append(asyncio.create_task(run_digest_sender()))
+    if TRACE_EXPORTER:
+        background_tasks.append(asyncio.create_task(run_trace_exporter()))
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    await task_event_buffer.flush()
+    await flush_spans()
+    # Let another worker take over the reminders and archival without waiting for expiry
+    await reminder_scheduler.release_lease()
+    if ARCHIVE_AFTER_DAYS > 0:
+        await release_lease("archiver")
+    if password_hash_pool is not None:
+        password_hash_pool.shutdown(wait=False, cancel_futures=True)
     client.close()
\ No newline at end of file
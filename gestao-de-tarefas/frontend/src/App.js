@@ -1,4 +1,4 @@
-import React, { useState, useEffect, createContext, useContext } from "react";
+import React, { useState, useEffect, useRef, createContext, useContext } from "react";
 import "./App.css";
 import { BrowserRouter, Routes, Route, Navigate } from "react-router-dom";
 import axios from "axios";
@@ -179,6 +179,7 @@ const Dashboard = () => {
   const [loading, setLoading] = useState(true);
   const [view, setView] = useState("dashboard"); // dashboard, tasks, kanban
   const { user, logout } = useAuth();
+  const syncToken = useRef(null);
 
   useEffect(() => {
     fetchStats();
@@ -194,12 +195,31 @@ const Dashboard = () => {
     }
   };
 
+  // Only downloads tasks changed since the last sync, plus deletions
   const fetchTasks = async () => {
     try {
-      const response = await axios.get(`${API}/tasks`);
-      setTasks(response.data);
+      let hasMore = true;
+      while (hasMore) {
+        const params = syncToken.current ? { since: syncToken.current } : {};
+        const response = await axios.get(`${API}/tasks/changes`, { params });
+        const { tasks: changed, deleted, sync_token, has_more } = response.data;
+        setTasks((current) => {
+          const byId = new Map(current.map((task) => [task.id, task]));
+          changed.forEach((task) => byId.set(task.id, task));
+          deleted.forEach((tombstone) => byId.delete(tombstone.task_id));
+          return Array.from(byId.values());
+        });
+        syncToken.current = sync_token;
+        hasMore = has_more;
+      }
       setLoading(false);
     } catch (error) {
+      if (error.response && error.response.status === 410 && syncToken.current) {
+        // Token too old to replay deletions, start over with a full sync
+        syncToken.current = null;
+        setTasks([]);
+        return fetchTasks();
+      }
       console.error("Error fetching tasks:", error);
       setLoading(false);
     }
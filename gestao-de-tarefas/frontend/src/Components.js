@@ -3,13 +3,45 @@ import axios from "axios";
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
+const USER_LOOKUP_BATCH = 100;
+
+// Names of the users the given ids reference, looked up by id in batches
+const useUserNames = (userIds) => {
+  const [names, setNames] = useState({});
+  const key = [...new Set(userIds.filter(Boolean))].sort().join(",");
+
+  useEffect(() => {
+    const missing = key ? key.split(",").filter(id => !(id in names)) : [];
+    if (missing.length === 0) return;
+    const batches = [];
+    for (let i = 0; i < missing.length; i += USER_LOOKUP_BATCH) {
+      const ids = missing.slice(i, i + USER_LOOKUP_BATCH);
+      batches.push(axios.get(`${API}/users/search`, { params: { ids: ids.join(","), limit: USER_LOOKUP_BATCH } }));
+    }
+    Promise.all(batches)
+      .then((responses) => {
+        setNames((current) => {
+          const next = { ...current };
+          missing.forEach((id) => { next[id] = null; });
+          responses.forEach((response) => {
+            response.data.items.forEach((user) => { next[user.id] = user.name; });
+          });
+          return next;
+        });
+      })
+      .catch((error) => console.error('Error fetching users:', error));
+  }, [key]);
+
+  return names;
+};
 
 // Task Manager Component
 const TaskManager = ({ tasks, onTasksChange, getUrgencyColor, getStatusColor }) => {
   const [showModal, setShowModal] = useState(false);
   const [editingTask, setEditingTask] = useState(null);
-  const [users, setUsers] = useState([]);
   const [teams, setTeams] = useState([]);
+  const [responsibleQuery, setResponsibleQuery] = useState("");
+  const [responsibleOptions, setResponsibleOptions] = useState([]);
   const [formData, setFormData] = useState({
     title: "",
     description: "",
@@ -21,20 +53,16 @@ const TaskManager = ({ tasks, onTasksChange, getUrgencyColor, getStatusColor })
     requested_by: ""
   });
 
+  const userNames = useUserNames([
+    ...tasks.map(task => task.responsible_user_id),
+    formData.responsible_user_id,
+    formData.requested_by
+  ]);
+
   useEffect(() => {
-    fetchUsers();
     fetchTeams();
   }, []);
 
-  const fetchUsers = async () => {
-    try {
-      const response = await axios.get(`${API}/users`);
-      setUsers(response.data);
-    } catch (error) {
-      console.error('Error fetching users:', error);
-    }
-  };
-
   const fetchTeams = async () => {
     try {
       const response = await axios.get(`${API}/teams`);
@@ -44,6 +72,22 @@ const TaskManager = ({ tasks, onTasksChange, getUrgencyColor, getStatusColor })
     }
   };
 
+  // Responsible picker only loads one page of matching users
+  useEffect(() => {
+    if (!showModal) return;
+    const timeout = setTimeout(async () => {
+      try {
+        const params = { q: responsibleQuery, limit: 20 };
+        if (formData.team_id) params.team_id = formData.team_id;
+        const response = await axios.get(`${API}/users/search`, { params });
+        setResponsibleOptions(response.data.items);
+      } catch (error) {
+        console.error('Error searching users:', error);
+      }
+    }, 250);
+    return () => clearTimeout(timeout);
+  }, [showModal, responsibleQuery, formData.team_id]);
+
   const handleSubmit = async (e) => {
     e.preventDefault();
     try {
@@ -102,10 +146,7 @@ const TaskManager = ({ tasks, onTasksChange, getUrgencyColor, getStatusColor })
     });
   };
 
-  const getUserName = (userId) => {
-    const user = users.find(u => u.id === userId);
-    return user ? user.name : 'Usuário não encontrado';
-  };
+  const getUserName = (userId) => userNames[userId] || 'Usuário não encontrado';
 
   const getTeamName = (teamId) => {
     const team = teams.find(t => t.id === teamId);
@@ -242,6 +283,13 @@ const TaskManager = ({ tasks, onTasksChange, getUrgencyColor, getStatusColor })
                 <div className="grid grid-cols-1 md:grid-cols-2 gap-4">
                   <div>
                     <label className="block text-sm font-medium text-gray-700 mb-2">Responsável *</label>
+                    <input
+                      type="text"
+                      value={responsibleQuery}
+                      onChange={(e) => setResponsibleQuery(e.target.value)}
+                      className="form-input mb-2"
+                      placeholder="Buscar por nome ou email"
+                    />
                     <select
                       required
                       value={formData.responsible_user_id}
@@ -249,8 +297,11 @@ const TaskManager = ({ tasks, onTasksChange, getUrgencyColor, getStatusColor })
                       className="form-select"
                     >
                       <option value="">Selecione um responsável</option>
-                      {users.map((user) => (
-                        <option key={user.id} value={user.id}>{user.name}</option>
+                      {formData.responsible_user_id && !responsibleOptions.some(u => u.id === formData.responsible_user_id) && (
+                        <option value={formData.responsible_user_id}>{getUserName(formData.responsible_user_id)}</option>
+                      )}
+                      {responsibleOptions.map((user) => (
+                        <option key={user.id} value={user.id}>{user.name} ({user.email})</option>
                       ))}
                     </select>
                   </div>
@@ -320,7 +371,10 @@ const TaskManager = ({ tasks, onTasksChange, getUrgencyColor, getStatusColor })
                       className="form-select"
                     >
                       <option value="">Quem solicitou</option>
-                      {users.map((user) => (
+                      {formData.requested_by && !responsibleOptions.some(u => u.id === formData.requested_by) && (
+                        <option value={formData.requested_by}>{getUserName(formData.requested_by)}</option>
+                      )}
+                      {responsibleOptions.map((user) => (
                         <option key={user.id} value={user.id}>{user.name}</option>
                       ))}
                     </select>
@@ -365,29 +419,53 @@ const TaskManager = ({ tasks, onTasksChange, getUrgencyColor, getStatusColor })
 
 // Kanban Board Component
 const KanbanBoard = ({ tasks, onTasksChange, getUrgencyColor, getStatusColor }) => {
-  const [users, setUsers] = useState([]);
+  const [board, setBoard] = useState({});
+  const userNames = useUserNames(
+    Object.values(board).flatMap(column => column.tasks.map(task => task.responsible_user_id))
+  );
 
   useEffect(() => {
-    fetchUsers();
+    fetchBoard();
   }, []);
 
-  const fetchUsers = async () => {
+  // Each column arrives with its total count and only its first cards
+  const fetchBoard = async () => {
     try {
-      const response = await axios.get(`${API}/users`);
-      setUsers(response.data);
+      const response = await axios.get(`${API}/tasks/board`);
+      const columnsByStatus = {};
+      response.data.columns.forEach((column) => {
+        columnsByStatus[column.status] = column;
+      });
+      setBoard(columnsByStatus);
     } catch (error) {
-      console.error('Error fetching users:', error);
+      console.error('Error fetching board:', error);
     }
   };
 
-  const getUserName = (userId) => {
-    const user = users.find(u => u.id === userId);
-    return user ? user.name : 'Usuário não encontrado';
+  const loadMore = async (status) => {
+    const column = board[status];
+    try {
+      const response = await axios.get(`${API}/tasks/board/${status}`, {
+        params: { cursor: column.next_cursor }
+      });
+      setBoard({
+        ...board,
+        [status]: {
+          ...response.data,
+          tasks: [...column.tasks, ...response.data.tasks]
+        }
+      });
+    } catch (error) {
+      console.error('Error loading more tasks:', error);
+    }
   };
 
+  const getUserName = (userId) => userNames[userId] || 'Usuário não encontrado';
+
   const updateTaskStatus = async (taskId, newStatus) => {
     try {
       await axios.put(`${API}/tasks/${taskId}`, { status: newStatus });
+      fetchBoard();
       onTasksChange();
     } catch (error) {
       console.error('Error updating task status:', error);
@@ -430,13 +508,12 @@ const KanbanBoard = ({ tasks, onTasksChange, getUrgencyColor, getStatusColor })
             <div className="kanban-header">
               <h3>{column.title}</h3>
               <span className="text-sm text-gray-500">
-                ({tasks.filter(task => task.status === column.id).length})
+                ({board[column.id] ? board[column.id].count : 0})
               </span>
             </div>
             
             <div className="space-y-3">
-              {tasks
-                .filter(task => task.status === column.id)
+              {(board[column.id] ? board[column.id].tasks : [])
                 .map((task) => (
                   <div
                     key={task.id}
@@ -480,6 +557,15 @@ const KanbanBoard = ({ tasks, onTasksChange, getUrgencyColor, getStatusColor })
                     </div>
                   </div>
                 ))}
+              
+              {board[column.id] && board[column.id].next_cursor && (
+                <button
+                  onClick={() => loadMore(column.id)}
+                  className="w-full text-sm text-blue-600 hover:text-blue-800 py-2"
+                >
+                  Carregar mais
+                </button>
+              )}
             </div>
           </div>
         ))}
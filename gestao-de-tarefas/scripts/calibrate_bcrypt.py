@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Script para medir o custo do bcrypt neste servidor e recomendar BCRYPT_ROUNDS
+"""
+import argparse
+import statistics
+import sys
+import time
+
+from passlib.context import CryptContext
+
+def measure_rounds(rounds, samples):
+    """Retorna a mediana, em milissegundos, de um hash com o custo informado"""
+    context = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=rounds)
+    # O primeiro hash também carrega o backend do bcrypt
+    context.hash("aquecimento")
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        context.hash("calibracao-bcrypt")
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibra o custo do bcrypt para uma latência alvo")
+    parser.add_argument("--target-ms", type=float, default=250, help="latência alvo por hash em ms (padrão: 250)")
+    parser.add_argument("--samples", type=int, default=3, help="hashes medidos por custo (padrão: 3)")
+    parser.add_argument("--min-rounds", type=int, default=10, help="menor custo avaliado (padrão: 10)")
+    parser.add_argument("--max-rounds", type=int, default=16, help="maior custo avaliado (padrão: 16)")
+    args = parser.parse_args()
+
+    print(f"🔍 Medindo bcrypt (alvo: {args.target_ms:.0f} ms por hash)")
+    print("=" * 50)
+
+    recommended = None
+    for rounds in range(args.min_rounds, args.max_rounds + 1):
+        elapsed = measure_rounds(rounds, args.samples)
+        within_target = elapsed <= args.target_ms
+        print(f"{'✅' if within_target else '❌'} rounds={rounds:2d}: {elapsed:8.1f} ms")
+        if within_target:
+            recommended = rounds
+        else:
+            # Cada round a mais dobra o custo, não adianta continuar
+            break
+
+    print("=" * 50)
+
+    if recommended is None:
+        print(f"⚠️  Nem o custo {args.min_rounds} cabe em {args.target_ms:.0f} ms neste servidor.")
+        print(f"Use BCRYPT_ROUNDS={args.min_rounds} ou aumente a latência alvo.")
+        return 1
+
+    print(f"🎉 Custo recomendado: BCRYPT_ROUNDS={recommended}")
+    print("\nHashes com outro custo são refeitos automaticamente no próximo login.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Script para subir um replica set local de três nós (mongod) para testes
+
+Uso:
+    python scripts/local_replica_set.py
+    TEST_REPLSET_URL=<url impressa> pytest tests
+"""
+import argparse
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+def start_member(mongod, replset, port, data_dir, log_dir):
+    db_path = Path(data_dir) / f"node{port}"
+    db_path.mkdir(parents=True, exist_ok=True)
+    return subprocess.Popen([
+        mongod,
+        "--replSet", replset,
+        "--port", str(port),
+        "--bind_ip", "localhost",
+        "--dbpath", str(db_path),
+        "--logpath", str(Path(log_dir) / f"node{port}.log"),
+    ])
+
+def wait_for_member(port, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with MongoClient("localhost", port, directConnection=True, serverSelectionTimeoutMS=500) as probe:
+                probe.admin.command("ping")
+                return True
+        except PyMongoError:
+            time.sleep(0.5)
+    return False
+
+def initiate(replset, ports, timeout):
+    """Inicia o replica set e espera um primário e dois secundários"""
+    config = {
+        "_id": replset,
+        "members": [{"_id": i, "host": f"localhost:{port}"} for i, port in enumerate(ports)],
+    }
+    # O primeiro nó tem prioridade maior para ser sempre o primário
+    config["members"][0]["priority"] = 2
+    with MongoClient("localhost", ports[0], directConnection=True) as seed:
+        seed.admin.command("replSetInitiate", config)
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            states = [m["stateStr"] for m in seed.admin.command("replSetGetStatus")["members"]]
+            if states.count("PRIMARY") == 1 and states.count("SECONDARY") == len(ports) - 1:
+                return True
+            time.sleep(0.5)
+    return False
+
+def main():
+    parser = argparse.ArgumentParser(description="Sobe um replica set local de três nós para testes")
+    parser.add_argument("--mongod", default="mongod", help="caminho do binário mongod (padrão: mongod no PATH)")
+    parser.add_argument("--replset", default="rs0", help="nome do replica set (padrão: rs0)")
+    parser.add_argument("--port", type=int, default=27117, help="porta do primeiro nó (padrão: 27117)")
+    parser.add_argument("--timeout", type=float, default=60, help="segundos para os nós ficarem prontos (padrão: 60)")
+    args = parser.parse_args()
+
+    if not shutil.which(args.mongod):
+        print(f"❌ mongod não encontrado: {args.mongod}")
+        sys.exit(1)
+
+    ports = [args.port, args.port + 1, args.port + 2]
+    data_dir = tempfile.mkdtemp(prefix="gestao-replset-")
+    print(f"🚀 Subindo replica set {args.replset} em {data_dir}")
+    print("=" * 50)
+
+    members = [start_member(args.mongod, args.replset, port, data_dir, data_dir) for port in ports]
+    try:
+        for port in ports:
+            if not wait_for_member(port, args.timeout):
+                print(f"❌ Nó localhost:{port} não respondeu (veja {data_dir}/node{port}.log)")
+                sys.exit(1)
+            print(f"✅ Nó localhost:{port} no ar")
+
+        if not initiate(args.replset, ports, args.timeout):
+            print("❌ O replica set não elegeu um primário a tempo")
+            sys.exit(1)
+
+        hosts = ",".join(f"localhost:{port}" for port in ports)
+        print("=" * 50)
+        print("✅ Replica set pronto. Para rodar os testes:")
+        print(f"   export TEST_REPLSET_URL='mongodb://{hosts}/?replicaSet={args.replset}'")
+        print("   pytest tests")
+        print("\nPressione Ctrl+C para encerrar")
+        while all(member.poll() is None for member in members):
+            time.sleep(1)
+        print("❌ Um dos nós parou inesperadamente")
+    except KeyboardInterrupt:
+        print("\n🛑 Encerrando replica set")
+    finally:
+        for member in members:
+            member.terminate()
+        for member in members:
+            member.wait()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+In-process harness: runs the FastAPI app against a local MongoDB and counts
+the commands each request sends to it.
+
+Point TEST_MONGO_URL at a disposable mongod (default mongodb://localhost:27017).
+When none is reachable the run fails, so it can never pass without running a
+single test; set TEST_SKIP_WITHOUT_MONGO=1 to skip the suite instead. Setting
+TEST_REPLSET_URL (see scripts/local_replica_set.py) runs the whole suite
+against a replica set instead and enables the read preference tests.
+"""
+import asyncio
+import os
+import sys
+import uuid
+from collections import namedtuple
+from contextlib import contextmanager
+from pathlib import Path
+
+import pytest
+from pymongo import MongoClient, monitoring
+from pymongo.errors import PyMongoError
+
+TEST_REPLSET_URL = os.environ.get("TEST_REPLSET_URL")
+TEST_MONGO_URL = TEST_REPLSET_URL or os.environ.get("TEST_MONGO_URL", "mongodb://localhost:27017")
+TEST_DB_NAME = f"taskmanager_test_{uuid.uuid4().hex[:8]}"
+TEST_SKIP_WITHOUT_MONGO = os.environ.get("TEST_SKIP_WITHOUT_MONGO") == "1"
+
+# Fire-and-forget bus traffic is not on the request path
+IGNORED_COLLECTIONS = {"cache_events"}
+
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.commands = None
+        self.events = None
+
+    def started(self, event):
+        if self.commands is None or event.database_name != TEST_DB_NAME:
+            return
+        collection = event.command.get(event.command_name)
+        if collection in IGNORED_COLLECTIONS:
+            return
+        self.commands.append(event.command_name)
+        self.events.append(event)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+command_counter = CommandCounter()
+
+
+def mongo_available() -> bool:
+    probe = MongoClient(TEST_MONGO_URL, serverSelectionTimeoutMS=500)
+    try:
+        probe.admin.command("ping")
+        return True
+    except PyMongoError:
+        return False
+    finally:
+        probe.close()
+
+
+MONGO_AVAILABLE = mongo_available()
+
+if MONGO_AVAILABLE:
+    # The listener must be registered before server.py creates its client
+    monitoring.register(command_counter)
+    os.environ["MONGO_URL"] = TEST_MONGO_URL
+    os.environ["DB_NAME"] = TEST_DB_NAME
+    sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+    import httpx
+    import server
+
+
+@pytest.fixture(scope="session")
+def loop():
+    if not MONGO_AVAILABLE:
+        if TEST_SKIP_WITHOUT_MONGO:
+            pytest.skip(f"MongoDB not reachable at {TEST_MONGO_URL}")
+        pytest.exit(f"MongoDB not reachable at {TEST_MONGO_URL} (TEST_SKIP_WITHOUT_MONGO=1 skips the suite)", returncode=1)
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.run_until_complete(server.client.drop_database(TEST_DB_NAME))
+    loop.close()
+
+
+@pytest.fixture(scope="session")
+def run(loop):
+    """Run a coroutine on the session loop, which the Motor client is bound to"""
+    return loop.run_until_complete
+
+
+@pytest.fixture(scope="session", autouse=True)
+def indexes(run):
+    run(server.ensure_indexes())
+
+
+@pytest.fixture(autouse=True)
+def clean_db(run):
+    async def clean():
+        for name in await server.db.list_collection_names():
+            if name not in IGNORED_COLLECTIONS:
+                await server.db[name].delete_many({})
+        for cache in server.cache_registry.values():
+            cache.evict()
+    run(clean())
+
+
+@pytest.fixture
+def api(run):
+    """Synchronous facade over an in-process httpx client"""
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://testserver")
+
+    class Api:
+        def request(self, method, url, token=None, **kwargs):
+            headers = kwargs.pop("headers", {})
+            if token:
+                headers["Authorization"] = f"Bearer {token}"
+            return run(client.request(method, url, headers=headers, **kwargs))
+
+    yield Api()
+    run(client.aclose())
+
+
+@pytest.fixture
+def seed(run):
+    """Insert an admin, a team and a member directly, skipping bcrypt"""
+    async def create():
+        team = server.Team(name="Equipe Teste", created_by="admin")
+        admin = server.User(email="admin@test.com", name="Admin", password_hash="x", is_admin=True)
+        member = server.User(email="member@test.com", name="Membro", password_hash="x", team_id=team.id)
+        await server.db.teams.insert_one(team.dict())
+        for user in (admin, member):
+            await server.db.users.insert_one({**user.dict(), **server.user_search_fields(user.name, user.email)})
+        # The routing table is cached; budgets measure the steady state
+        await server.tenant_router.routes()
+        return {
+            "team": team,
+            "admin": admin,
+            "member": member,
+            "admin_token": server.create_access_token({"sub": admin.email}),
+            "member_token": server.create_access_token({"sub": member.email}),
+        }
+    return run(create())
+
+
+@pytest.fixture
+def add_tasks(run):
+    def add(team_id: str, responsible_user_id: str, count: int):
+        tasks = [
+            server.Task(
+                title=f"Tarefa {i}",
+                description="x" * 200,
+                responsible_user_id=responsible_user_id,
+                category="Teste",
+                urgency=["baixa", "media", "alta", "critica"][i % 4],
+                status=server.TASK_STATUSES[i % 3],
+                requested_by=responsible_user_id,
+                team_id=team_id,
+            ).dict()
+            for i in range(count)
+        ]
+        run(server.db.tasks.insert_many(tasks))
+        return tasks
+    return add
+
+
+@pytest.fixture
+def create_task(api, seed):
+    """POST a task for the seeded team as the member; fields override the defaults"""
+    def create(token=None, **fields):
+        body = {
+            "title": "Tarefa",
+            "responsible_user_id": seed["member"].id,
+            "category": "Teste",
+            "urgency": "alta",
+            "requested_by": seed["member"].id,
+            "team_id": seed["team"].id,
+            **fields,
+        }
+        response = api.request("POST", "/api/tasks", token=token or seed["member_token"], json=body)
+        assert response.status_code == 200, response.text
+        return response.json()
+    return create
+
+
+SentEmail = namedtuple("SentEmail", "to title description subject")
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Notification emails, recorded instead of sent"""
+    sent = []
+
+    async def record(user_email, task_title, task_description, subject="New task"):
+        sent.append(SentEmail(user_email, task_title, task_description, subject))
+
+    monkeypatch.setattr(server, "send_notification_email", record)
+    return sent
+
+
+@contextmanager
+def count_commands():
+    """Collect the names of the MongoDB commands sent inside the block"""
+    with record_commands():
+        yield command_counter.commands
+
+
+@contextmanager
+def record_commands():
+    """Collect the CommandStartedEvents sent inside the block"""
+    command_counter.commands = []
+    command_counter.events = []
+    try:
+        yield command_counter.events
+    finally:
+        command_counter.commands = None
+        command_counter.events = None
+
+
+@pytest.fixture
+def commands():
+    return count_commands
+
+
+@pytest.fixture
+def command_events():
+    return record_commands
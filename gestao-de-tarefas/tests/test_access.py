@@ -0,0 +1,61 @@
+"""
+Team scoping: a user without a team never falls through to the admin scope.
+"""
+import pytest
+
+
+@pytest.fixture
+def teamless_token(run, seed, add_tasks):
+    """A non-admin without a team, next to tasks of the seeded team"""
+    import server
+
+    user = server.User(email="solo@test.com", name="Solo", password_hash="x")
+    run(server.db.users.insert_one({**user.dict(), **server.user_search_fields(user.name, user.email)}))
+    add_tasks(seed["team"].id, seed["member"].id, 3)
+    return server.create_access_token({"sub": user.email})
+
+
+def test_teamless_user_sees_no_tasks(api, seed, teamless_token):
+    # Warm the admin scope first, a teamless read must not reuse it
+    assert len(api.request("GET", "/api/tasks", token=seed["admin_token"]).json()) == 3
+
+    response = api.request("GET", "/api/tasks", token=teamless_token)
+    assert response.status_code == 200, response.text
+    assert response.json() == []
+    assert api.request("GET", "/api/tasks?fields=id", token=teamless_token).json() == []
+
+
+def test_teamless_user_gets_zeroed_stats(api, seed, teamless_token):
+    assert api.request("GET", "/api/dashboard/stats", token=seed["admin_token"]).json()["total_tasks"] == 3
+
+    response = api.request("GET", "/api/dashboard/stats", token=teamless_token)
+    assert response.status_code == 200, response.text
+    stats = response.json()
+    assert (stats["total_tasks"], stats["completed_tasks"], stats["category_stats"]) == (0, 0, {})
+
+
+def test_teamless_user_sees_an_empty_board(api, teamless_token):
+    response = api.request("GET", "/api/tasks/board", token=teamless_token)
+    assert response.status_code == 200, response.text
+    assert [column["count"] for column in response.json()["columns"]] == [0, 0, 0]
+
+    response = api.request("GET", "/api/tasks/board/pendente", token=teamless_token)
+    assert (response.json()["count"], response.json()["tasks"]) == (0, [])
+
+
+@pytest.mark.parametrize("payload", [[1, 2], 5, [0, 0, "not-a-date", "x"]])
+def test_malformed_board_cursor_is_rejected(api, seed, payload):
+    import server
+
+    cursor = server.encode_cursor(payload)
+    response = api.request("GET", f"/api/tasks/board/pendente?cursor={cursor}", token=seed["member_token"])
+    assert response.status_code == 400
+
+
+def test_teamless_user_sees_no_overdue_tasks(api, run, teamless_token):
+    import server
+
+    run(server.db.tasks.update_many({}, {"$set": {"is_overdue": True}}))
+    response = api.request("GET", "/api/tasks/overdue", token=teamless_token)
+    assert response.status_code == 200, response.text
+    assert response.json() == []
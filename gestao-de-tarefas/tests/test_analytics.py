@@ -0,0 +1,67 @@
+"""
+Team analytics: closed days are cached as per-day aggregates.
+"""
+from datetime import datetime, timedelta
+
+
+def test_cached_days_give_the_same_analytics(api, run, seed, add_tasks):
+    import server
+
+    tasks = add_tasks(seed["team"].id, seed["member"].id, 9)
+    now = datetime.utcnow()
+    for i, task in enumerate(tasks):
+        run(server.db.tasks.update_one({"id": task["id"]}, {"$set": {
+            "created_at": now - timedelta(days=i + 3), "updated_at": now - timedelta(days=i % 3),
+            "completed_at": now - timedelta(days=i % 3) if task["status"] == "concluida" else None,
+        }}))
+    url = f"/api/analytics/teams/{seed['team'].id}?days=7"
+
+    first = api.request("GET", url, token=seed["member_token"])
+    assert first.status_code == 200, first.text
+    assert first.json()["lead_time_hours"]["overall"]["count"] == 3
+    assert len(server.analytics_day_cache._entries) >= 5
+
+    assert api.request("GET", url, token=seed["member_token"]).json() == first.json()
+
+
+def test_day_cache_is_bounded(api, seed, monkeypatch):
+    import server
+
+    monkeypatch.setattr(server.analytics_day_cache, "max_entries", 10)
+    api.request("GET", f"/api/analytics/teams/{seed['team'].id}?days=30", token=seed["member_token"])
+    assert len(server.analytics_day_cache._entries) == 10
+
+
+def test_editing_a_completed_task_keeps_its_completion_day(api, run, seed, create_task):
+    import server
+
+    task = create_task()
+    token = seed["member_token"]
+    assert api.request("PUT", f"/api/tasks/{task['id']}", token=token, json={"status": "concluida"}).json()["completed_at"]
+    two_days_ago = datetime.utcnow() - timedelta(days=2)
+    run(server.db.tasks.update_one({"id": task["id"]}, {"$set": {
+        "created_at": two_days_ago - timedelta(hours=5), "completed_at": two_days_ago
+    }}))
+    url = f"/api/analytics/teams/{seed['team'].id}?days=7"
+    before = api.request("GET", url, token=token).json()
+
+    # The edit happens today, the completion stays two days ago and is counted once
+    edited = api.request("PUT", f"/api/tasks/{task['id']}", token=token, json={"title": "Renomeada"}).json()
+    assert abs(datetime.fromisoformat(edited["completed_at"]) - two_days_ago) < timedelta(milliseconds=1)
+    after = api.request("GET", url, token=token).json()
+    assert [day["completed"] for day in after["throughput"]] == [day["completed"] for day in before["throughput"]]
+    assert sum(day["completed"] for day in after["throughput"]) == 1
+    assert after["lead_time_hours"]["overall"]["max"] == 5.0
+
+    reopened = api.request("PUT", f"/api/tasks/{task['id']}", token=token, json={"status": "pendente"}).json()
+    assert reopened["completed_at"] is None
+
+
+def test_completion_dates_are_backfilled(run, seed, add_tasks):
+    import server
+
+    add_tasks(seed["team"].id, seed["member"].id, 6)
+    run(server.db.tasks.update_many({}, {"$unset": {"completed_at": ""}}))
+    run(server.backfill_completed_at(server.default_tenant))
+    tasks = run(server.db.tasks.find({}, {"_id": 0}).to_list(None))
+    assert all((task.get("completed_at") == task["updated_at"]) == (task["status"] == "concluida") for task in tasks)
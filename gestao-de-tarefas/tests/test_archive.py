@@ -0,0 +1,76 @@
+"""
+Archival: dashboard stats read archived counters instead of scanning the archive.
+"""
+from datetime import datetime, timedelta
+
+
+def age_completed_tasks(run):
+    import server
+
+    old = datetime.utcnow() - timedelta(days=server.ARCHIVE_AFTER_DAYS + 1)
+    run(server.db.tasks.update_many({"status": "concluida"}, {"$set": {"updated_at": old}}))
+
+
+def test_stats_survive_archival(api, run, seed, add_tasks):
+    import server
+
+    add_tasks(seed["team"].id, seed["member"].id, 6)
+    age_completed_tasks(run)
+    before = api.request("GET", "/api/dashboard/stats", token=seed["member_token"]).json()
+    assert (before["total_tasks"], before["completed_tasks"]) == (6, 2)
+
+    assert run(server.archive_completed_tasks(server.default_tenant)) == 2
+    assert run(server.db.tasks.count_documents({})) == 4
+    server.dashboard_stats_cache.evict()
+    assert api.request("GET", "/api/dashboard/stats", token=seed["member_token"]).json() == before
+
+    counters = run(server.db.archive_stats.find({}, {"_id": 0, "count": 1}).to_list(None))
+    run(server.db.archive_stats.delete_many({}))
+    run(server.backfill_archive_stats())
+    assert run(server.db.archive_stats.find({}, {"_id": 0, "count": 1}).to_list(None)) == counters
+
+
+def test_archived_tasks_are_listed_on_request(api, run, seed, add_tasks):
+    import server
+
+    tasks = add_tasks(seed["team"].id, seed["member"].id, 6)
+    age_completed_tasks(run)
+    assert run(server.archive_completed_tasks(server.default_tenant)) == 2
+
+    token = seed["member_token"]
+    active = {task["id"] for task in api.request("GET", "/api/tasks", token=token).json()}
+    assert active == {task["id"] for task in tasks if task["status"] != "concluida"}
+    response = api.request("GET", "/api/tasks?include_archived=true", token=token)
+    assert response.status_code == 200, response.text
+    assert {task["id"] for task in response.json()} == {task["id"] for task in tasks}
+
+
+def test_counters_recover_from_a_pass_that_stopped_halfway(api, run, seed, add_tasks):
+    import server
+
+    add_tasks(seed["team"].id, seed["member"].id, 6)
+    age_completed_tasks(run)
+    assert run(server.archive_completed_tasks(server.default_tenant)) == 2
+    counters = run(server.db.archive_stats.find({}, {"_id": 0}).sort("urgency", 1).to_list(None))
+    assert sum(counter["count"] for counter in counters) == 2
+
+    # Crashed after moving the tasks, before counting them: the next pass counts them once
+    run(server.db.archive_stats.delete_many({}))
+    run(server.db.tasks_archive.update_many({}, {"$set": {"stats_pending": True}}))
+    assert run(server.archive_completed_tasks(server.default_tenant)) == 0
+    assert run(server.db.archive_stats.find({}, {"_id": 0}).sort("urgency", 1).to_list(None)) == counters
+
+    # Counting twice does not count twice
+    run(server.db.tasks_archive.update_many({}, {"$set": {"stats_pending": True}}))
+    run(server.recount_archive_stats(server.default_tenant))
+    assert run(server.db.archive_stats.find({}, {"_id": 0}).sort("urgency", 1).to_list(None)) == counters
+
+
+def test_archiver_lease_is_exclusive(run):
+    import server
+
+    assert run(server.acquire_lease("archiver", 60, "worker-a"))
+    assert not run(server.acquire_lease("archiver", 60, "worker-b"))
+    assert run(server.acquire_lease("archiver", 60, "worker-a"))
+    run(server.release_lease("archiver", "worker-a"))
+    assert run(server.acquire_lease("archiver", 60, "worker-b"))
@@ -0,0 +1,42 @@
+"""
+Login: verifies the stored bcrypt hash and upgrades outdated costs in place.
+"""
+import asyncio
+
+import pytest
+from passlib.hash import bcrypt
+
+
+def insert_user(run, field, password_hash):
+    import server
+
+    user = server.User(email="login@test.com", name="Login", password_hash="x").dict()
+    user.pop("password_hash")
+    run(server.db.users.insert_one({**user, field: password_hash}))
+    return user
+
+
+@pytest.mark.parametrize("field", ["password_hash", "hashed_password"])
+def test_login_rehashes_outdated_cost(api, run, field):
+    import server
+
+    outdated = bcrypt.using(rounds=4).hash("segredo")
+    user = insert_user(run, field, outdated)
+
+    response = api.request("POST", "/api/auth/login", json={"email": "login@test.com", "password": "segredo"})
+    assert response.status_code == 200, response.text
+    assert response.json()["access_token"]
+
+    async def settle():
+        await asyncio.gather(*server.detached_tasks)
+    run(settle())
+    stored = run(server.db.users.find_one({"id": user["id"]}))
+    assert stored[field] != outdated
+    assert not server.pwd_context.needs_update(stored[field])
+    assert server.verify_password("segredo", stored[field])
+
+
+def test_login_rejects_a_wrong_password(api, run):
+    insert_user(run, "password_hash", bcrypt.using(rounds=4).hash("segredo"))
+    response = api.request("POST", "/api/auth/login", json={"email": "login@test.com", "password": "errada"})
+    assert response.status_code == 401
@@ -0,0 +1,83 @@
+"""
+Cache invalidation bus: an eviction published by one worker reaches the
+caches of the others through the capped cache_events collection.
+"""
+import asyncio
+
+import pytest
+
+
+@pytest.fixture
+def bus_cache():
+    import server
+
+    cache = server.LocalCache("bus_test")
+    yield cache
+    server.cache_registry.pop("bus_test", None)
+
+
+async def wait_for(condition, timeout: float = 5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.05)
+
+
+async def start_listener(cache, worker_id: str) -> asyncio.Task:
+    """Start a listener and wait until it is tailing the end of the collection"""
+    import server
+
+    # A backlog to skip, so connecting evicts everything once
+    await server.db.cache_events.insert_one({"worker_id": worker_id, "namespace": "bus_test", "keys": ["a"]})
+    version = cache.version
+    listener = asyncio.create_task(server.run_invalidation_listener(worker_id=worker_id))
+    await wait_for(lambda: cache.version != version)
+    return listener
+
+
+def test_published_eviction_reaches_other_workers(run, bus_cache):
+    import server
+
+    async def scenario():
+        listener = await start_listener(bus_cache, "other-worker")
+        try:
+            bus_cache.set("a", 1)
+            bus_cache.set("b", 2)
+            server.publish_invalidation("bus_test", ["a"], local=False)
+            await wait_for(lambda: bus_cache.get("a") is None)
+            assert bus_cache.get("b") == 2
+        finally:
+            listener.cancel()
+            await asyncio.gather(listener, return_exceptions=True)
+    run(scenario())
+
+
+def test_events_from_the_same_worker_are_ignored(run, bus_cache):
+    import server
+
+    async def scenario():
+        listener = await start_listener(bus_cache, server.WORKER_ID)
+        try:
+            bus_cache.set("a", 1)
+            bus_cache.set("b", 2)
+            server.publish_invalidation("bus_test", ["a"], local=False)
+            await asyncio.gather(*server.detached_tasks)
+            await server.db.cache_events.insert_one({"worker_id": "other-worker", "namespace": "bus_test", "keys": ["b"]})
+            await wait_for(lambda: bus_cache.get("b") is None)
+            assert bus_cache.get("a") == 1
+        finally:
+            listener.cancel()
+            await asyncio.gather(listener, return_exceptions=True)
+    run(scenario())
+
+
+def test_plain_events_collection_is_converted_to_capped(run):
+    import server
+
+    async def scenario():
+        await server.db.cache_events.drop()
+        # What a publish before startup finished used to create
+        await server.db.cache_events.insert_one({"namespace": "bus_test"})
+        await server.ensure_cache_events_collection()
+        return await server.db.cache_events.options()
+    assert run(scenario()).get("capped")
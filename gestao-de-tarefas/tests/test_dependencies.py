@@ -0,0 +1,60 @@
+"""
+Task dependencies: blocked_by edges, transitive blockers and the cached
+per-team order.
+"""
+import pytest
+
+
+@pytest.fixture
+def tasks(run, seed, add_tasks):
+    """Four open tasks of the seeded team, keyed A to D"""
+    import server
+
+    created = add_tasks(seed["team"].id, seed["member"].id, 4)
+    run(server.db.tasks.update_many({}, {"$set": {"status": "pendente"}}))
+    return {name: task["id"] for name, task in zip("ABCD", created)}
+
+
+def block(api, seed, task_id, blocker_id):
+    return api.request("POST", f"/api/tasks/{task_id}/blockers", token=seed["member_token"], json={"blocker_id": blocker_id})
+
+
+def test_transitive_blockers_nearest_first(api, seed, tasks):
+    assert block(api, seed, tasks["A"], tasks["B"]).status_code == 200
+    assert block(api, seed, tasks["B"], tasks["C"]).status_code == 200
+
+    response = api.request("GET", f"/api/tasks/{tasks['A']}/blockers", token=seed["member_token"])
+    assert response.status_code == 200, response.text
+    assert [(blocker["id"], blocker["depth"]) for blocker in response.json()] == [(tasks["B"], 1), (tasks["C"], 2)]
+
+
+def test_cycles_are_rejected(api, seed, tasks):
+    assert block(api, seed, tasks["A"], tasks["B"]).status_code == 200
+    assert block(api, seed, tasks["B"], tasks["C"]).status_code == 200
+
+    response = block(api, seed, tasks["C"], tasks["A"])
+    assert response.status_code == 409
+    task = api.request("GET", f"/api/tasks/{tasks['C']}", token=seed["member_token"]).json()
+    assert task["blocked_by"] == []
+
+    assert block(api, seed, tasks["A"], tasks["A"]).status_code == 400
+
+
+def test_team_order_follows_edges_and_status(api, seed, tasks):
+    block(api, seed, tasks["A"], tasks["B"])
+    block(api, seed, tasks["B"], tasks["C"])
+    url = f"/api/teams/{seed['team'].id}/dependencies"
+
+    graph = api.request("GET", url, token=seed["member_token"]).json()
+    order = graph["order"]
+    assert order.index(tasks["C"]) < order.index(tasks["B"]) < order.index(tasks["A"])
+    assert set(graph["blocked"]) == {tasks["A"], tasks["B"]}
+
+    # Finishing the head of the chain unblocks the next task only
+    api.request("PUT", f"/api/tasks/{tasks['C']}", token=seed["member_token"], json={"status": "concluida"})
+    graph = api.request("GET", url, token=seed["member_token"]).json()
+    assert graph["blocked"] == [tasks["A"]]
+
+    api.request("DELETE", f"/api/tasks/{tasks['A']}/blockers/{tasks['B']}", token=seed["member_token"])
+    graph = api.request("GET", url, token=seed["member_token"]).json()
+    assert graph["blocked"] == []
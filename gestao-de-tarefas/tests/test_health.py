@@ -0,0 +1,76 @@
+"""
+Health checks: liveness never touches MongoDB, readiness fails when the ping
+or the index verification does.
+"""
+import pytest
+
+
+@pytest.fixture
+def probe(api, monkeypatch):
+    """GET a health route with a fresh readiness cache and a controllable ping"""
+    import server
+
+    pings = []
+
+    async def ping():
+        pings.append(1)
+        if probe.ping_error:
+            raise probe.ping_error
+        return 1.5
+
+    def probe(path):
+        monkeypatch.setitem(server.readiness_cache, "body", None)
+        return api.request("GET", path)
+    probe.ping_error = None
+    probe.pings = pings
+    monkeypatch.setattr(server, "ping_mongo", ping)
+    monkeypatch.setattr(server, "mongo_ping", None)
+    monkeypatch.setitem(server.database_status, "indexes", "verified")
+    monkeypatch.setitem(server.database_status, "error", None)
+    monkeypatch.setitem(server.loop_lag, "max_ms", 0.0)
+    return probe
+
+
+def test_liveness_does_not_touch_mongo(probe, commands):
+    import server
+
+    probe.ping_error = ConnectionError("unreachable")
+    with commands() as sent:
+        response = probe("/healthz")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok", "worker_id": server.WORKER_ID}
+    assert (sent, probe.pings) == ([], [])
+
+
+def test_ready_when_ping_and_indexes_pass(probe):
+    response = probe("/readyz")
+    assert response.status_code == 200, response.text
+    checks = response.json()["checks"]
+    assert (checks["mongo"], checks["indexes"]["ok"]) == ({"ok": True, "rtt_ms": 1.5}, True)
+
+
+def test_not_ready_when_ping_fails(probe):
+    probe.ping_error = ConnectionError("unreachable")
+    response = probe("/readyz")
+    assert response.status_code == 503
+    assert response.json()["checks"]["mongo"] == {"ok": False, "error": "unreachable"}
+
+
+def test_not_ready_when_index_check_fails(probe, monkeypatch):
+    import server
+
+    monkeypatch.setitem(server.database_status, "indexes", "failed")
+    monkeypatch.setitem(server.database_status, "error", "index build failed")
+    response = probe("/readyz")
+    assert response.status_code == 503
+    assert response.json()["checks"]["indexes"] == {"ok": False, "status": "failed", "error": "index build failed"}
+
+
+def test_failed_index_check_is_reported_by_prepare_database(run, probe, monkeypatch):
+    import server
+
+    async def fail(*args, **kwargs):
+        raise RuntimeError("index build failed")
+    monkeypatch.setattr(server, "ensure_indexes", fail)
+    assert not run(server.prepare_database())
+    assert probe("/readyz").status_code == 503
@@ -0,0 +1,95 @@
+"""
+Idempotency-Key on POST /tasks: replays, conflicts and stale claims.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+
+@pytest.fixture
+def post_task(api, seed):
+    def post(key, title="Tarefa"):
+        body = {
+            "title": title,
+            "responsible_user_id": seed["member"].id,
+            "category": "Teste",
+            "urgency": "alta",
+            "requested_by": seed["member"].id,
+            "team_id": seed["team"].id,
+        }
+        return api.request("POST", "/api/tasks", token=seed["member_token"], json=body, headers={"Idempotency-Key": key})
+    return post
+
+
+def claim(run, seed, key, claimed_at):
+    """A claim left in progress, as by a request still running or one that crashed"""
+    import server
+
+    run(server.db.idempotency_keys.insert_one({
+        "key": key,
+        "user_id": seed["member"].id,
+        "route": "POST /tasks",
+        "fingerprint": "ignored",
+        "status": "in_progress",
+        "created_at": claimed_at,
+        "claimed_at": claimed_at,
+    }))
+
+
+def test_retry_replays_the_first_response(run, post_task):
+    import server
+
+    first = post_task("k1")
+    assert first.status_code == 200, first.text
+    server.idempotency_cache.evict()
+    second = post_task("k1")
+    assert second.status_code == 200, second.text
+    assert second.json()["id"] == first.json()["id"]
+    assert run(server.db.tasks.count_documents({})) == 1
+
+
+def test_key_reused_with_another_body_is_rejected(post_task):
+    assert post_task("k1").status_code == 200
+    assert post_task("k1", title="Outra").status_code == 422
+
+
+def test_claim_in_progress_conflicts(run, seed, post_task, monkeypatch):
+    import server
+
+    monkeypatch.setattr(server, "request_fingerprint", lambda payload: "ignored")
+    claim(run, seed, "k1", datetime.utcnow())
+    assert post_task("k1").status_code == 409
+
+
+def test_stale_claim_is_taken_over(run, seed, post_task, monkeypatch):
+    import server
+
+    monkeypatch.setattr(server, "request_fingerprint", lambda payload: "ignored")
+    claim(run, seed, "k1", datetime.utcnow() - timedelta(seconds=server.IDEMPOTENCY_LOCK_SECONDS + 1))
+    response = post_task("k1")
+    assert response.status_code == 200, response.text
+    stored = run(server.db.idempotency_keys.find_one({"key": "k1"}))
+    assert (stored["status"], stored["response"]["id"]) == ("done", response.json()["id"])
+
+
+def test_retry_after_a_lost_response_does_not_create_a_second_task(run, post_task, monkeypatch):
+    import server
+
+    complete = server.complete_idempotent_request
+
+    async def crash(*args, **kwargs):
+        raise RuntimeError("worker died before storing the response")
+    monkeypatch.setattr(server, "complete_idempotent_request", crash)
+    with pytest.raises(RuntimeError):
+        post_task("k1")
+    monkeypatch.setattr(server, "complete_idempotent_request", complete)
+    assert run(server.db.tasks.count_documents({})) == 1
+
+    stale = datetime.utcnow() - timedelta(seconds=server.IDEMPOTENCY_LOCK_SECONDS + 1)
+    run(server.db.idempotency_keys.update_one({"key": "k1"}, {"$set": {"claimed_at": stale}}))
+    response = post_task("k1")
+    assert response.status_code == 200, response.text
+    tasks = run(server.db.tasks.find({}, {"_id": 0, "id": 1}).to_list(None))
+    assert tasks == [{"id": response.json()["id"]}]
+    stored = run(server.db.idempotency_keys.find_one({"key": "k1"}))
+    assert (stored["status"], stored["response"]["id"]) == ("done", response.json()["id"])
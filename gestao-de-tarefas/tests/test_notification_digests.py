@@ -0,0 +1,93 @@
+"""
+Notification digests: a digest-mode user gets one summary instead of one email
+per assigned task.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+
+@pytest.fixture
+def digest_mode(api, seed):
+    response = api.request("PUT", "/api/users/me/notifications", token=seed["member_token"], json={"mode": "digest"})
+    assert response.json() == {"mode": "digest"}
+
+
+def make_due(run):
+    import server
+
+    run(server.db.notification_digests.update_many({}, {"$set": {"send_after": datetime.utcnow()}}))
+
+
+def test_immediate_mode_sends_one_email_per_task(create_task, sent):
+    create_task(title="Primeira")
+    create_task(title="Segunda")
+    assert [email.subject for email in sent] == ["New task", "New task"]
+
+
+def test_digest_mode_sends_one_summary(run, digest_mode, create_task, sent):
+    import server
+
+    for i in range(3):
+        create_task(title=f"Tarefa {i}")
+    assert sent == []
+
+    # Not due until the window closes
+    assert run(server.send_due_digests()) == 0
+    make_due(run)
+    assert run(server.send_due_digests()) == 1
+    assert [(email.to, email.subject, email.description) for email in sent] == [
+        ("member@test.com", "Task digest", "- Tarefa 0\n- Tarefa 1\n- Tarefa 2")
+    ]
+    assert run(server.db.notification_digests.count_documents({})) == 0
+
+
+def test_unknown_notification_mode_is_rejected(api, seed):
+    response = api.request("PUT", "/api/users/me/notifications", token=seed["member_token"], json={"mode": "weekly"})
+    assert response.status_code == 422
+
+
+def test_failed_digest_stays_pending_and_is_retried(run, digest_mode, create_task, sent, monkeypatch):
+    import server
+
+    create_task(title="Primeira")
+    make_due(run)
+    record = server.send_notification_email
+
+    async def fail(*args, **kwargs):
+        raise ConnectionError("SMTP down")
+    monkeypatch.setattr(server, "send_notification_email", fail)
+    assert run(server.send_due_digests()) == 1
+    digest = run(server.db.notification_digests.find_one({}))
+    assert (digest["count"], digest["claimed_at"] is not None) == (1, True)
+
+    # Claimed, so not sent again until the claim goes stale
+    monkeypatch.setattr(server, "send_notification_email", record)
+    assert run(server.send_due_digests()) == 0
+    stale = datetime.utcnow() - timedelta(seconds=server.NOTIFICATION_DIGEST_CLAIM_SECONDS + 1)
+    run(server.db.notification_digests.update_many({}, {"$set": {"claimed_at": stale}}))
+    assert run(server.send_due_digests()) == 1
+    assert [email.description for email in sent] == ["- Primeira"]
+    assert run(server.db.notification_digests.count_documents({})) == 0
+
+
+def test_task_assigned_while_sending_stays_pending(run, seed, digest_mode, create_task, sent, monkeypatch):
+    import server
+
+    create_task(title="Primeira")
+    make_due(run)
+    record = server.send_notification_email
+
+    async def assign_meanwhile(*args, **kwargs):
+        user = await server.db.users.find_one({"id": seed["member"].id})
+        await server.notify_task_assigned(user, server.Task(
+            title="Segunda", responsible_user_id=user["id"], category="Teste", urgency="alta", requested_by=user["id"],
+            team_id=seed["team"].id,
+        ))
+        await record(*args, **kwargs)
+    monkeypatch.setattr(server, "send_notification_email", assign_meanwhile)
+    assert run(server.send_due_digests()) == 1
+    assert [email.description for email in sent] == ["- Primeira"]
+
+    digest = run(server.db.notification_digests.find_one({}))
+    assert ([item["title"] for item in digest["items"]], digest["count"], "claimed_at" in digest) == (["Segunda"], 1, False)
@@ -0,0 +1,30 @@
+"""
+Overdue scanner: flagged tasks reach syncing clients.
+"""
+from datetime import datetime, timedelta
+
+
+def test_flag_is_delivered_by_changes(api, run, seed):
+    import server
+
+    an_hour_ago = datetime.utcnow() - timedelta(hours=1)
+    task = server.Task(
+        title="Atrasada",
+        responsible_user_id=seed["member"].id,
+        category="Teste",
+        urgency="alta",
+        requested_by=seed["member"].id,
+        team_id=seed["team"].id,
+        deadline=an_hour_ago,
+        updated_at=an_hour_ago,
+    )
+    run(server.db.tasks.insert_one(task.dict()))
+
+    full_sync = api.request("GET", "/api/tasks/changes", token=seed["member_token"]).json()
+    assert [t["is_overdue"] for t in full_sync["tasks"]] == [False]
+
+    assert run(server.flag_overdue_tasks(server.default_tenant)) == 1
+
+    response = api.request("GET", f"/api/tasks/changes?since={full_sync['sync_token']}", token=seed["member_token"])
+    assert response.status_code == 200, response.text
+    assert [(t["id"], t["is_overdue"]) for t in response.json()["tasks"]] == [(task.id, True)]
@@ -0,0 +1,31 @@
+"""
+On-demand request profiling: only admins get profiled, and only when asking.
+"""
+
+
+def test_admin_request_is_profiled(api, run, seed):
+    import server
+
+    response = api.request("GET", "/api/tasks?profile=1", token=seed["admin_token"])
+    assert response.status_code == 200, response.text
+    profile_id = response.headers["x-profile-id"]
+
+    # The profile is stored after the response
+    run(server.asyncio.gather(*server.detached_tasks))
+    profile = api.request("GET", f"/api/admin/profiles/{profile_id}", token=seed["admin_token"]).json()
+    assert profile["path"] == "/api/tasks"
+    assert profile["user_id"] == seed["admin"].id
+
+    folded = api.request("GET", f"/api/admin/profiles/{profile_id}?format=folded", token=seed["admin_token"])
+    assert folded.headers["content-type"].startswith("text/plain")
+
+
+def test_profile_header_is_ignored_for_members(api, seed):
+    response = api.request("GET", "/api/tasks", token=seed["member_token"], headers={"X-Profile": "1"})
+    assert response.status_code == 200, response.text
+    assert "x-profile-id" not in response.headers
+
+
+def test_requests_without_the_flag_are_not_profiled(api, seed):
+    response = api.request("GET", "/api/tasks", token=seed["admin_token"])
+    assert "x-profile-id" not in response.headers
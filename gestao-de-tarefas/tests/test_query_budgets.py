@@ -0,0 +1,119 @@
+"""
+MongoDB command budgets per endpoint. Every request pays one command for the
+user lookup in get_current_user, so a plain list endpoint budgets 2.
+"""
+import pytest
+
+BUDGETS = [
+    ("GET", "/api/auth/me", None, 1),
+    ("GET", "/api/tasks", None, 2),
+    ("GET", "/api/tasks/{task_id}", None, 2),
+    ("PUT", "/api/tasks/{task_id}", {"status": "em_progresso"}, 3),
+    ("DELETE", "/api/tasks/{task_id}", None, 5),
+    ("GET", "/api/tasks/{task_id}/comments", None, 3),
+    ("GET", "/api/tasks/{task_id}/events", None, 3),
+    ("GET", "/api/tasks/{task_id}/blockers", None, 3),
+    ("GET", "/api/tasks/board", None, 2),
+    ("GET", "/api/tasks/changes", None, 2),
+    ("GET", "/api/tasks/overdue", None, 2),
+    ("GET", "/api/dashboard/stats", None, 3),
+    ("GET", "/api/users", None, 2),
+    ("GET", "/api/users/search?q=me", None, 2),
+    ("GET", "/api/teams", None, 2),
+]
+
+# Endpoints whose command count must not depend on how many rows they return
+LIST_ENDPOINTS = [
+    "/api/tasks",
+    "/api/tasks/{task_id}/comments",
+    "/api/tasks/board",
+    "/api/tasks/changes",
+    "/api/tasks/overdue",
+    "/api/dashboard/stats",
+    "/api/users",
+    "/api/teams/{team_id}/workload",
+]
+
+
+@pytest.fixture
+def task(seed, add_tasks):
+    return add_tasks(seed["team"].id, seed["member"].id, 1)[0]
+
+
+@pytest.mark.parametrize("method,path,body,budget", BUDGETS)
+def test_endpoint_command_budget(api, commands, seed, task, method, path, body, budget):
+    url = path.format(task_id=task["id"])
+    with commands() as sent:
+        response = api.request(method, url, token=seed["member_token"], json=body)
+    assert response.status_code == 200, response.text
+    assert len(sent) <= budget, f"{method} {path} sent {len(sent)} commands: {sent}"
+
+
+def test_create_task_command_budget(api, commands, seed):
+    body = {
+        "title": "Nova tarefa",
+        "responsible_user_id": seed["member"].id,
+        "category": "Teste",
+        "urgency": "alta",
+        "requested_by": seed["member"].id,
+        "team_id": seed["team"].id,
+    }
+    with commands() as sent:
+        response = api.request("POST", "/api/tasks", token=seed["member_token"], json=body)
+    assert response.status_code == 200, response.text
+    # user lookup, insert, workload rollup, responsible user lookup for the notification
+    assert len(sent) <= 4, sent
+
+
+def add_rows(run, seed, add_tasks, task, count):
+    import server
+
+    add_tasks(seed["team"].id, seed["member"].id, count)
+    run(server.db.comments.insert_many([
+        server.Comment(task_id=task["id"], user_id=seed["member"].id, content=f"Comentário {i}").dict()
+        for i in range(count)
+    ]))
+    run(server.db.users.insert_many([
+        server.User(email=f"user{i}@test.com", name=f"User {i}", password_hash="x", team_id=seed["team"].id).dict()
+        for i in range(count)
+    ]))
+    for cache in server.cache_registry.values():
+        cache.evict()
+
+
+@pytest.mark.parametrize("path", LIST_ENDPOINTS)
+def test_list_command_count_is_independent_of_rows(api, commands, run, seed, add_tasks, task, path):
+    url = path.format(task_id=task["id"], team_id=seed["team"].id)
+
+    add_rows(run, seed, add_tasks, task, 5)
+    with commands() as few:
+        assert api.request("GET", url, token=seed["member_token"]).status_code == 200
+
+    # Past the server's default first batch of 101 documents
+    add_rows(run, seed, add_tasks, task, 250)
+    with commands() as many:
+        assert api.request("GET", url, token=seed["member_token"]).status_code == 200
+
+    assert len(many) == len(few), f"{path}: {len(few)} commands with few rows, {len(many)} with many: {many}"
+
+
+@pytest.mark.parametrize("path", ["/api/teams", "/api/users", "/api/auth/me"])
+@pytest.mark.parametrize("role", ["admin", "member"])
+def test_directory_reads_are_served_from_cache(api, commands, seed, path, role):
+    token = seed[f"{role}_token"]
+    assert api.request("GET", path, token=token).status_code == 200
+    with commands() as sent:
+        response = api.request("GET", path, token=token)
+    assert response.status_code == 200, response.text
+    assert sent == []
+
+
+def test_directory_cache_is_written_through(api, commands, seed):
+    api.request("GET", "/api/users", token=seed["member_token"])
+    body = {"email": "novo@test.com", "name": "Novo", "password": "segredo", "team_id": seed["team"].id}
+    assert api.request("POST", "/api/admin/users", token=seed["admin_token"], json=body).status_code == 200
+
+    with commands() as sent:
+        users = api.request("GET", "/api/users", token=seed["member_token"]).json()
+    assert "novo@test.com" in [user["email"] for user in users]
+    assert sent == []
@@ -0,0 +1,60 @@
+"""
+Read preference routing against a replica set. Start one with
+scripts/local_replica_set.py and export the TEST_REPLSET_URL it prints.
+"""
+import os
+
+import pytest
+
+pytestmark = pytest.mark.skipif(
+    not os.environ.get("TEST_REPLSET_URL"), reason="TEST_REPLSET_URL not set"
+)
+
+
+def task_reads(events):
+    return [
+        event for event in events
+        if event.command_name in ("find", "aggregate") and event.command.get(event.command_name) == "tasks"
+    ]
+
+
+def primary_address():
+    import server
+
+    return server.client.delegate.primary
+
+
+def test_dashboard_stats_read_from_a_secondary(api, command_events, seed, add_tasks):
+    add_tasks(seed["team"].id, seed["member"].id, 5)
+    with command_events() as events:
+        response = api.request("GET", "/api/dashboard/stats", token=seed["member_token"])
+    assert response.status_code == 200, response.text
+
+    reads = task_reads(events)
+    assert reads
+    for event in reads:
+        assert event.connection_id != primary_address()
+        assert event.command["$readPreference"]["mode"] == "secondaryPreferred"
+
+
+def test_analytics_read_from_a_secondary(api, command_events, seed, add_tasks):
+    add_tasks(seed["team"].id, seed["member"].id, 5)
+    with command_events() as events:
+        response = api.request("GET", f"/api/analytics/teams/{seed['team'].id}", token=seed["member_token"])
+    assert response.status_code == 200, response.text
+
+    reads = task_reads(events)
+    assert reads
+    assert all(event.connection_id != primary_address() for event in reads)
+
+
+def test_task_detail_reads_its_own_write(api, command_events, seed, add_tasks):
+    task = add_tasks(seed["team"].id, seed["member"].id, 1)[0]
+    url = f"/api/tasks/{task['id']}"
+
+    for status in ("em_progresso", "concluida", "pendente"):
+        assert api.request("PUT", url, token=seed["member_token"], json={"status": status}).status_code == 200
+        with command_events() as events:
+            response = api.request("GET", url, token=seed["member_token"])
+        assert response.json()["status"] == status
+        assert all(event.connection_id == primary_address() for event in task_reads(events))
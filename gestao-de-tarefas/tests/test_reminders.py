@@ -0,0 +1,97 @@
+"""
+Deadline reminder scheduler: one reminder per task, sent only by the worker
+holding the scheduler lease.
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+
+@pytest.fixture
+def scheduler(run):
+    import server
+
+    scheduler = server.reminder_scheduler
+    scheduler.reset()
+    yield scheduler
+    run(scheduler.release_lease())
+
+
+def add_task(run, seed, title, minutes, **fields):
+    import server
+
+    task = server.Task(
+        title=title,
+        responsible_user_id=seed["member"].id,
+        category="Teste",
+        urgency="alta",
+        requested_by=seed["member"].id,
+        team_id=seed["team"].id,
+        deadline=datetime.utcnow() + timedelta(minutes=minutes),
+        **fields,
+    ).dict()
+    run(server.db.tasks.insert_one(task))
+    return task
+
+
+def test_reminder_is_sent_once_before_the_deadline(run, seed, scheduler, sent):
+    import server
+
+    add_task(run, seed, "Vence logo", server.REMINDER_LEAD_MINUTES // 2)
+    add_task(run, seed, "Vence depois", server.REMINDER_LEAD_MINUTES + server.REMINDER_WINDOW_MINUTES + 60)
+    add_task(run, seed, "Já vencida", -5)
+    add_task(run, seed, "Concluída", 5, status="concluida")
+
+    run(scheduler.run_once())
+    assert [(email.to, email.title, email.subject) for email in sent] == [("member@test.com", "Vence logo", "Deadline reminder")]
+
+    # A reload of the window does not send it again
+    scheduler.reset()
+    run(scheduler.run_once())
+    assert len(sent) == 1
+
+
+def test_only_the_lease_holder_sends_reminders(run, seed, scheduler, sent):
+    import server
+
+    add_task(run, seed, "Vence logo", 5)
+    lease = {"_id": scheduler.namespace, "holder": "other-worker", "expires_at": datetime.utcnow() + timedelta(minutes=1)}
+    run(server.db.scheduler_leases.insert_one(lease))
+
+    run(scheduler.run_once())
+    assert not scheduler.holding
+    assert sent == []
+
+    # An expired lease is taken over
+    run(server.db.scheduler_leases.update_one({"_id": scheduler.namespace}, {"$set": {"expires_at": datetime.utcnow() - timedelta(seconds=1)}}))
+    run(scheduler.run_once())
+    assert scheduler.holding
+    assert len(sent) == 1
+
+
+def test_task_writes_reschedule_the_reminder(api, run, seed, scheduler, sent):
+    task = add_task(run, seed, "Sem pressa", 24 * 60)
+    run(scheduler.run_once())
+    assert sent == []
+
+    deadline = (datetime.utcnow() + timedelta(minutes=5)).isoformat()
+    response = api.request("PUT", f"/api/tasks/{task['id']}", token=seed["member_token"], json={"deadline": deadline})
+    assert response.status_code == 200, response.text
+    run(scheduler.run_once())
+    assert [email.title for email in sent] == ["Sem pressa"]
+
+
+def test_overlapping_holders_send_a_reminder_once(run, seed, scheduler, sent):
+    import server
+
+    add_task(run, seed, "Vence logo", 5)
+    other = server.DeadlineReminderScheduler(worker_id="other-worker")
+    server.cache_registry[scheduler.namespace] = scheduler
+    run(scheduler.load())
+    run(other.load())
+
+    async def fire_both():
+        return await asyncio.gather(scheduler.fire_due(), other.fire_due())
+    assert run(fire_both()) == [1, 1]
+    assert len(sent) == 1
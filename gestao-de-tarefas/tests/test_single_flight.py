@@ -0,0 +1,83 @@
+"""
+Request coalescing: concurrent identical reads share one computation, and a
+caller that goes away does not take the others' result with it.
+"""
+import asyncio
+
+import httpx
+import pytest
+
+CALLERS = 5
+
+
+@pytest.fixture
+def gated_task_list(monkeypatch):
+    """Hold load_tasks until the gate opens, counting how often it really runs"""
+    import server
+
+    monkeypatch.setattr(server.task_list_flight, "executed", 0)
+    monkeypatch.setattr(server.task_list_flight, "coalesced", 0)
+    gate = asyncio.Event()
+    calls = []
+    load_tasks = server.load_tasks
+
+    async def gated(*args, **kwargs):
+        calls.append(args)
+        await gate.wait()
+        return await load_tasks(*args, **kwargs)
+    monkeypatch.setattr(server, "load_tasks", gated)
+    return gate, calls
+
+
+async def wait_for_waiters(count: int):
+    import server
+
+    while server.task_list_flight.executed + server.task_list_flight.coalesced < count:
+        await asyncio.sleep(0.01)
+
+
+def test_identical_requests_share_one_computation(api, run, seed, add_tasks, gated_task_list):
+    import server
+
+    gate, calls = gated_task_list
+    add_tasks(seed["team"].id, seed["member"].id, 3)
+
+    async def scenario():
+        headers = {"Authorization": f"Bearer {seed['member_token']}"}
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://testserver") as client:
+            requests = [asyncio.create_task(client.get("/api/tasks", headers=headers)) for _ in range(CALLERS)]
+            await wait_for_waiters(CALLERS)
+            gate.set()
+            return await asyncio.gather(*requests)
+
+    responses = run(scenario())
+    assert [response.status_code for response in responses] == [200] * CALLERS
+    assert all(len(response.json()) == 3 for response in responses)
+    assert len(calls) == 1
+
+    metrics = api.request("GET", "/api/admin/single-flight", token=seed["admin_token"]).json()["task_list"]
+    assert (metrics["executed"], metrics["coalesced"], metrics["in_flight"]) == (1, CALLERS - 1, 0)
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_call(run, seed, add_tasks, gated_task_list):
+    import server
+
+    gate, calls = gated_task_list
+    add_tasks(seed["team"].id, seed["member"].id, 3)
+
+    async def scenario():
+        headers = {"Authorization": f"Bearer {seed['member_token']}"}
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://testserver") as client:
+            requests = [asyncio.create_task(client.get("/api/tasks", headers=headers)) for _ in range(CALLERS)]
+            await wait_for_waiters(CALLERS)
+            # One caller disconnects while the computation is in flight
+            requests[0].cancel()
+            await asyncio.sleep(0)
+            gate.set()
+            return await asyncio.gather(*requests, return_exceptions=True)
+
+    first, *others = run(scenario())
+    assert isinstance(first, asyncio.CancelledError)
+    assert [response.status_code for response in others] == [200] * (CALLERS - 1)
+    assert all(len(response.json()) == 3 for response in others)
+    assert len(calls) == 1
@@ -0,0 +1,52 @@
+"""
+Sparse fieldsets: ?fields= trims both the response and the MongoDB projection.
+"""
+import pytest
+
+
+def task_finds(events):
+    return [event for event in events if event.command_name == "find" and event.command["find"] == "tasks"]
+
+
+def test_task_list_returns_and_loads_only_the_fields(api, command_events, seed, add_tasks):
+    add_tasks(seed["team"].id, seed["member"].id, 3)
+    with command_events() as events:
+        response = api.request("GET", "/api/tasks?fields=title,status", token=seed["member_token"])
+    assert response.status_code == 200, response.text
+
+    assert [set(task) for task in response.json()] == [{"id", "title", "status"}] * 3
+    finds = task_finds(events)
+    assert finds
+    for event in finds:
+        assert set(event.command["projection"]) == {"_id", "id", "title", "status"}
+
+
+def test_task_detail_loads_team_id_but_does_not_return_it(api, command_events, seed, add_tasks):
+    task = add_tasks(seed["team"].id, seed["member"].id, 1)[0]
+    with command_events() as events:
+        response = api.request("GET", f"/api/tasks/{task['id']}?fields=title", token=seed["member_token"])
+    assert response.status_code == 200, response.text
+
+    assert response.json() == {"id": task["id"], "title": task["title"]}
+    for event in task_finds(events):
+        assert set(event.command["projection"]) == {"_id", "id", "title", "team_id"}
+
+
+def test_board_cards_are_trimmed(api, seed, add_tasks):
+    add_tasks(seed["team"].id, seed["member"].id, 3)
+    response = api.request("GET", "/api/tasks/board?fields=title", token=seed["member_token"])
+    assert response.status_code == 200, response.text
+    cards = [card for column in response.json()["columns"] for card in column["tasks"]]
+    assert len(cards) == 3
+    assert all(set(card) == {"id", "title"} for card in cards)
+
+
+@pytest.mark.parametrize("url", [
+    "/api/tasks?fields=title,senha",
+    "/api/tasks/board?fields=_urgency_rank",
+    "/api/users?fields=password_hash",
+])
+def test_unknown_fields_are_rejected(api, seed, url):
+    response = api.request("GET", url, token=seed["member_token"])
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Unknown fields")
@@ -0,0 +1,35 @@
+"""
+Task sync: paged full syncs hand back a token that still sees deletes made
+while the client was paging.
+"""
+
+
+def test_delete_during_full_sync_is_delivered_as_tombstone(api, seed, add_tasks, monkeypatch):
+    import server
+
+    monkeypatch.setattr(server, "SYNC_PAGE_SIZE", 2)
+    # Without the overlap only the sync start keeps the delete in the next window
+    monkeypatch.setattr(server, "SYNC_SAFETY_SECONDS", 0)
+    add_tasks(seed["team"].id, seed["member"].id, 3)
+    token = seed["member_token"]
+
+    first_page = api.request("GET", "/api/tasks/changes", token=token).json()
+    assert first_page["has_more"]
+    ghost = first_page["tasks"][0]["id"]
+    assert api.request("DELETE", f"/api/tasks/{ghost}", token=token).status_code == 200
+
+    last_page = api.request("GET", f"/api/tasks/changes?since={first_page['sync_token']}", token=token).json()
+    assert not last_page["has_more"]
+    assert last_page["deleted"] == []
+
+    response = api.request("GET", f"/api/tasks/changes?since={last_page['sync_token']}", token=token)
+    assert response.status_code == 200, response.text
+    assert [tombstone["task_id"] for tombstone in response.json()["deleted"]] == [ghost]
+
+
+def test_malformed_sync_start_is_rejected(api, seed):
+    import server
+
+    cursor = server.encode_cursor({"t": "2024-01-01T00:00:00", "id": "x", "full": True, "s": "not-a-date"})
+    response = api.request("GET", f"/api/tasks/changes?since={cursor}", token=seed["member_token"])
+    assert response.status_code == 400
@@ -0,0 +1,70 @@
+"""
+Task status timeline: events are buffered in memory, visible right away and
+written in batches; a failed write keeps them for the next flush.
+"""
+import pytest
+
+
+@pytest.fixture
+def buffer():
+    import server
+
+    buffer = server.task_event_buffer
+    buffer._events = []
+    yield buffer
+    buffer._events = []
+
+
+def timeline(api, seed, task_id):
+    response = api.request("GET", f"/api/tasks/{task_id}/events", token=seed["member_token"])
+    assert response.status_code == 200, response.text
+    return [(event["from_status"], event["to_status"]) for event in response.json()]
+
+
+def move_task(api, seed, create_task):
+    task = create_task()
+    response = api.request("PUT", f"/api/tasks/{task['id']}", token=seed["member_token"], json={"status": "em_progresso"})
+    assert response.status_code == 200, response.text
+    return task
+
+
+EXPECTED = [(None, "pendente"), ("pendente", "em_progresso")]
+
+
+def test_buffered_events_are_listed_before_a_flush(api, run, seed, create_task, buffer):
+    import server
+
+    task = move_task(api, seed, create_task)
+    assert run(server.db.task_events.count_documents({})) == 0
+    assert timeline(api, seed, task["id"]) == EXPECTED
+
+
+def test_flush_persists_buffered_events(api, run, seed, create_task, buffer):
+    import server
+
+    task = move_task(api, seed, create_task)
+    run(buffer.flush())
+    assert buffer.pending(task["id"]) == []
+    assert run(server.db.task_events.count_documents({"task_id": task["id"]})) == 2
+    # Persisted events are not listed twice
+    assert timeline(api, seed, task["id"]) == EXPECTED
+
+
+def test_failed_flush_requeues_the_events(api, run, seed, create_task, buffer, monkeypatch):
+    import server
+
+    task = move_task(api, seed, create_task)
+    task_events = server.default_tenant.task_events
+
+    async def fail(*args, **kwargs):
+        raise ConnectionError("primary stepped down")
+    monkeypatch.setattr(task_events, "insert_many", fail)
+    run(buffer.flush())
+    assert len(buffer.pending(task["id"])) == 2
+    assert run(server.db.task_events.count_documents({})) == 0
+    assert timeline(api, seed, task["id"]) == EXPECTED
+
+    monkeypatch.undo()
+    run(buffer.flush())
+    assert buffer.pending(task["id"]) == []
+    assert run(server.db.task_events.count_documents({"task_id": task["id"]})) == 2
@@ -0,0 +1,73 @@
+"""
+Task import from CSV and XLSX: per-row failures, the row cap and the cap on
+reported failures.
+"""
+import io
+
+import pytest
+
+HEADER = "title,category,urgency,responsible_email\n"
+
+
+def upload(api, seed, filename, content, content_type="text/csv"):
+    response = api.request(
+        "POST", "/api/tasks/import", token=seed["member_token"], files={"file": (filename, content, content_type)}
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_csv_rows_are_imported_or_reported(api, run, seed):
+    import server
+
+    body = HEADER + (
+        "Primeira,Teste,alta,member@test.com\n"
+        "Segunda,Teste,baixa,member@test.com\n"
+        "Sem dono,Teste,alta,ninguem@test.com\n"
+        "Sem categoria,,alta,member@test.com\n"
+    )
+    report = upload(api, seed, "tarefas.csv", body)
+    assert (report["total"], report["created"], report["failed"]) == (4, 2, 2)
+    assert [(f["row"], f["title"], f["status"]) for f in report["failures"]] == [
+        (3, "Sem dono", "invalid"),
+        (4, "Sem categoria", "invalid"),
+    ]
+    tasks = run(server.db.tasks.find({}, {"_id": 0, "title": 1, "team_id": 1}).to_list(None))
+    assert sorted(task["title"] for task in tasks) == ["Primeira", "Segunda"]
+    assert {task["team_id"] for task in tasks} == {seed["team"].id}
+
+
+def test_xlsx_rows_are_imported(api, seed):
+    openpyxl = pytest.importorskip("openpyxl")
+
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["Title", "Category", "Urgency", "Responsible_Email"])
+    sheet.append(["Planilha", "Teste", "media", "member@test.com"])
+    sheet.append([None, None, None, None])
+    sheet.append(["Sem urgência", "Teste", None, "member@test.com"])
+    content = io.BytesIO()
+    workbook.save(content)
+
+    report = upload(api, seed, "tarefas.xlsx", content.getvalue(), "application/octet-stream")
+    assert (report["total"], report["created"]) == (2, 1)
+    assert [(f["row"], f["status"]) for f in report["failures"]] == [(3, "invalid")]
+
+
+def test_rows_past_the_cap_are_skipped(api, seed, monkeypatch):
+    import server
+
+    monkeypatch.setattr(server, "TASK_IMPORT_MAX_ROWS", 2)
+    body = HEADER + "".join(f"Tarefa {i},Teste,alta,member@test.com\n" for i in range(3))
+    report = upload(api, seed, "tarefas.csv", body)
+    assert report["created"] == 2
+    assert [(f["row"], f["status"]) for f in report["failures"]] == [(3, "invalid")]
+
+
+def test_reported_failures_are_capped(api, seed, monkeypatch):
+    import server
+
+    monkeypatch.setattr(server, "TASK_IMPORT_MAX_REPORTED_FAILURES", 1)
+    body = HEADER + "".join(f"Tarefa {i},Teste,alta,ninguem@test.com\n" for i in range(3))
+    report = upload(api, seed, "tarefas.csv", body)
+    assert (report["failed"], len(report["failures"]), report["failures_truncated"]) == (3, 1, True)
@@ -0,0 +1,62 @@
+"""
+Tenant placement: teams in prefixed collections, cross-tenant reads and the
+move guard.
+"""
+import pytest
+
+
+@pytest.fixture
+def other_team(run):
+    import server
+
+    team = server.Team(name="Equipe Isolada", created_by="admin")
+    run(server.db.teams.insert_one(team.dict()))
+    return team
+
+
+def place(api, seed, team_id, **placement):
+    return api.request("PUT", f"/api/admin/teams/{team_id}/tenant", token=seed["admin_token"], json=placement)
+
+
+def create_admin_task(create_task, seed, team_id, title):
+    admin = seed["admin"].id
+    return create_task(
+        token=seed["admin_token"], title=title, team_id=team_id, responsible_user_id=admin, requested_by=admin
+    )["id"]
+
+
+def test_placed_team_writes_to_its_own_collections(api, run, seed, other_team, create_task):
+    import server
+
+    response = place(api, seed, other_team.id, collection_prefix="isolada_")
+    assert response.status_code == 200, response.text
+    assert response.json()["tenant"] == {"database": None, "collection_prefix": "isolada_"}
+
+    task_id = create_admin_task(create_task, seed, other_team.id, "Isolada")
+    assert run(server.db["isolada_tasks"].count_documents({"id": task_id})) == 1
+    assert run(server.db.tasks.count_documents({"id": task_id})) == 0
+
+
+def test_admin_reads_merge_every_tenant(api, seed, other_team, create_task):
+    assert place(api, seed, other_team.id, collection_prefix="isolada_").status_code == 200
+    shared = create_admin_task(create_task, seed, seed["team"].id, "Compartilhada")
+    isolated = create_admin_task(create_task, seed, other_team.id, "Isolada")
+
+    tasks = api.request("GET", "/api/tasks", token=seed["admin_token"]).json()
+    assert {task["id"] for task in tasks} == {shared, isolated}
+    stats = api.request("GET", "/api/dashboard/stats", token=seed["admin_token"]).json()
+    assert stats["total_tasks"] == 2
+
+    # A member only reaches its own team's tenant
+    tasks = api.request("GET", "/api/tasks", token=seed["member_token"]).json()
+    assert [task["id"] for task in tasks] == [shared]
+
+
+def test_team_with_tasks_cannot_move(api, seed, create_task):
+    create_admin_task(create_task, seed, seed["team"].id, "Já existe")
+    assert place(api, seed, seed["team"].id, collection_prefix="novo_").status_code == 409
+
+
+@pytest.mark.parametrize("database", ["admin", "local", "config", "Admin", "bad.name"])
+def test_reserved_or_invalid_database_is_rejected(api, seed, other_team, database):
+    assert place(api, seed, other_team.id, database=database).status_code == 400
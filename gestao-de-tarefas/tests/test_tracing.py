@@ -0,0 +1,44 @@
+"""
+Tracing: W3C traceparent parsing and span nesting across awaits.
+"""
+
+
+def test_parse_traceparent(loop):
+    import server
+
+    trace_id, parent_id = "4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7"
+    assert server.parse_traceparent(f"00-{trace_id}-{parent_id}-01") == (trace_id, parent_id, True)
+    assert server.parse_traceparent(f"00-{trace_id}-{parent_id}-00") == (trace_id, parent_id, False)
+    assert server.parse_traceparent(f"00-{'0' * 32}-{parent_id}-01") is None
+    assert server.parse_traceparent("garbage") is None
+    assert server.parse_traceparent("") is None
+
+
+def test_spans_nest_under_the_current_span(run):
+    import server
+
+    async def traced():
+        root = server.Span("a" * 32, None, "GET /api/tasks", server.SPAN_KIND_SERVER)
+        token = server.current_span.set(root)
+        try:
+            with server.span("outer") as outer:
+                await server.asyncio.sleep(0)
+                with server.span("inner") as inner:
+                    pass
+        finally:
+            server.current_span.reset(token)
+        return root, outer, inner
+
+    server.finished_spans.clear()
+    root, outer, inner = run(traced())
+    assert outer.parent_id == root.span_id
+    assert inner.parent_id == outer.span_id
+    assert {inner.trace_id, outer.trace_id} == {root.trace_id}
+    assert list(server.finished_spans) == [inner, outer]
+
+
+def test_span_is_a_no_op_outside_a_trace(loop):
+    import server
+
+    with server.span("orphan") as orphan:
+        assert orphan is None
@@ -0,0 +1,62 @@
+"""
+User search and lookup by id.
+"""
+import pytest
+
+
+def test_lookup_by_ids_stays_in_team(api, seed):
+    ids = f"{seed['member'].id},{seed['admin'].id},desconhecido"
+
+    response = api.request("GET", f"/api/users/search?ids={ids}&limit=100", token=seed["admin_token"])
+    assert response.status_code == 200, response.text
+    assert {user["id"] for user in response.json()["items"]} == {seed["member"].id, seed["admin"].id}
+
+    # The admin has no team, so a member only resolves itself
+    response = api.request("GET", f"/api/users/search?ids={ids}", token=seed["member_token"])
+    assert [user["id"] for user in response.json()["items"]] == [seed["member"].id]
+
+
+@pytest.mark.parametrize("payload", [["a", "b", "c"], 7])
+def test_malformed_search_cursor_is_rejected(api, seed, payload):
+    import server
+
+    response = api.request("GET", "/api/users/search", token=seed["admin_token"], params={"cursor": server.encode_cursor(payload)})
+    assert response.status_code == 400
+
+
+def test_import_reports_a_non_string_email_as_invalid(api, seed):
+    response = api.request("POST", "/api/admin/users/import", token=seed["admin_token"], json=[{"email": 123}])
+    assert response.status_code == 200, response.text
+    assert [(f["row"], f["email"], f["status"]) for f in response.json()["failures"]] == [(1, "123", "invalid")]
+
+
+def test_csv_import_over_the_row_limit_is_rejected(api, seed, monkeypatch):
+    import server
+
+    monkeypatch.setattr(server, "USER_IMPORT_MAX_ROWS", 2)
+    csv_body = "email,name,password\n" + "".join(f"u{i}@test.com,U{i},segredo1\n" for i in range(3))
+    response = api.request(
+        "POST", "/api/admin/users/import/csv", token=seed["admin_token"], files={"file": ("users.csv", csv_body, "text/csv")}
+    )
+    assert response.status_code == 413
+
+
+def test_imported_users_are_hashed_in_the_pool_and_can_log_in(api, run, seed):
+    import server
+
+    rows = [
+        {"email": f"import{i}@test.com", "name": f"Importado {i}", "password": f"segredo{i}", "team_id": seed["team"].id}
+        for i in range(3)
+    ]
+    response = api.request("POST", "/api/admin/users/import", token=seed["admin_token"], json=rows + [rows[0]])
+    assert response.status_code == 200, response.text
+    report = response.json()
+    assert (report["created"], [(f["row"], f["status"]) for f in report["failures"]]) == (3, [(4, "duplicate")])
+    assert server.password_hash_pool is not None
+
+    response = api.request("POST", "/api/auth/login", json={"email": "import1@test.com", "password": "segredo1"})
+    assert response.status_code == 200, response.text
+    assert api.request("POST", "/api/auth/login", json={"email": "import1@test.com", "password": "segredo2"}).status_code == 401
+    # The import evicts the member list it changed
+    team = api.request("GET", "/api/users", token=seed["member_token"]).json()
+    assert {user["email"] for user in team} == {"member@test.com"} | {row["email"] for row in rows}
@@ -0,0 +1,81 @@
+"""
+Workload rollups: kept current by task writes and equal to a full recount.
+"""
+from datetime import datetime, timedelta
+
+
+def workload(api, seed):
+    response = api.request("GET", f"/api/teams/{seed['team'].id}/workload", token=seed["member_token"])
+    assert response.status_code == 200, response.text
+    return {entry["user_id"]: entry for entry in response.json()["members"]}
+
+
+def test_workload_follows_task_writes(api, seed, create_task):
+    member, admin = seed["member"].id, seed["admin"].id
+    first = create_task(responsible_user_id=member, urgency="alta")["id"]
+    second = create_task(responsible_user_id=member, urgency="critica")["id"]
+    third = create_task(responsible_user_id=member, urgency="alta")["id"]
+
+    entry = workload(api, seed)[member]
+    assert (entry["open"], entry["by_urgency"]) == (3, {"alta": 2, "critica": 1})
+
+    token = seed["member_token"]
+    api.request("PUT", f"/api/tasks/{first}", token=token, json={"responsible_user_id": admin})
+    api.request("PUT", f"/api/tasks/{second}", token=token, json={"status": "concluida"})
+    api.request("DELETE", f"/api/tasks/{third}", token=token)
+
+    entries = workload(api, seed)
+    assert entries[member]["open"] == 0
+    # The admin is not in the team but still holds an open task of it
+    assert (entries[admin]["open"], entries[admin]["name"]) == (1, None)
+
+
+def test_rebuild_matches_incremental_rollups(api, run, seed, create_task):
+    import server
+
+    create_task(responsible_user_id=seed["member"].id, urgency="alta")
+    create_task(responsible_user_id=seed["member"].id, urgency="baixa")
+    incremental = workload(api, seed)
+
+    run(server.db.workload.delete_many({}))
+    response = api.request("POST", f"/api/admin/teams/{seed['team'].id}/workload/rebuild", token=seed["admin_token"])
+    assert response.status_code == 200, response.text
+    assert workload(api, seed) == incremental
+
+
+def test_workload_of_another_team_is_forbidden(api, seed):
+    response = api.request("GET", "/api/teams/outra-equipe/workload", token=seed["member_token"])
+    assert response.status_code == 403
+
+
+
+def test_overdue_flags_count_for_the_assignee_holding_the_task(api, run, seed, create_task, monkeypatch):
+    import server
+
+    member, admin = seed["member"].id, seed["admin"].id
+    moved = create_task(responsible_user_id=member)["id"]
+    create_task(responsible_user_id=admin)
+    run(server.db.tasks.update_many({}, {"$set": {"deadline": datetime.utcnow() - timedelta(minutes=1)}}))
+
+    # After the scan found one task per assignee, the member's task goes to the admin
+    tasks = server.default_tenant.tasks
+    aggregate = tasks.aggregate
+
+    def reassign_after(*args, **kwargs):
+        cursor = aggregate(*args, **kwargs)
+        to_list = cursor.to_list
+
+        async def reassign(*args, **kwargs):
+            rows = await to_list(*args, **kwargs)
+            await server.update_task(moved, server.TaskUpdate(responsible_user_id=admin), current_user=seed["member"])
+            return rows
+        cursor.to_list = reassign
+        return cursor
+    monkeypatch.setattr(tasks, "aggregate", reassign_after)
+    assert run(server.flag_overdue_tasks(server.default_tenant)) == 2
+    monkeypatch.undo()
+
+    entries = workload(api, seed)
+    assert (entries[member]["overdue"], entries[admin]["overdue"]) == (0, 2)
+    run(server.rebuild_team_workload(seed["team"].id))
+    assert workload(api, seed) == entries